@@ -1,14 +1,64 @@
-from .evaluator import IOUType, ODCocoEvaluator
-from .models import (
-    Annotation,
-    BBox,
-    CaptionAnnotation,
-    CaptionCocoDataset,
-    Category,
-    CocoDataset,
-    FaceAnnotation,
-    FaceCocoDataset,
-    Image,
-    ODAnnotation,
-    ODCocoDataset,
-)
+import importlib
+from typing import TYPE_CHECKING, Any, List
+
+if TYPE_CHECKING:
+    from .evaluator import EvalEngine, IOUType, ODCocoEvaluator, ParallelBackend
+    from .models import (
+        Annotation,
+        BBox,
+        CaptionAnnotation,
+        CaptionCocoDataset,
+        Category,
+        CocoDataset,
+        FaceAnnotation,
+        FaceCocoDataset,
+        Image,
+        ImageKey,
+        MergeConflict,
+        ODAnnotation,
+        ODCocoDataset,
+    )
+    from .profiling import profile
+
+# public names, with the submodule defining them; the submodules pull in numpy,
+# mousse, pandas or pycocotools, so they are only imported on first access
+LAZY_ATTRIBUTES = {
+    "EvalEngine": "evaluator",
+    "IOUType": "evaluator",
+    "ODCocoEvaluator": "evaluator",
+    "ParallelBackend": "evaluator",
+    "Annotation": "models",
+    "BBox": "models",
+    "CaptionAnnotation": "models",
+    "CaptionCocoDataset": "models",
+    "Category": "models",
+    "CocoDataset": "models",
+    "FaceAnnotation": "models",
+    "FaceCocoDataset": "models",
+    "Image": "models",
+    "ImageKey": "models",
+    "MergeConflict": "models",
+    "ODAnnotation": "models",
+    "ODCocoDataset": "models",
+    "profile": "profiling",
+}
+LAZY_SUBMODULES = ("benchmarks", "core", "evaluator", "io", "models", "profiling")
+
+__all__ = list(LAZY_ATTRIBUTES)
+
+
+def __getattr__(name: str) -> Any:
+    if name in LAZY_SUBMODULES:
+        return importlib.import_module(f".{name}", __name__)
+
+    module = LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted({*globals(), *LAZY_ATTRIBUTES, *LAZY_SUBMODULES})
@@ -1,11 +1,16 @@
-def main():
+def setup_logging():
     from mousse import get_logger
-    from .app import app
 
     logger = get_logger("app")
     logger.include_extra = False
     logger.add_handler("RotatingFileHandler", path="logs/app.out")
 
+
+def main():
+    from .app import app
+
+    # mousse is slow to import, so logging is only set up for commands needing it
+    app.on_setup(setup_logging)
     app()
 
 
@@ -1,12 +1,16 @@
 import inspect
+from enum import Enum
 from functools import lru_cache, wraps
 from inspect import Signature
+from pathlib import Path
 from types import FunctionType
 from typing import *
 
-from typer import Typer
+from typer import Argument, Option, Typer
 from typer.models import ArgumentInfo, OptionInfo
 
+from .profiling import profile, stage
+
 __all__ = ["app", "Command", "App"]
 
 
@@ -14,20 +18,51 @@ class Command:
     pass
 
 
+class OutputFormat(str, Enum):
+    json = "json"
+    table = "table"
+
+
 class App(Typer):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.setups: List[Callable] = []
+        # global options, set by the callback of the root app
+        self.options: Dict[str, Any] = {}
+
+    def on_setup(self, func: Callable) -> Callable:
+        """Register a function run once before the first command which is not light"""
+        self.setups.append(func)
+        return func
+
+    def setup(self):
+        while self.setups:
+            self.setups.pop(0)()
+
     @wraps(Typer.command)
-    def command(self, *args, callback: Callable = None, **kwargs):
+    def command(self, *args, callback: Callable = None, light: bool = False, **kwargs):
         base = super()
 
         def decorator(func: Callable):
-            __func = func
-            if callback is not None:
+            name = kwargs.get("name") or (args[0] if args else func.__name__)
 
-                @wraps(func)
-                def __func(*args, **kwargs):
-                    return callback(func(*args, **kwargs))
+            def run(*args, **kwargs):
+                result = func(*args, **kwargs)
+                return result if callback is None else callback(result)
+
+            @wraps(func)
+            def command(*args, **kwargs):
+                if not light:
+                    self.setup()
+
+                path = self.options.get("profile")
+                if path is None:
+                    return run(*args, **kwargs)
+
+                with profile(path=path), stage(f"command.{name}"):
+                    return run(*args, **kwargs)
 
-            base.command(*args, **kwargs)(__func)
+            base.command(*args, **kwargs)(command)
             func = FunctionType(
                 func.__code__,
                 func.__globals__,
@@ -72,6 +107,8 @@ class App(Typer):
     @lru_cache(maxsize=None)
     def sub_app(self, name: str):
         sub_app = App(pretty_exceptions_show_locals=False)
+        sub_app.setups = self.setups
+        sub_app.options = self.options
         self.add_typer(sub_app, name=name)
         return sub_app
 
@@ -79,7 +116,17 @@ class App(Typer):
 app = App(pretty_exceptions_show_locals=False)
 
 
-@app.command()
+@app.callback()
+def options(
+    profile: Path = Option(
+        None,
+        help="Profile the command, writing its stages there as json, or as flamegraph folded stacks for a .folded path.",
+    ),
+):
+    app.options["profile"] = profile
+
+
+@app.command(light=True)
 def about():
     import random
 
@@ -87,3 +134,128 @@ def about():
 
     char = random.choice(cowsay.char_names)
     print(cowsay.get_output_string(char, "This is a module for managing coco dataset"))
+
+
+@app.command()
+def bench(
+    names: List[str] = Argument(
+        None,
+        help="Cases to run, as shell patterns like 'evaluator.*'. Defaults to all.",
+    ),
+    scale: List[int] = Option(
+        [10000], "--scale", "-s", help="Number of annotations, repeatable."
+    ),
+    repeat: int = Option(1, help="Keep the best time out of this many runs."),
+    output: Path = Option(None, "--output", "-o", help="Write the json results here."),
+    baseline: Path = Option(None, help="Json results to compare against."),
+    tolerance: float = Option(0.1, help="Relative slowdown flagged as a regression."),
+    list_cases: bool = Option(False, "--list", help="List the cases and exit."),
+    imports: bool = Option(
+        False, "--imports", help="Check import times against their budget and exit."
+    ),
+):
+    """Time codantic operations on synthetic datasets and report the results as json"""
+    import contextlib
+    import sys
+
+    import typer
+
+    from .benchmarks import (
+        check_import_budgets,
+        compare_results,
+        dump_results,
+        iter_benchmarks,
+        load_results,
+        select_benchmarks,
+    )
+
+    if imports:
+        exceeded = False
+        for timing in check_import_budgets():
+            status = "OVER BUDGET" if timing.exceeded else "ok"
+            print(
+                f"import {timing.module}: {timing.seconds:.3f}s "
+                f"(budget {timing.budget:.3f}s) {status}"
+            )
+            exceeded |= timing.exceeded
+
+        if exceeded:
+            raise typer.Exit(code=1)
+        return
+
+    try:
+        selected = select_benchmarks(names)
+    except KeyError as error:
+        raise typer.BadParameter(error.args[0], param_hint="NAMES")
+
+    if list_cases:
+        print("\n".join(selected))
+        return
+
+    results = []
+    # cases may print while building their inputs, stdout is kept for the json
+    with contextlib.redirect_stdout(sys.stderr):
+        for result in iter_benchmarks(selected, scales=scale, repeat=repeat):
+            print(
+                f"{result.name} [{result.scale}]: {result.seconds:.4f}s, "
+                f"{result.memory / (1 << 20):.1f}MB"
+            )
+            results.append(result)
+
+    document = dump_results(results, output)
+    if output is None:
+        print(document)
+
+    if baseline is not None:
+        regressed = False
+        for comparison in compare_results(load_results(baseline), results, tolerance):
+            status = "REGRESSED" if comparison.regressed else "ok"
+            print(
+                f"{comparison.name} [{comparison.scale}]: {comparison.baseline:.4f}s -> "
+                f"{comparison.current:.4f}s (x{comparison.ratio:.2f}) {status}",
+                file=sys.stderr,
+            )
+            regressed |= comparison.regressed
+
+        if regressed:
+            raise typer.Exit(code=1)
+
+
+@app.command()
+def stats(
+    paths: List[Path] = Argument(..., help="COCO json files, optionally gzipped."),
+    dataset_type: str = Option(
+        "ODCocoDataset", help="Dataset class of the files, like FaceCocoDataset."
+    ),
+    output_format: OutputFormat = Option(
+        OutputFormat.table, "--format", "-f", help="Print tables or json."
+    ),
+    batch_size: int = Option(10000, help="Number of annotations read at once."),
+    workers: int = Option(1, help="Number of files processed in parallel."),
+):
+    """Count annotations per category and image, and histogram box sizes and areas"""
+    import json
+
+    import typer
+
+    import codantic.models
+    from codantic.models import files_stats, format_stats
+
+    dataset_class = getattr(codantic.models, dataset_type, None)
+    if not isinstance(dataset_class, type) or not issubclass(
+        dataset_class, codantic.models.CocoDataset
+    ):
+        raise typer.BadParameter(
+            f"{dataset_type} is not a dataset class", param_hint="--dataset-type"
+        )
+
+    results = files_stats(dataset_class, paths, batch_size=batch_size, workers=workers)
+    if output_format == OutputFormat.json:
+        document = {str(path): result.to_dict() for path, result in zip(paths, results)}
+        print(json.dumps(document, indent=2))
+        return
+
+    for path, result in zip(paths, results):
+        print(f"== {path}\n")
+        print(format_stats(result))
+        print()
@@ -0,0 +1,5 @@
+from .footprint import *
+from .runner import *
+from .startup import *
+from .synthetic import *
+from . import cases
@@ -0,0 +1,197 @@
+import contextlib
+import functools
+import io
+import os
+import tempfile
+from typing import *
+
+import numpy as np
+
+from .runner import benchmark_registry
+from .synthetic import (
+    synthetic_coco_json,
+    synthetic_detection_datasets,
+    synthetic_video_dataset,
+)
+
+# json files generated for the load cases, kept for the whole session
+SYNTHETIC_FILES = {
+    "detection": dict(),
+    "faces": dict(annotations_per_image=5, num_categories=1, num_landmarks=68),
+    "captions": dict(annotations_per_image=5, num_categories=1, captions=True),
+}
+
+
+@functools.lru_cache(maxsize=None)
+def synthetic_file(kind: str, scale: int) -> str:
+    path = os.path.join(tempfile.mkdtemp(prefix="codantic-bench-"), f"{kind}.json")
+    synthetic_coco_json(path, scale, **SYNTHETIC_FILES[kind])
+    return path
+
+
+def bench_load(scale: int, kind: str, dataset_type: str, **options: bool) -> Callable:
+    import codantic.models
+
+    path = synthetic_file(kind, scale)
+    dataset_type = getattr(codantic.models, dataset_type)
+    return lambda: dataset_type.load(path, **options)
+
+
+@benchmark_registry.register(key="models.load")
+def bench_load_detection(scale: int) -> Callable:
+    return bench_load(scale, "detection", "ODCocoDataset")
+
+
+@benchmark_registry.register(key="models.load.columnar")
+def bench_load_detection_columnar(scale: int) -> Callable:
+    return bench_load(scale, "detection", "ODCocoDataset", columnar=True)
+
+
+@benchmark_registry.register(key="models.load.lazy")
+def bench_load_detection_lazy(scale: int) -> Callable:
+    return bench_load(scale, "detection", "ODCocoDataset", lazy=True)
+
+
+@benchmark_registry.register(key="models.load_faces")
+def bench_load_faces(scale: int) -> Callable:
+    return bench_load(scale, "faces", "FaceCocoDataset")
+
+
+@benchmark_registry.register(key="models.load_faces.columnar")
+def bench_load_faces_columnar(scale: int) -> Callable:
+    return bench_load(scale, "faces", "FaceCocoDataset", columnar=True)
+
+
+@benchmark_registry.register(key="models.load_faces.lazy")
+def bench_load_faces_lazy(scale: int) -> Callable:
+    return bench_load(scale, "faces", "FaceCocoDataset", lazy=True)
+
+
+@benchmark_registry.register(key="models.load_captions")
+def bench_load_captions(scale: int) -> Callable:
+    return bench_load(scale, "captions", "CaptionCocoDataset")
+
+
+@benchmark_registry.register(key="core.to_df")
+def bench_core_to_df(scale: int) -> Callable:
+    dataset = synthetic_video_dataset(scale)
+    return dataset.to_df
+
+
+@benchmark_registry.register(key="core.from_df")
+def bench_core_from_df(scale: int) -> Callable:
+    from codantic.core.coco import Dataset
+
+    df = synthetic_video_dataset(scale).to_df()
+    return lambda: Dataset.from_df(df)
+
+
+@benchmark_registry.register(key="core.convert_bbox")
+def bench_convert_bbox(scale: int) -> Callable:
+    from codantic.core.bbox import BBoxType, convert_bbox
+
+    boxes = np.random.default_rng(0).uniform(0, 512, size=(scale, 4)).tolist()
+
+    def run():
+        for bbox in boxes:
+            convert_bbox(bbox, BBoxType.ltwh, BBoxType.xywh)
+
+    return run
+
+
+@benchmark_registry.register(key="core.convert_bboxes")
+def bench_convert_bboxes(scale: int) -> Callable:
+    from codantic.core.bbox import BBoxType, convert_bboxes
+
+    boxes = np.random.default_rng(0).uniform(0, 512, size=(scale, 4))
+    return lambda: convert_bboxes(boxes, BBoxType.ltwh, BBoxType.xywh)
+
+
+@benchmark_registry.register(key="models.annotation_groups")
+def bench_annotation_groups(scale: int) -> Callable:
+    gold, _ = synthetic_detection_datasets(max(1, scale // 7))
+
+    def run():
+        gold.invalidate_index()
+        return gold.get_annotation_groups()
+
+    return run
+
+
+@benchmark_registry.register(key="models.write_json")
+def bench_write_json(scale: int) -> Callable:
+    gold, _ = synthetic_detection_datasets(max(1, scale // 7))
+    path = os.path.join(tempfile.mkdtemp(prefix="codantic-bench-"), "dataset.json")
+    return lambda: gold.write_json(path)
+
+
+def bench_attribute_access(scale: int, compact: bool) -> Callable:
+    import operator
+
+    gold, _ = synthetic_detection_datasets(max(1, scale // 7))
+    annotations = gold.to_compact() if compact else list(gold.annotations)
+    getter = operator.attrgetter("image_id", "category_id", "bbox")
+    return lambda: list(map(getter, annotations))
+
+
+@benchmark_registry.register(key="models.attribute_access")
+def bench_attribute_access_dataclass(scale: int) -> Callable:
+    return bench_attribute_access(scale, compact=False)
+
+
+@benchmark_registry.register(key="models.attribute_access.compact")
+def bench_attribute_access_compact(scale: int) -> Callable:
+    return bench_attribute_access(scale, compact=True)
+
+
+@benchmark_registry.register(key="evaluator.align_categories")
+def bench_align_categories(scale: int) -> Callable:
+    from codantic.evaluator.object_detector import align_categories
+
+    gold, pred = synthetic_detection_datasets(max(1, scale // 7))
+    return lambda: align_categories(gold, pred)
+
+
+def bench_evaluator(scale: int, engine: str, stage: str = None) -> Callable:
+    """Time the evaluator up to `stage`, or only `stage` with the earlier stages run beforehand"""
+    from codantic.evaluator import EvalEngine, ODCocoEvaluator
+
+    gold, pred = synthetic_detection_datasets(max(1, scale // 7))
+    evaluator = ODCocoEvaluator(gold, pred, engine=EvalEngine(engine))
+    stages = ("evaluate", "accumulate", "summarize")
+
+    def run_stages(names: Sequence[str]):
+        with contextlib.redirect_stdout(io.StringIO()):
+            for name in names:
+                getattr(evaluator, name)()
+
+    if stage is None:
+        return lambda: run_stages(stages[:2])
+
+    run_stages(stages[: stages.index(stage)])
+    return lambda: run_stages([stage])
+
+
+@benchmark_registry.register(key="evaluator.native")
+def bench_evaluator_native(scale: int) -> Callable:
+    return bench_evaluator(scale, "native")
+
+
+@benchmark_registry.register(key="evaluator.native.evaluate")
+def bench_evaluator_native_evaluate(scale: int) -> Callable:
+    return bench_evaluator(scale, "native", "evaluate")
+
+
+@benchmark_registry.register(key="evaluator.native.accumulate")
+def bench_evaluator_native_accumulate(scale: int) -> Callable:
+    return bench_evaluator(scale, "native", "accumulate")
+
+
+@benchmark_registry.register(key="evaluator.native.summarize")
+def bench_evaluator_native_summarize(scale: int) -> Callable:
+    return bench_evaluator(scale, "native", "summarize")
+
+
+@benchmark_registry.register(key="evaluator.pycocotools")
+def bench_evaluator_pycocotools(scale: int) -> Callable:
+    return bench_evaluator(scale, "pycocotools")
@@ -0,0 +1,133 @@
+import gc
+import operator
+import time
+import tracemalloc
+from typing import *
+
+import numpy as np
+from mousse import Dataclass
+
+__all__ = ["Footprint", "compare_footprints", "measure_footprint", "synthetic_records"]
+
+
+class Footprint(Dataclass):
+    name: str
+    # memory retained by the records, shared field values excluded
+    bytes_per_record: float
+    # time to read one field of one record
+    access_ns: float
+
+
+def measure_footprint(
+    name: str,
+    build: Callable[[], Sequence[Any]],
+    fields: Sequence[str],
+    repeat: int = 3,
+) -> Footprint:
+    """Memory and attribute access time of records built by `build`
+
+    Args:
+        name (str): label of the measurement
+        build (Callable[[], Sequence[Any]]): function building the records
+        fields (Sequence[str]): fields read for the access time
+        repeat (int, optional): keep the best access time out of this many passes. Defaults to 3.
+
+    Returns:
+        Footprint: measurement
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        records = build()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    getter = operator.attrgetter(*fields)
+    seconds = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for record in records:
+            getter(record)
+        seconds = min(seconds, time.perf_counter() - start)
+
+    reads = max(1, len(records) * len(fields))
+    return Footprint(
+        name=name,
+        bytes_per_record=size / max(1, len(records)),
+        access_ns=seconds / reads * 1e9,
+    )
+
+
+def synthetic_records(
+    num_annotations: int, seed: int = 0
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Json records of random images, categories and detection annotations, keyed by field name"""
+    rng = np.random.default_rng(seed)
+    num_images = max(1, num_annotations // 10)
+    boxes = rng.uniform(0, 512, size=(num_annotations, 4)).tolist()
+    image_ids = rng.integers(0, num_images, size=num_annotations).tolist()
+    category_ids = rng.integers(0, 80, size=num_annotations).tolist()
+
+    return dict(
+        images=[
+            dict(image_id=image_id, file_name=f"{image_id}.jpg", width=512, height=512)
+            for image_id in range(num_images)
+        ],
+        categories=[
+            dict(category_id=category_id, name=f"category_{category_id}")
+            for category_id in range(80)
+        ],
+        annotations=[
+            dict(
+                annotation_id=annotation_id,
+                image_id=image_id,
+                category_id=category_id,
+                bbox=bbox,
+                area=bbox[2] * bbox[3],
+            )
+            for annotation_id, (image_id, category_id, bbox) in enumerate(
+                zip(image_ids, category_ids, boxes)
+            )
+        ],
+    )
+
+
+def compare_footprints(num_annotations: int = 10000, seed: int = 0) -> List[Footprint]:
+    """Measure the Dataclass models against their compact counterparts
+
+    Both are built from the same json records, so only what each
+    representation adds on top of the field values is counted.
+
+    Args:
+        num_annotations (int, optional): number of annotations, with a tenth as many images. Defaults to 10000.
+        seed (int, optional): random seed. Defaults to 0.
+
+    Returns:
+        List[Footprint]: one measurement per model and representation
+    """
+    from codantic.models import Category, Image, ODAnnotation, compact_type
+
+    records = synthetic_records(num_annotations, seed=seed)
+    models = [
+        ("annotations", ODAnnotation, ("image_id", "category_id", "bbox")),
+        ("images", Image, ("image_id", "width", "height")),
+        ("categories", Category, ("category_id", "name")),
+    ]
+
+    footprints = []
+    for key, model, fields in models:
+        items = records[key]
+        compact = compact_type(model)
+        footprints.append(
+            measure_footprint(
+                model.__name__, lambda: [model(**item) for item in items], fields
+            )
+        )
+        footprints.append(
+            measure_footprint(
+                compact.__name__, lambda: [compact(**item) for item in items], fields
+            )
+        )
+
+    return footprints
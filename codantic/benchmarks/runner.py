@@ -0,0 +1,225 @@
+import fnmatch
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import *
+
+from mousse import Dataclass, Registry
+from mousse.types import get_fields_info
+
+__all__ = [
+    "BenchmarkResult",
+    "Comparison",
+    "benchmark_registry",
+    "compare_results",
+    "current_rss",
+    "dump_results",
+    "iter_benchmarks",
+    "load_results",
+    "run_benchmarks",
+    "select_benchmarks",
+]
+
+benchmark_registry = Registry.get("benchmark")
+
+
+class BenchmarkResult(Dataclass):
+    name: str
+    scale: int
+    seconds: float
+    throughput: float = None
+    # growth of the resident set while the output of the case is alive, in bytes
+    memory: int = None
+
+
+def current_rss() -> int:
+    """Resident set size of the process in bytes, or its peak where unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def select_benchmarks(patterns: Sequence[str] = None) -> List[str]:
+    """Registered cases matching any of some shell-style patterns, like "evaluator.*"
+
+    Raises:
+        KeyError: when a pattern matches no case
+    """
+    names = sorted(benchmark_registry.keys())
+    if not patterns:
+        return names
+
+    selected = []
+    for pattern in patterns:
+        matches = fnmatch.filter(names, pattern)
+        if not matches:
+            raise KeyError(f"No benchmark matches {pattern!r}")
+        selected.extend(name for name in matches if name not in selected)
+
+    return selected
+
+
+def iter_benchmarks(
+    names: Sequence[str] = None, scales: Sequence[int] = (10000,), repeat: int = 1
+) -> Iterator[BenchmarkResult]:
+    """Time registered benchmark cases at several scales, yielding each result once measured
+
+    A case is a function taking the scale and returning the callable to time,
+    so that building its synthetic inputs is left out of the measurement. The
+    memory of a result is the largest growth of the resident set between
+    before a call and after it, while its output is still referenced.
+
+    Args:
+        names (Sequence[str], optional): cases to run. Defaults to every registered case.
+        scales (Sequence[int], optional): number of annotations to generate. Defaults to (10000,).
+        repeat (int, optional): keep the best time out of this many runs. Defaults to 1.
+
+    Yields:
+        BenchmarkResult: one result per case and scale
+    """
+    if names is None:
+        names = select_benchmarks()
+
+    for name in names:
+        case = benchmark_registry[name]
+        for scale in scales:
+            func = case(scale)
+            seconds = float("inf")
+            memory = 0
+            for _ in range(repeat):
+                rss = current_rss()
+                start = time.perf_counter()
+                output = func()
+                seconds = min(seconds, time.perf_counter() - start)
+                memory = max(memory, current_rss() - rss)
+                del output
+
+            del func
+            yield BenchmarkResult(
+                name=name,
+                scale=scale,
+                seconds=seconds,
+                throughput=scale / seconds if seconds > 0 else None,
+                memory=memory,
+            )
+
+
+def run_benchmarks(
+    names: Sequence[str] = None, scales: Sequence[int] = (10000,), repeat: int = 1
+) -> List[BenchmarkResult]:
+    """Time registered benchmark cases at several scales, see `iter_benchmarks`
+
+    Returns:
+        List[BenchmarkResult]: one result per case and scale
+    """
+    return list(iter_benchmarks(names, scales=scales, repeat=repeat))
+
+
+def environment() -> Dict[str, Any]:
+    """Versions and machine the results were measured with"""
+    import platform
+    from importlib import metadata
+
+    versions = {}
+    for package in ("codantic", "mousse", "numpy", "pandas", "pycocotools"):
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "packages": versions,
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def dump_results(
+    results: Sequence[BenchmarkResult], path: Union[str, Path] = None
+) -> str:
+    """Results as a json document, with the environment they were measured in
+
+    Args:
+        results (Sequence[BenchmarkResult]): results to dump
+        path (Union[str, Path], optional): file to write the document to. Defaults to None.
+
+    Returns:
+        str: json document
+    """
+    fields = list(get_fields_info(BenchmarkResult))
+    document = json.dumps(
+        {
+            "environment": environment(),
+            "results": [
+                {name: getattr(result, name) for name in fields} for result in results
+            ],
+        },
+        indent=2,
+    )
+    if path is not None:
+        Path(path).write_text(document)
+
+    return document
+
+
+def load_results(path: Union[str, Path]) -> List[BenchmarkResult]:
+    """Results of a json document written by `dump_results`"""
+    document = json.loads(Path(path).read_text())
+    return [BenchmarkResult(**result) for result in document["results"]]
+
+
+class Comparison(NamedTuple):
+    name: str
+    scale: int
+    baseline: float  # seconds
+    current: float  # seconds
+    ratio: float  # current over baseline, above 1 when slower
+    regressed: bool  # slower than the baseline by more than the tolerance
+
+
+def compare_results(
+    baseline: Sequence[BenchmarkResult],
+    results: Sequence[BenchmarkResult],
+    tolerance: float = 0.1,
+) -> List[Comparison]:
+    """Compare results to a baseline, case by case and scale by scale
+
+    Results without a baseline measurement are left out.
+
+    Args:
+        baseline (Sequence[BenchmarkResult]): reference results, e.g. from `load_results`
+        results (Sequence[BenchmarkResult]): new results
+        tolerance (float, optional): relative slowdown allowed before flagging a regression. Defaults to 0.1.
+
+    Returns:
+        List[Comparison]: one comparison per result having a baseline
+    """
+    reference = {(result.name, result.scale): result.seconds for result in baseline}
+    comparisons = []
+    for result in results:
+        seconds = reference.get((result.name, result.scale))
+        if seconds is None:
+            continue
+
+        ratio = result.seconds / seconds if seconds > 0 else float("inf")
+        comparisons.append(
+            Comparison(
+                name=result.name,
+                scale=result.scale,
+                baseline=seconds,
+                current=result.seconds,
+                ratio=ratio,
+                regressed=ratio > 1 + tolerance,
+            )
+        )
+
+    return comparisons
@@ -0,0 +1,90 @@
+import subprocess
+import sys
+from typing import *
+
+from .runner import benchmark_registry
+
+__all__ = ["IMPORT_BUDGETS", "ImportTiming", "check_import_budgets", "import_time"]
+
+# seconds allowed for importing each module in a fresh interpreter, startup excluded
+IMPORT_BUDGETS = {
+    "codantic": 0.05,
+    "codantic.app": 0.2,
+    "codantic.models": 0.5,
+}
+
+
+class ImportTiming(NamedTuple):
+    module: str
+    seconds: float
+    budget: float
+    exceeded: bool
+
+
+def import_time(module: str, repeat: int = 3) -> float:
+    """Best time to import a module in a fresh interpreter, interpreter startup excluded
+
+    Args:
+        module (str): dotted name of the module
+        repeat (int, optional): number of interpreters to start. Defaults to 3.
+
+    Returns:
+        float: seconds
+    """
+    code = (
+        "import time; start = time.perf_counter(); "
+        f"import {module}; print(time.perf_counter() - start)"
+    )
+    seconds = float("inf")
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        )
+        seconds = min(seconds, float(output.stdout.split()[-1]))
+
+    return seconds
+
+
+def check_import_budgets(
+    budgets: Dict[str, float] = None, repeat: int = 3
+) -> List[ImportTiming]:
+    """Time the import of modules against their budget
+
+    Args:
+        budgets (Dict[str, float], optional): seconds allowed per module. Defaults to IMPORT_BUDGETS.
+        repeat (int, optional): number of interpreters started per module. Defaults to 3.
+
+    Returns:
+        List[ImportTiming]: one timing per module, flagged when over budget
+    """
+    budgets = IMPORT_BUDGETS if budgets is None else budgets
+    timings = []
+    for module, budget in budgets.items():
+        seconds = import_time(module, repeat=repeat)
+        timings.append(ImportTiming(module, seconds, budget, seconds > budget))
+
+    return timings
+
+
+def bench_import(module: str) -> Callable:
+    return lambda: import_time(module, repeat=1)
+
+
+@benchmark_registry.register(key="startup.import_codantic")
+def bench_import_codantic(scale: int) -> Callable:
+    return bench_import("codantic")
+
+
+@benchmark_registry.register(key="startup.import_app")
+def bench_import_app(scale: int) -> Callable:
+    return bench_import("codantic.app")
+
+
+@benchmark_registry.register(key="startup.import_models")
+def bench_import_models(scale: int) -> Callable:
+    return bench_import("codantic.models")
+
+
+@benchmark_registry.register(key="startup.import_evaluator")
+def bench_import_evaluator(scale: int) -> Callable:
+    return bench_import("codantic.evaluator")
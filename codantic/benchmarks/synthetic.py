@@ -0,0 +1,243 @@
+from pathlib import Path
+from typing import *
+
+import numpy as np
+
+__all__ = [
+    "synthetic_detection_datasets",
+    "synthetic_coco_json",
+    "synthetic_video_dataset",
+]
+
+
+def synthetic_video_dataset(
+    num_annotations: int,
+    annotations_per_image: int = 10,
+    num_categories: int = 80,
+    frames_per_video: int = 100,
+    seed: int = 0,
+):
+    """Build a `codantic.core.coco.Dataset` of random ltwh boxes over video frames
+
+    Args:
+        num_annotations (int): number of annotations
+        annotations_per_image (int, optional): average number of annotations per frame. Defaults to 10.
+        num_categories (int, optional): number of categories. Defaults to 80.
+        frames_per_video (int, optional): number of frames per video. Defaults to 100.
+        seed (int, optional): random seed. Defaults to 0.
+
+    Returns:
+        Dataset: synthetic dataset, with annotations in random order
+    """
+    from codantic.core.coco import Annotation, Category, Dataset, Image, Video
+
+    rng = np.random.default_rng(seed)
+    num_images = max(1, num_annotations // annotations_per_image)
+    num_videos = max(1, -(-num_images // frames_per_video))
+
+    dataset = Dataset()
+    dataset.videos = [
+        Video(
+            video_id=video_id,
+            name=f"video_{video_id}",
+            num_frame=frames_per_video,
+        )
+        for video_id in range(num_videos)
+    ]
+    dataset.images = [
+        Image(image_id=image_id, video_id=image_id // frames_per_video)
+        for image_id in range(num_images)
+    ]
+    dataset.categories = [
+        Category(category_id=category_id, name=f"category_{category_id}")
+        for category_id in range(num_categories)
+    ]
+
+    image_ids = rng.integers(0, num_images, size=num_annotations).tolist()
+    category_ids = rng.integers(0, num_categories, size=num_annotations).tolist()
+    boxes = rng.uniform(0, 512, size=(num_annotations, 4)).tolist()
+    dataset.annotations = [
+        Annotation(
+            annotation_id=annotation_id,
+            image_id=image_id,
+            video_id=image_id // frames_per_video,
+            category_id=category_id,
+            bbox=bbox,
+        )
+        for annotation_id, (image_id, category_id, bbox) in enumerate(
+            zip(image_ids, category_ids, boxes)
+        )
+    ]
+    return dataset
+
+
+def synthetic_detection_datasets(
+    num_images: int,
+    annotations_per_image: int = 7,
+    false_positives_per_image: int = 20,
+    num_categories: int = 80,
+    seed: int = 0,
+):
+    """Build columnar gold and prediction `ODCocoDataset`s
+
+    Predictions jitter most gold boxes and add random false positives, which
+    gives realistic matching workloads for the evaluator.
+
+    Args:
+        num_images (int): number of images
+        annotations_per_image (int, optional): average number of gold boxes per image. Defaults to 7.
+        false_positives_per_image (int, optional): average number of random predictions per image. Defaults to 20.
+        num_categories (int, optional): number of categories. Defaults to 80.
+        seed (int, optional): random seed. Defaults to 0.
+
+    Returns:
+        Tuple[ODCocoDataset, ODCocoDataset]: gold and prediction datasets
+    """
+    from codantic.models import Category, Image, ODAnnotation, ODAnnotationStore
+    from codantic.models.object_detection import ODCocoDataset
+
+    rng = np.random.default_rng(seed)
+
+    def random_boxes(size: int) -> np.ndarray:
+        boxes = np.empty((size, 4))
+        boxes[:, :2] = rng.uniform(0, 512, size=(size, 2))
+        boxes[:, 2:] = rng.lognormal(3.5, 1.0, size=(size, 2)).clip(1, 512)
+        return boxes
+
+    num_gold = int(rng.poisson(annotations_per_image, size=num_images).sum())
+    gold_images = np.sort(rng.integers(0, num_images, size=num_gold))
+    gold_categories = rng.integers(0, num_categories, size=num_gold)
+    gold_boxes = random_boxes(num_gold)
+
+    detected = np.flatnonzero(rng.random(num_gold) < 0.8)
+    jittered = gold_boxes[detected] + rng.normal(0, 0.1, size=(len(detected), 4)) * (
+        gold_boxes[detected, 2:].repeat(2, axis=1)
+    )
+    jittered[:, 2:] = jittered[:, 2:].clip(1)
+
+    num_noise = int(rng.poisson(false_positives_per_image, size=num_images).sum())
+    pred_images = np.concatenate(
+        [gold_images[detected], rng.integers(0, num_images, size=num_noise)]
+    )
+    pred_categories = np.concatenate(
+        [gold_categories[detected], rng.integers(0, num_categories, size=num_noise)]
+    )
+    pred_boxes = np.concatenate([jittered, random_boxes(num_noise)])
+    num_pred = len(pred_images)
+
+    fields = dict(
+        images=[Image(image_id=image_id) for image_id in range(num_images)],
+        categories=[
+            Category(category_id=category_id, name=f"category_{category_id}")
+            for category_id in range(num_categories)
+        ],
+    )
+
+    gold = ODAnnotationStore(
+        ODAnnotation,
+        columns=dict(
+            annotation_id=np.arange(1, num_gold + 1),
+            image_id=gold_images,
+            category_id=gold_categories,
+            bbox=gold_boxes,
+            area=gold_boxes[:, 2] * gold_boxes[:, 3],
+        ),
+    )
+    pred = ODAnnotationStore(
+        ODAnnotation,
+        columns=dict(
+            annotation_id=np.arange(1, num_pred + 1),
+            image_id=pred_images,
+            category_id=pred_categories,
+            bbox=pred_boxes,
+            area=pred_boxes[:, 2] * pred_boxes[:, 3],
+            score=rng.random(num_pred),
+        ),
+    )
+
+    return (
+        ODCocoDataset.from_store(gold, **fields),
+        ODCocoDataset.from_store(pred, **fields),
+    )
+
+
+def synthetic_coco_json(
+    path: Union[str, Path],
+    num_annotations: int,
+    annotations_per_image: int = 10,
+    num_categories: int = 80,
+    num_landmarks: int = 0,
+    captions: bool = False,
+    shard_size: int = 100000,
+    seed: int = 0,
+):
+    """Write a COCO json file of random ltwh boxes, streamed shard by shard
+
+    Annotations are generated and encoded `shard_size` at a time, so files of
+    millions of annotations are written in bounded memory.
+
+    Args:
+        path (Union[str, Path]): output file, gzipped if it ends with .gz
+        num_annotations (int): number of annotations
+        annotations_per_image (int, optional): number of annotations per image. Defaults to 10.
+        num_categories (int, optional): number of categories. Defaults to 80.
+        num_landmarks (int, optional): number of (x, y) landmarks per annotation, as for faces. Defaults to 0.
+        captions (bool, optional): give every annotation a caption. Defaults to False.
+        shard_size (int, optional): number of annotations generated at once. Defaults to 100000.
+        seed (int, optional): random seed. Defaults to 0.
+    """
+    import json
+
+    from codantic.io import JSONWriter
+
+    rng = np.random.default_rng(seed)
+    num_images = max(1, -(-num_annotations // annotations_per_image))
+
+    def image_shards() -> Iterator[str]:
+        for start in range(0, num_images, shard_size):
+            images = [
+                dict(id=image_id, file_name=f"{image_id}.jpg", width=512, height=512)
+                for image_id in range(start, min(start + shard_size, num_images))
+            ]
+            yield json.dumps(images)[1:-1]
+
+    def annotation_shards() -> Iterator[str]:
+        for start in range(0, num_annotations, shard_size):
+            size = min(shard_size, num_annotations - start)
+            boxes = rng.uniform(0, 512, size=(size, 4)).round(2)
+            annotations = [
+                dict(
+                    id=annotation_id,
+                    image_id=annotation_id // annotations_per_image,
+                    category_id=category_id,
+                    bbox=bbox,
+                    area=round(bbox[2] * bbox[3], 2),
+                )
+                for annotation_id, category_id, bbox in zip(
+                    range(start, start + size),
+                    rng.integers(0, num_categories, size=size).tolist(),
+                    boxes.tolist(),
+                )
+            ]
+            if num_landmarks:
+                landmarks = rng.uniform(0, 512, size=(size, num_landmarks, 2)).round(2)
+                for annotation, points in zip(annotations, landmarks.tolist()):
+                    annotation["landmarks"] = points
+            if captions:
+                words = rng.integers(0, 1000, size=(size, 8)).tolist()
+                for annotation, caption in zip(annotations, words):
+                    annotation["caption"] = " ".join(f"word{word}" for word in caption)
+            yield json.dumps(annotations)[1:-1]
+
+    with JSONWriter(path) as writer:
+        writer.write("info", dict(description="synthetic"))
+        writer.write("licenses", [])
+        writer.write_array("images", image_shards(), encoded=True)
+        writer.write_array("annotations", annotation_shards(), encoded=True)
+        writer.write_array(
+            "categories",
+            (
+                dict(id=category_id, name=f"category_{category_id}")
+                for category_id in range(num_categories)
+            ),
+        )
@@ -17,7 +17,7 @@ class Annotation(Dataclass, dynamic=True):
     category_id: int = -1
     bbox: BBox = None
 
-    def __build__(self):
+    def __build__(self, *args, **kwargs):
         if self.bbox is None:
             for btype, fields in bbox_fields.items():
                 if all(hasattr(self, field) for field in fields):
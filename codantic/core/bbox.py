@@ -1,9 +1,23 @@
+import sys
 from enum import Enum
 from typing import *
 
+import numpy as np
 from mousse.functional import compose
 
-__all__ = ["BBoxType", "BBox", "convert_bbox", "bbox_converter", "bbox_fields"]
+if TYPE_CHECKING:
+    import pandas as pd
+
+__all__ = [
+    "BBoxType",
+    "BBox",
+    "BBoxArray",
+    "bbox_iou",
+    "convert_bbox",
+    "convert_bboxes",
+    "bbox_converter",
+    "bbox_fields",
+]
 
 BBox = Sequence[float]
 
@@ -31,38 +45,135 @@ bbox_fields = {
 }
 
 
-bbox_converters = {}
+bbox_converters: Dict[str, Callable[[BBox], BBox]] = {}
+bbox_array_converters: Dict[str, Callable[[np.ndarray, np.ndarray], np.ndarray]] = {}
+
+# resolved conversions, keyed by (source, target, vectorized)
+resolved_converters: Dict[Tuple[BBoxType, BBoxType, bool], Callable] = {}
+
+
+def chain(*converters: Callable) -> Callable:
+    if len(converters) == 1:
+        return converters[0]
+
+    if converters[0] in bbox_array_converters.values():
+
+        def convert(boxes: np.ndarray, out: np.ndarray) -> np.ndarray:
+            for converter in converters:
+                boxes = converter(boxes, out)
+            return out
+
+        return convert
+
+    return compose(*converters[::-1])
+
+
+def resolve_converter(
+    source: BBoxType, target: BBoxType, vectorized: bool = False
+) -> Callable:
+    """Converter between two formats, going through ltrb when there is no direct one
+
+    Resolved converters are cached until a new converter is registered.
+    Vectorized converters take an (N, 4) array and an output array, which may
+    be the input itself, and return the output.
+    """
+    key = (source, target, vectorized)
+    if key in resolved_converters:
+        return resolved_converters[key]
+
+    converters = bbox_array_converters if vectorized else bbox_converters
+    direct = f"{source.value}2{target.value}"
+    source_to_ltrb = f"{source.value}2ltrb"
+    ltrb_to_target = f"ltrb2{target.value}"
+
+    if direct in converters:
+        converter = chain(converters[direct])
+    elif source_to_ltrb in converters and ltrb_to_target in converters:
+        converter = chain(converters[source_to_ltrb], converters[ltrb_to_target])
+    elif vectorized:
+        scalar = resolve_converter(source, target)
+
+        def converter(boxes: np.ndarray, out: np.ndarray) -> np.ndarray:
+            out[...] = [scalar(bbox) for bbox in boxes.tolist()]
+            return out
+
+    else:
+        raise BBoxConverterNotFoundException(source, target)
+
+    resolved_converters[key] = converter
+    return converter
 
 
 def convert_bbox(bbox: BBox, source: BBoxType, target: BBoxType) -> BBox:
     if source == target:
         return bbox
 
-    has_converter = False
+    return resolve_converter(source, target)(bbox)
 
-    converter = f"{source.value}2{target.value}"
-    if converter not in bbox_converters:
-        source_to_ltrb = f"{source.value}2ltrb"
-        ltrb_to_target = f"ltrb2{target.value}"
 
-        if source_to_ltrb in bbox_converters and ltrb_to_target in bbox_converters:
-            source_to_ltrb = bbox_converters[source_to_ltrb]
-            ltrb_to_target = bbox_converters[ltrb_to_target]
-            converter = compose(ltrb_to_target, source_to_ltrb)
-            has_converter = True
-    else:
-        converter = bbox_converters[converter]
-        has_converter = True
+def convert_bboxes(
+    boxes: Union[np.ndarray, "pd.DataFrame"],
+    source: BBoxType,
+    target: BBoxType,
+    out: Union[np.ndarray, "pd.DataFrame"] = None,
+) -> Union[np.ndarray, "pd.DataFrame"]:
+    """Convert a batch of boxes at once
 
-    if not has_converter:
-        raise BBoxConverterNotFoundException(source, target)
+    Args:
+        boxes (Union[np.ndarray, pd.DataFrame]): array of shape (N, 4), or a frame holding the columns of `source` listed in `bbox_fields`
+        source (BBoxType): format of the boxes
+        target (BBoxType): format to convert to
+        out (Union[np.ndarray, pd.DataFrame], optional): where to write the result, which may be `boxes` itself. Defaults to a new float array, or a copy of the frame.
 
-    return converter(bbox)
+    Returns:
+        Union[np.ndarray, pd.DataFrame]: converted boxes, with the columns of `target` set for frames
+    """
+    source, target = BBoxType(source), BBoxType(target)
 
+    # a frame can only be given once pandas is imported, which is not done here
+    pd = sys.modules.get("pandas")
+    if pd is not None and isinstance(boxes, pd.DataFrame):
+        frame = boxes.copy() if out is None else out
+        converted = convert_bboxes(
+            boxes[list(bbox_fields[source])].to_numpy(dtype=np.float64), source, target
+        )
+        for i, name in enumerate(bbox_fields[target]):
+            frame[name] = converted[:, i]
+        return frame
+
+    boxes = np.asarray(boxes)
+    if out is None:
+        dtype = boxes.dtype if np.issubdtype(boxes.dtype, np.floating) else np.float64
+        out = np.empty(boxes.shape, dtype=dtype)
+
+    if source == target:
+        if out is not boxes:
+            out[...] = boxes
+        return out
+
+    return resolve_converter(source, target, vectorized=True)(boxes, out)
+
+
+def bbox_converter(
+    func: Callable = None, *, vectorized: bool = False, name: str = None
+) -> Callable:
+    """Register a converter named `<source>2<target>`, like `ltrb2ltwh`
+
+    Vectorized converters take an (N, 4) array and an output array, which may
+    be the input itself, and return the output. They can share the name of a
+    per-box converter through `name`.
+    """
+
+    def register(func: Callable) -> Callable:
+        converters = bbox_array_converters if vectorized else bbox_converters
+        converters[name or func.__name__] = func
+        resolved_converters.clear()
+        return func
+
+    if func is None:
+        return register
 
-def bbox_converter(func: Callable[[BBox], BBox]):
-    bbox_converters[func.__name__] = func
-    return func
+    return register(func)
 
 
 @bbox_converter
@@ -107,3 +218,213 @@ def xywh2ltrb(bbox: BBox) -> BBox:
         bbox[0] + bbox[2] / 2,
         bbox[1] + bbox[3] / 2,
     ]
+
+
+@bbox_converter(vectorized=True, name="ltrb2ltwh")
+def ltrb2ltwh_array(boxes: np.ndarray, out: np.ndarray) -> np.ndarray:
+    size = boxes[:, 2:4] - boxes[:, 0:2]
+    out[:, 0:2] = boxes[:, 0:2]
+    out[:, 2:4] = size
+    return out
+
+
+@bbox_converter(vectorized=True, name="ltwh2ltrb")
+def ltwh2ltrb_array(boxes: np.ndarray, out: np.ndarray) -> np.ndarray:
+    corner = boxes[:, 2:4] + boxes[:, 0:2]
+    out[:, 0:2] = boxes[:, 0:2]
+    out[:, 2:4] = corner
+    return out
+
+
+@bbox_converter(vectorized=True, name="ltrb2xywh")
+def ltrb2xywh_array(boxes: np.ndarray, out: np.ndarray) -> np.ndarray:
+    center = (boxes[:, 0:2] + boxes[:, 2:4]) / 2
+    size = boxes[:, 2:4] - boxes[:, 0:2]
+    out[:, 0:2] = center
+    out[:, 2:4] = size
+    return out
+
+
+@bbox_converter(vectorized=True, name="xywh2ltrb")
+def xywh2ltrb_array(boxes: np.ndarray, out: np.ndarray) -> np.ndarray:
+    half = boxes[:, 2:4] / 2
+    corner = boxes[:, 0:2] - half
+    opposite = boxes[:, 0:2] + half
+    out[:, 0:2] = corner
+    out[:, 2:4] = opposite
+    return out
+
+
+def bbox_iou(dt: np.ndarray, gt: np.ndarray) -> np.ndarray:
+    """Pairwise IoU of ltwh boxes, batched over the leading axes
+
+    The operations are those of `pycocotools.mask.iou`, in the same order, so
+    float64 boxes get the same IoU as with pycocotools.
+
+    Args:
+        dt (np.ndarray): boxes of shape (..., D, 4)
+        gt (np.ndarray): boxes of shape (..., G, 4)
+
+    Returns:
+        np.ndarray: IoU of shape (..., D, G)
+    """
+    dt = dt[..., :, None, :]
+    gt = gt[..., None, :, :]
+
+    w = np.minimum(dt[..., 2] + dt[..., 0], gt[..., 2] + gt[..., 0]) - np.maximum(
+        dt[..., 0], gt[..., 0]
+    )
+    h = np.minimum(dt[..., 3] + dt[..., 1], gt[..., 3] + gt[..., 1]) - np.maximum(
+        dt[..., 1], gt[..., 1]
+    )
+    intersection = w * h
+    union = dt[..., 2] * dt[..., 3] + gt[..., 2] * gt[..., 3] - intersection
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        iou = intersection / union
+
+    return np.where((w > 0) & (h > 0), iou, 0.0)
+
+
+class BBoxArray:
+    """Batch of N boxes held in an (N, 4) array, tagged with their format.
+
+    Pairwise operations compare every box of `self` with every box of
+    `other` and return (N, M) arrays. With `pairwise=False` both batches must
+    have the same length and boxes are compared row by row, returning (N,)
+    arrays.
+    """
+
+    def __init__(self, data: Any, type: BBoxType = BBoxType.ltrb):
+        data = np.asarray(data)
+        if not np.issubdtype(data.dtype, np.floating):
+            data = data.astype(np.float64)
+
+        self.data = data.reshape(-1, 4)
+        self.type = BBoxType(type)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, key: Any) -> Union[np.ndarray, "BBoxArray"]:
+        if isinstance(key, (int, np.integer)):
+            return self.data[key]
+
+        return BBoxArray(self.data[key], self.type)
+
+    def __array__(self, dtype: Any = None, copy: bool = None) -> np.ndarray:
+        return self.data if dtype is None else self.data.astype(dtype)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(type={self.type.value}, size={len(self)})"
+
+    def to(self, type: BBoxType) -> "BBoxArray":
+        """Convert the boxes to another format"""
+        type = BBoxType(type)
+        if type == self.type:
+            return self
+
+        return BBoxArray(convert_bboxes(self.data, self.type, type), type)
+
+    def ltrb(self) -> "BBoxArray":
+        return self.to(BBoxType.ltrb)
+
+    def ltwh(self) -> "BBoxArray":
+        return self.to(BBoxType.ltwh)
+
+    def xywh(self) -> "BBoxArray":
+        return self.to(BBoxType.xywh)
+
+    @property
+    def width(self) -> np.ndarray:
+        if self.type == BBoxType.ltrb:
+            return self.data[:, 2] - self.data[:, 0]
+        return self.data[:, 2]
+
+    @property
+    def height(self) -> np.ndarray:
+        if self.type == BBoxType.ltrb:
+            return self.data[:, 3] - self.data[:, 1]
+        return self.data[:, 3]
+
+    @property
+    def area(self) -> np.ndarray:
+        return self.width * self.height
+
+    def clip(self, width: Any, height: Any) -> "BBoxArray":
+        """Clip boxes to images of the given size, broadcast over the boxes
+
+        Returns:
+            BBoxArray: clipped boxes in the same format
+        """
+        width = np.asarray(width, dtype=self.data.dtype)
+        height = np.asarray(height, dtype=self.data.dtype)
+
+        left, top, right, bottom = self.ltrb().data.T
+        clipped = np.stack(
+            (
+                np.clip(left, 0, width),
+                np.clip(top, 0, height),
+                np.clip(right, 0, width),
+                np.clip(bottom, 0, height),
+            ),
+            axis=-1,
+        )
+        return BBoxArray(clipped, BBoxType.ltrb).to(self.type)
+
+    def _corners(
+        self, other: "BBoxArray", pairwise: bool
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        a = self.ltrb().data
+        b = other.ltrb().data
+        if pairwise:
+            return a[:, None, :], b[None, :, :]
+
+        if len(a) != len(b):
+            raise ValueError(
+                f"Boxes compared row by row must have the same length, got {len(a)} and {len(b)}"
+            )
+        return a, b
+
+    def intersection(self, other: "BBoxArray", pairwise: bool = True) -> np.ndarray:
+        """Area of the intersection of boxes"""
+        a, b = self._corners(other, pairwise)
+        width = np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0])
+        height = np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1])
+        return np.maximum(width, 0) * np.maximum(height, 0)
+
+    def iou(self, other: "BBoxArray", pairwise: bool = True) -> np.ndarray:
+        """Intersection over union, computed like pycocotools"""
+        a, b = self.ltwh().data, other.ltwh().data
+        if pairwise:
+            return bbox_iou(a, b)
+
+        self._corners(other, pairwise)
+        return bbox_iou(a[:, None, :], b[:, None, :])[:, 0, 0]
+
+    def giou(self, other: "BBoxArray", pairwise: bool = True) -> np.ndarray:
+        """Generalized IoU, penalizing the empty part of the enclosing box"""
+        a, b = self._corners(other, pairwise)
+        intersection = self.intersection(other, pairwise)
+        area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+        area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+        union = area_a + area_b - intersection
+        enclosing = (
+            np.maximum(a[..., 2], b[..., 2]) - np.minimum(a[..., 0], b[..., 0])
+        ) * (np.maximum(a[..., 3], b[..., 3]) - np.minimum(a[..., 1], b[..., 1]))
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            iou = np.where(union > 0, intersection / union, 0.0)
+            penalty = np.where(enclosing > 0, (enclosing - union) / enclosing, 0.0)
+
+        return iou - penalty
+
+    def contains(self, other: "BBoxArray", pairwise: bool = True) -> np.ndarray:
+        """Whether boxes of `self` fully contain boxes of `other`"""
+        a, b = self._corners(other, pairwise)
+        return (
+            (a[..., 0] <= b[..., 0])
+            & (a[..., 1] <= b[..., 1])
+            & (a[..., 2] >= b[..., 2])
+            & (a[..., 3] >= b[..., 3])
+        )
@@ -1,15 +1,24 @@
+import copy
 from collections import defaultdict
 from typing import *
 
-import pandas as pd
+import numpy as np
 from mousse import Dataclass, Field, Registry
-from mousse.types import get_args, get_fields_info
+from mousse.types import Accessor, get_accessors_info, get_args, get_fields_info
+
+from codantic.models.columnar import set_raw_field
+from codantic.profiling import profiled, stage
 
 from .annotation import Annotation
+from .bbox import BBoxType, bbox_fields, convert_bboxes
 from .category import Category
 from .image import Image
+from .index import IndexedMetaclass, LazyIndex, cached_index
 from .video import Video
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 __all__ = ["Dataset", "Video", "Image", "Annotation", "Category", "dataset_registry"]
 
 dataset_registry = Registry.get("dataset")
@@ -22,36 +31,321 @@ class DatasetInfo(Dataclass, dynamic=True):
     date_created: str = None
 
 
+class DatasetIndex(LazyIndex):
+    """Cached lookups over a video dataset
+
+    Frames are ordered by image id inside each video. Annotation lookups are
+    row positions, sorted once by video then frame, so that a range of
+    frames is found by binary search instead of a scan of the annotations.
+    """
+
+    @cached_index("videos")
+    def videos(self, dataset: "Dataset") -> Dict[int, Video]:
+        return {video.video_id: video for video in dataset.videos}
+
+    @cached_index("images")
+    def images(self, dataset: "Dataset") -> Dict[Tuple[int, int], Image]:
+        return {(image.video_id, image.image_id): image for image in dataset.images}
+
+    @cached_index("images")
+    def video_frames(
+        self, dataset: "Dataset"
+    ) -> Dict[int, Tuple[np.ndarray, np.ndarray]]:
+        """Frame ids of every video in increasing order, with the positions of their images"""
+        video_ids = id_array(dataset.images, "video_id")
+        image_ids = id_array(dataset.images, "image_id")
+        order = np.lexsort((image_ids, video_ids))
+        return {
+            video_id: (image_ids[rows], rows)
+            for video_id, rows in split_sorted(video_ids, order).items()
+        }
+
+    @cached_index("annotations")
+    def keys(self, dataset: "Dataset") -> Dict[str, np.ndarray]:
+        """Video, image and track id of every annotation, -1 when missing"""
+        return {
+            key: id_array(dataset.annotations, key)
+            for key in ("video_id", "image_id", "track_id")
+        }
+
+    @cached_index("annotations")
+    def video_rows(
+        self, dataset: "Dataset"
+    ) -> Dict[int, Tuple[np.ndarray, np.ndarray]]:
+        """Annotation rows of every video ordered by frame, with their frame ids"""
+        video_ids, image_ids = self.keys["video_id"], self.keys["image_id"]
+        order = np.lexsort((image_ids, video_ids))
+        return {
+            video_id: (rows, image_ids[rows])
+            for video_id, rows in split_sorted(video_ids, order).items()
+        }
+
+    @cached_index("annotations")
+    def track_rows(self, dataset: "Dataset") -> Dict[int, np.ndarray]:
+        """Annotation rows of every track, ordered by video then frame"""
+        keys = self.keys
+        order = np.lexsort((keys["image_id"], keys["video_id"], keys["track_id"]))
+        runs = split_sorted(keys["track_id"], order)
+        runs.pop(-1, None)
+        return runs
+
+    def group_rows(self, keys: Tuple[str, ...]) -> Dict[Tuple, np.ndarray]:
+        """Annotation rows of every group of values of `keys`, cached per keys"""
+        return self.get(
+            f"group_rows{keys}",
+            ("annotations",),
+            lambda index, dataset: group_rows(dataset.annotations, keys, index.keys),
+        )
+
+    def annotation_rows(
+        self, video_id: int, start: Optional[int] = None, stop: Optional[int] = None
+    ) -> np.ndarray:
+        """Rows of the annotations of a video whose frame is in [start, stop), ordered by frame"""
+        rows, frames = self.video_rows.get(video_id, (EMPTY_ROWS, EMPTY_ROWS))
+        return rows[frame_slice(frames, start, stop)]
+
+    def image_positions(
+        self, video_id: int, start: Optional[int] = None, stop: Optional[int] = None
+    ) -> np.ndarray:
+        """Positions of the images of a video whose frame is in [start, stop), ordered by frame"""
+        frames, positions = self.video_frames.get(video_id, (EMPTY_ROWS, EMPTY_ROWS))
+        return positions[frame_slice(frames, start, stop)]
+
+
+EMPTY_ROWS = np.empty(0, dtype=np.int64)
+
+
+def id_array(items: Sequence[Any], key: str) -> np.ndarray:
+    """Integer field of every item, -1 when missing, unset or not a number"""
+    values = (getattr(item, key, None) for item in items)
+    return np.fromiter(
+        (value if is_id(value) else -1 for value in values),
+        dtype=np.int64,
+        count=len(items),
+    )
+
+
+def is_id(value: Any) -> bool:
+    return isinstance(value, (int, float, np.number)) and value == value
+
+
+def group_rows(
+    annotations: Sequence[Any], keys: Sequence[str], ids: Dict[str, np.ndarray]
+) -> Dict[Tuple, np.ndarray]:
+    """Rows of the annotations sharing the same values of `keys`, in order of first appearance
+
+    Keys found in `ids` are grouped by their cached integer arrays, reading
+    only their missing values from the annotations. Other keys are read from
+    every annotation and numbered in order of appearance.
+    """
+    count = len(annotations)
+    if not count:
+        return {}
+
+    codes = []
+    for key in keys:
+        if key in ids:
+            column = ids[key].copy()
+            rows = np.flatnonzero(column < 0)
+        else:
+            column = np.empty(count, dtype=np.int64)
+            rows = np.arange(count)
+
+        # values left to read get negative codes, apart from the ids
+        numbers: Dict[Hashable, int] = {}
+        values = (getattr(annotations[row], key, Ellipsis) for row in rows.tolist())
+        column[rows] = [
+            numbers.setdefault(value, -1 - len(numbers)) for value in values
+        ]
+        codes.append(column)
+
+    if not codes:
+        return {(): np.arange(count)}
+
+    order = np.lexsort(codes[::-1])
+    sorted_codes = np.stack(codes)[:, order]
+    starts = np.flatnonzero(np.any(np.diff(sorted_codes, axis=1), axis=0)) + 1
+    runs = sorted(np.split(order, starts), key=lambda run: run[0])
+    return {
+        tuple(getattr(annotations[run[0]], key, Ellipsis) for key in keys): run
+        for run in runs
+    }
+
+
+def split_sorted(keys: np.ndarray, order: np.ndarray) -> Dict[int, np.ndarray]:
+    """Runs of `order`, which sorts `keys`, sharing the same key"""
+    if not len(order):
+        return {}
+
+    sorted_keys = keys[order]
+    starts = np.flatnonzero(np.diff(sorted_keys)) + 1
+    runs = np.split(order, starts)
+    return dict(zip(sorted_keys[np.append(0, starts)].tolist(), runs))
+
+
+def frame_slice(frames: np.ndarray, start: Optional[int], stop: Optional[int]) -> slice:
+    """Slice of sorted frame ids in [start, stop)"""
+    lo = 0 if start is None else int(np.searchsorted(frames, start, side="left"))
+    hi = (
+        len(frames) if stop is None else int(np.searchsorted(frames, stop, side="left"))
+    )
+    return slice(lo, max(lo, hi))
+
+
+def fill_records(
+    record_type: Type, columns: Dict[str, List[Any]], size: int
+) -> List[Any]:
+    """Records built column-wise, their values stored without being parsed
+
+    Columns unknown to `record_type` become dynamic fields, sharing one
+    accessor per column where the constructor would create one per record.
+    Fields missing from `columns` take their default.
+    """
+    records = [record_type.__new__(record_type) for _ in range(size)]
+    fields = get_fields_info(record_type)
+    accessors = get_accessors_info(record_type)
+
+    for name, field in fields.items():
+        if name in columns:
+            continue
+        storage = accessors[name].storage
+        mutable = isinstance(field.default, (dict, list))
+        for record in records:
+            storage[id(record)] = (
+                copy.deepcopy(field.default) if mutable else field.default
+            )
+
+    for name, values in columns.items():
+        if name in fields:
+            accessor = accessors[name]
+        else:
+            dtype = type(values[0]) if values else object
+            field = Field(values[0] if values else None, factory=dtype)
+            field.annotation = dtype
+            field.private = name.startswith("_")
+            field.strict = fields[next(iter(fields))].strict
+            accessor = Accessor(name, field=field)
+            for record in records:
+                get_fields_info(record_type, record)[name] = field
+                get_accessors_info(record_type, record)[name] = accessor
+                object.__setattr__(record, name, accessor)
+
+        storage = accessor.storage
+        for record, value in zip(records, values):
+            storage[id(record)] = value
+
+    return records
+
+
 @dataset_registry.register()
-class Dataset(Dataclass, dynamic=True):
-    info: DatasetInfo = DatasetInfo()
+class Dataset(Dataclass, metaclass=IndexedMetaclass, dynamic=True):
+    info: DatasetInfo = Field(DatasetInfo(), factory=DatasetInfo)
     videos: List[Video] = []
     images: List[Image] = []
     annotations: List[Annotation] = []
     categories: List[Category] = []
 
+    @property
+    def index(self) -> DatasetIndex:
+        return DatasetIndex.of(self)
+
+    def invalidate_index(self):
+        """Drop cached lookups, needed after editing ids in place"""
+        self.index.invalidate()
+
     def groupby(self, *keys: List[str]) -> Dict[Hashable, "Dataset"]:
-        groups = defaultdict(Dataset)
-        for annotation in self.annotations:
-            group = tuple(getattr(annotation, key, Ellipsis) for key in keys)
-            groups[group].annotations.append(annotation)
-            
-        videos = {}
-        for video in self.videos:
-            videos[video.video_id] = video
-            
-        images = {}
-        for image in self.images:
-            images[(image.video_id, image.image_id)] = image
-                    
-        groups: Dict[Hashable, Dataset] = dict(groups)
-        for group, group_dataset in groups.items():
-            group_dataset.info = self.info
-            for annotation in group_dataset.annotations:
-                video = videos[annotation.video_id]
-                image = images[(annotation.video_id, annotation.image_id)]
-            
-        return groups
+        """Split annotations by the values of some of their fields
+
+        Args:
+            keys (List[str]): annotation fields to group by, a missing field counting as Ellipsis
+
+        Returns:
+            Dict[Hashable, Dataset]: mapping from tuple of values to a view holding the annotations of the group, with their images and videos
+        """
+        groups = self.index.group_rows(tuple(keys))
+        return {group: self._view(rows) for group, rows in groups.items()}
+
+    def frames(
+        self, video_id: int, start: Optional[int] = None, stop: Optional[int] = None
+    ) -> "Dataset":
+        """Frames of a video whose image id is in [start, stop)
+
+        Args:
+            video_id (int): video to select
+            start (Optional[int], optional): first frame. Defaults to the start of the video.
+            stop (Optional[int], optional): frame after the last one. Defaults to the end of the video.
+
+        Returns:
+            Dataset: view holding the images and annotations of the frames, ordered by frame, with their video
+        """
+        index = self.index
+        return self._view(
+            index.annotation_rows(video_id, start, stop),
+            image_positions=index.image_positions(video_id, start, stop),
+        )
+
+    def windows(
+        self, video_id: int, size: int, stride: Optional[int] = None
+    ) -> Iterator["Dataset"]:
+        """Sliding windows of consecutive frames over a video
+
+        A video shorter than `size` gives a single window holding every frame.
+
+        Args:
+            video_id (int): video to slide over
+            size (int): number of frames per window
+            stride (Optional[int], optional): number of frames between the starts of two windows. Defaults to `size`.
+
+        Yields:
+            Dataset: view of the frames of each window, see `frames`
+        """
+        stride = size if stride is None else stride
+        if size < 1 or stride < 1:
+            raise ValueError("size and stride must be positive")
+
+        frames, _ = self.index.video_frames.get(video_id, (EMPTY_ROWS, EMPTY_ROWS))
+        frames = frames.tolist()
+        for first in range(0, max(len(frames) - size, 0) + 1, stride):
+            window = frames[first : first + size]
+            if window:
+                yield self.frames(video_id, window[0], window[-1] + 1)
+
+    def track(self, track_id: int) -> List[Annotation]:
+        """Annotations of a track, ordered by video then frame"""
+        rows = self.index.track_rows.get(track_id, EMPTY_ROWS)
+        return [self.annotations[row] for row in rows.tolist()]
+
+    def _view(self, rows: np.ndarray, image_positions: np.ndarray = None) -> "Dataset":
+        """Dataset sharing some annotations of this one, with their images and videos
+
+        Images default to those the annotations refer to, in order of first
+        reference. Info and categories are shared as they are.
+        """
+        index = self.index
+        annotations = [self.annotations[row] for row in rows.tolist()]
+
+        if image_positions is None:
+            images = index.images
+            keys = zip(
+                index.keys["video_id"][rows].tolist(),
+                index.keys["image_id"][rows].tolist(),
+            )
+            images = [images[key] for key in dict.fromkeys(keys) if key in images]
+        else:
+            images = [self.images[position] for position in image_positions.tolist()]
+
+        videos = index.videos
+        video_ids = dict.fromkeys(image.video_id for image in images)
+        video_ids.update(dict.fromkeys(index.keys["video_id"][rows].tolist()))
+        videos = [videos[video_id] for video_id in video_ids if video_id in videos]
+
+        dataset = self.__class__.__new__(self.__class__)
+        set_raw_field(dataset, "info", self.info)
+        set_raw_field(dataset, "videos", videos)
+        set_raw_field(dataset, "images", images)
+        set_raw_field(dataset, "annotations", annotations)
+        set_raw_field(dataset, "categories", list(self.categories))
+        return dataset
 
     def get_annotation_groups(
         self, category_id: Optional[int] = None
@@ -73,87 +367,168 @@ class Dataset(Dataclass, dynamic=True):
         return annotation_type
 
     @classmethod
-    def from_df(cls, df: pd.DataFrame) -> "Dataset":
-        """[summary]
+    @profiled()
+    def from_df(cls, df: "pd.DataFrame", batch_size: int = 10000) -> "Dataset":
+        """Build a dataset from one row per annotation, leaving `df` untouched
+
+        Images are keyed by `(image_id, video_name)` and categories by
+        `category_name`, both numbered in order of first appearance.
 
         Args:
-            df (pd.DataFrame): [description]
+            df (pd.DataFrame): annotations with at least image_id, annotation_id and category_name columns
+            batch_size (int, optional): number of rows converted at once. Defaults to 10000.
+
+        Returns:
+            Dataset: dataset holding the annotations, images and categories of the frame
         """
+        import pandas as pd
+
         dataset: Dataset = cls()
+        annotation_type = cls.get_annotation_type()
 
-        images: Dict[Tuple[int, str], Image] = {}
-        categories: Dict[str, Category] = {}
+        category_names = df["category_name"].fillna(value="none")
+        category_ids, category_names = pd.factorize(category_names, sort=False)
+        dataset.categories = [
+            Category(category_id=category_id, name=name)
+            for category_id, name in enumerate(category_names.tolist())
+        ]
 
-        df.fillna(value="none", inplace=True)
-        annotation_type = cls.get_annotation_type()
+        if "video_name" in df:
+            video_names = df["video_name"].fillna(value="none")
+        else:
+            video_names = pd.Series("", index=df.index)
 
-        for item in df.itertuples():
-            video_name = getattr(item, "video_name", "")
-            image_id = (item.image_id, video_name)
-
-            if image_id not in images:
-                image = Image(image_id=item.image_id, video_name=video_name)
-                images[image_id] = image
-                dataset.images.append(image)
-
-            if item.category_name not in categories:
-                category = Category(
-                    category_id=len(categories), name=item.category_name
-                )
-                categories[item.category_name] = category
-                dataset.categories.append(category)
-
-            image = images[image_id]
-            category = categories[item.category_name]
-
-            annotation = annotation_type(
-                annotation_id=item.annotation_id,
-                image_id=image.image_id,
-                video_name=image.video_name,
-            )
-            annotation.category_id = category.category_id
-            annotation.load(item._asdict())
+        image_keys = pd.MultiIndex.from_arrays([df["image_id"], video_names])
+        image_positions, image_keys = image_keys.factorize()
+        image_ids = np.asarray(image_keys.get_level_values(0), dtype=object)
+        video_names = np.asarray(image_keys.get_level_values(1), dtype=object)
+        images = fill_records(
+            Image,
+            {"image_id": image_ids.tolist(), "video_name": video_names.tolist()},
+            len(image_keys),
+        )
 
-            dataset.annotations.append(annotation)
+        # boxes given as coordinate columns are converted for the whole frame,
+        # sparing `Annotation.__build__` from converting them one by one
+        bboxes = None
+        if "bbox" not in df:
+            for bbox_type, fields in bbox_fields.items():
+                if all(field in df for field in fields):
+                    bboxes = convert_bboxes(
+                        df[list(fields)].to_numpy(dtype=np.float64),
+                        bbox_type,
+                        BBoxType.ltwh,
+                    )
 
+        keys = [key for key in df.columns if key != "video_name"]
+        annotations = []
+        with stage("build"):
+            for start in range(0, len(df), batch_size):
+                stop = start + batch_size
+                batch = df.iloc[start:stop].fillna(value="none")
+                positions = image_positions[start:stop]
+                columns = {key: batch[key].tolist() for key in keys}
+                columns["image_id"] = image_ids[positions].tolist()
+                columns["video_name"] = video_names[positions].tolist()
+                columns["category_id"] = category_ids[start:stop].tolist()
+                if bboxes is not None:
+                    columns["bbox"] = bboxes[start:stop].tolist()
+                annotations.extend(fill_records(annotation_type, columns, len(batch)))
+
+        set_raw_field(dataset, "images", images)
+        set_raw_field(dataset, "annotations", annotations)
         return dataset
 
-    def to_df(self, columns: Sequence[str] = None) -> pd.DataFrame:
-        """[summary]
+    @profiled()
+    def to_df(
+        self, columns: Sequence[str] = None, chunksize: int = None
+    ) -> Union["pd.DataFrame", Iterator["pd.DataFrame"]]:
+        """Export annotations of known images, ordered by image then annotation id
+
+        Args:
+            columns (Sequence[str], optional): columns to keep. Defaults to None.
+            chunksize (int, optional): yield frames of at most this many rows instead. Defaults to None.
 
         Returns:
-            pd.DataFrame: [description]
+            Union[pd.DataFrame, Iterator[pd.DataFrame]]: one row per annotation
         """
-        images_id = tuple(image.image_id for image in self.images)
-        annotations = [
-            annotation
-            for annotation in self.annotations
-            if annotation.image_id in images_id
-        ]
+        annotations = self.get_sorted_annotations()
+        categories = {
+            category.category_id: category.name for category in self.categories
+        }
 
-        annotations.sort(
-            key=lambda annotation: (
-                images_id.index(annotation.image_id),
-                annotation.annotation_id,
+        if chunksize is not None:
+            return (
+                build_df(annotations[start : start + chunksize], categories, columns)
+                for start in range(0, len(annotations), chunksize)
             )
+
+        return build_df(annotations, categories, columns)
+
+    def get_sorted_annotations(self) -> List[Annotation]:
+        """Annotations sorted like the images they belong to, those of unknown images left out
+
+        Returns:
+            List[Annotation]: annotations of known images, ordered by image position then annotation id
+        """
+        positions: Dict[int, int] = {}
+        for position, image in enumerate(self.images):
+            positions.setdefault(image.image_id, position)
+
+        image_positions = np.fromiter(
+            (positions.get(annotation.image_id, -1) for annotation in self.annotations),
+            dtype=np.int64,
+            count=len(self.annotations),
+        )
+        annotation_ids = np.fromiter(
+            (annotation.annotation_id for annotation in self.annotations),
+            dtype=np.int64,
+            count=len(self.annotations),
         )
 
-        categories = {
-            category.category_id: category.name for category in self.categories
-        }
+        order = np.lexsort((annotation_ids, image_positions))
+        order = order[image_positions[order] >= 0]
+        return [self.annotations[i] for i in order.tolist()]
+
+
+@profiled()
+def build_df(
+    annotations: Sequence[Annotation],
+    categories: Dict[int, str],
+    columns: Sequence[str] = None,
+) -> "pd.DataFrame":
+    """Build a DataFrame column by column from the fields of the annotations"""
+    import pandas as pd
+
+    values: Dict[str, Tuple[List[int], List[Any]]] = {
+        "image_id": ([], []),
+        "annotation_id": ([], []),
+        "category_name": ([], []),
+    }
+
+    for row, annotation in enumerate(annotations):
+        for key, val in annotation:
+            if key not in values:
+                values[key] = ([], [])
+
+            rows, column = values[key]
+            rows.append(row)
+            column.append(val)
 
-        data = []
-        for annotation in annotations:
-            item = {
-                "image_id": annotation.image_id,
-                "annotation_id": annotation.annotation_id,
-                "category_name": categories.get(annotation.category_id),
-            }
+    data = {}
+    for key, (rows, column) in values.items():
+        if len(rows) < len(annotations):
+            padded = [None] * len(annotations)
+            for row, val in zip(rows, column):
+                padded[row] = val
+            column = padded
+        data[key] = column
 
-            item.update(annotation.dump())
-            data.append(item)
+    df = pd.DataFrame(data=data)
+    if "category_id" in df:
+        df["category_name"] = df["category_id"].map(categories)
 
-        if columns is not None:
-            return pd.DataFrame(data=data, columns=columns)
+    if columns is not None:
+        return df.reindex(columns=columns)
 
-        return pd.DataFrame(data=data)
+    return df
@@ -0,0 +1,152 @@
+import weakref
+from functools import wraps
+from typing import *
+
+from mousse.types import DataMetaclass, get_accessors_info, get_fields_info
+
+__all__ = [
+    "IndexedMetaclass",
+    "LazyIndex",
+    "VersionedList",
+    "cached_index",
+    "fingerprint",
+]
+
+
+def fingerprint(items: Sized) -> Tuple[int, int, int]:
+    """Cheap signature of a list, changing when it is replaced, resized or bumped"""
+    return id(items), len(items), getattr(items, "version", 0)
+
+
+def bump_version(method: Callable) -> Callable:
+    @wraps(method)
+    def wrapper(self: "VersionedList", *args, **kwargs):
+        self.version += 1
+        return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+class VersionedList(list):
+    """List counting its in-place changes in `version`, so that indexes over it notice them"""
+
+    __slots__ = ("version",)
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.version = 0
+
+    append = bump_version(list.append)
+    extend = bump_version(list.extend)
+    insert = bump_version(list.insert)
+    pop = bump_version(list.pop)
+    remove = bump_version(list.remove)
+    clear = bump_version(list.clear)
+    sort = bump_version(list.sort)
+    reverse = bump_version(list.reverse)
+    __setitem__ = bump_version(list.__setitem__)
+    __delitem__ = bump_version(list.__delitem__)
+    __iadd__ = bump_version(list.__iadd__)
+    __imul__ = bump_version(list.__imul__)
+
+    def __reduce__(self):
+        # rebuilt from its items, since unpickling would append them before setting `version`
+        return self.__class__, (list(self),)
+
+
+def versioned_getter(accessor: Any) -> Callable[[Any, Any], Any]:
+    def getter(obj: Any, val: Any) -> Any:
+        if type(val) is list:
+            val = VersionedList(val)
+            accessor.storage[id(obj)] = val
+        return val
+
+    return getter
+
+
+class IndexedMetaclass(DataMetaclass):
+    """Metaclass of the datasets holding a LazyIndex
+
+    List fields are read as `VersionedList`, converted once on first read,
+    so that sorting or assigning items in place invalidates the lookups
+    built over them.
+    """
+
+    __tracked: Set[int] = set()
+
+    def __new__(mcs, *args, **kwargs):
+        cls = super().__new__(mcs, *args, **kwargs)
+        accessors = get_accessors_info(cls)
+        for key, field in get_fields_info(cls).items():
+            accessor = accessors[key]
+            if isinstance(field.default, list) and id(accessor) not in mcs.__tracked:
+                mcs.__tracked.add(id(accessor))
+                accessor.getter(versioned_getter(accessor), static=False)
+        return cls
+
+
+def cached_index(*sources: str):
+    """Turn a method into a property cached until one of the `sources` lists of the dataset changes"""
+
+    def decorator(func: Callable[["LazyIndex", Any], Any]):
+        @property
+        @wraps(func)
+        def wrapper(self: "LazyIndex"):
+            return self.get(func.__name__, sources, func)
+
+        return wrapper
+
+    return decorator
+
+
+class LazyIndex:
+    """Lookups over a dataset built on first use.
+
+    Each lookup is cached along with the fingerprint of the lists it was built
+    from, and rebuilt once any of them is replaced or changed in place, which
+    `IndexedMetaclass` tracks for list fields. Edits of the items themselves,
+    such as changing the id of an annotation, require a call to `invalidate`.
+    """
+
+    __indexes: "weakref.WeakKeyDictionary[Any, LazyIndex]" = weakref.WeakKeyDictionary()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.__indexes = weakref.WeakKeyDictionary()
+
+    def __init__(self, dataset: Any):
+        self._dataset = weakref.ref(dataset)
+        self._cache: Dict[str, Tuple[Tuple, Tuple, Any]] = {}
+
+    @classmethod
+    def of(cls, dataset: Any) -> "LazyIndex":
+        """Index attached to a dataset, created on first use"""
+        index = cls.__indexes.get(dataset)
+        if index is None:
+            index = cls(dataset)
+            cls.__indexes[dataset] = index
+        return index
+
+    @property
+    def dataset(self) -> Any:
+        return self._dataset()
+
+    def get(self, name: str, sources: Sequence[str], build: Callable) -> Any:
+        dataset = self.dataset
+        items = tuple(getattr(dataset, source) for source in sources)
+        key = tuple(fingerprint(source) for source in items)
+
+        cached = self._cache.get(name)
+        if (
+            cached is not None
+            and cached[1] == key
+            and all(a is b for a, b in zip(cached[0], items))
+        ):
+            return cached[2]
+
+        value = build(self, dataset)
+        self._cache[name] = (items, key, value)
+        return value
+
+    def invalidate(self):
+        self._cache.clear()
@@ -0,0 +1,88 @@
+from enum import Enum
+from typing import *
+
+import numpy as np
+
+__all__ = ["PackedRTree", "RegionMode", "region_mask"]
+
+
+class RegionMode(str, Enum):
+    intersect: str = "intersect"  # boxes overlapping the region with a positive area
+    contain: str = "contain"  # boxes lying inside the region
+
+
+def region_mask(boxes: np.ndarray, region: np.ndarray, mode: RegionMode) -> np.ndarray:
+    """Which ltrb `boxes` of shape (N, 4) match an ltrb `region` of shape (4,)"""
+    if RegionMode(mode) == RegionMode.contain:
+        return (
+            (boxes[:, 0] >= region[0])
+            & (boxes[:, 1] >= region[1])
+            & (boxes[:, 2] <= region[2])
+            & (boxes[:, 3] <= region[3])
+        )
+
+    return (np.minimum(boxes[:, 2], region[2]) > np.maximum(boxes[:, 0], region[0])) & (
+        np.minimum(boxes[:, 3], region[3]) > np.maximum(boxes[:, 1], region[1])
+    )
+
+
+class PackedRTree:
+    """Static R-tree over ltrb boxes, packed with Sort-Tile-Recursive.
+
+    Boxes are sorted into vertical slices by x center, then by y center
+    inside each slice, and packed `node_size` at a time into leaves. Upper
+    levels pack the bounds of the level below the same way, so the whole
+    tree is a list of bound arrays and a query walks it one level at a time.
+    """
+
+    def __init__(self, boxes: np.ndarray, node_size: int = 16):
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        self.node_size = node_size
+
+        size = len(boxes)
+        num_leaves = -(-size // node_size)
+        num_slices = max(1, int(np.ceil(np.sqrt(num_leaves))))
+        slice_size = num_slices * node_size
+
+        x_rank = np.argsort(np.argsort(boxes[:, 0] + boxes[:, 2], kind="stable"))
+        self.order = np.lexsort((boxes[:, 1] + boxes[:, 3], x_rank // slice_size))
+
+        self.levels = [boxes[self.order]]
+        while len(self.levels[-1]) > node_size:
+            level = self.levels[-1]
+            starts = np.arange(0, len(level), node_size)
+            self.levels.append(
+                np.concatenate(
+                    [
+                        np.minimum.reduceat(level[:, :2], starts),
+                        np.maximum.reduceat(level[:, 2:], starts),
+                    ],
+                    axis=1,
+                )
+            )
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def query(
+        self, region: Sequence[float], mode: RegionMode = RegionMode.intersect
+    ) -> np.ndarray:
+        """Positions of the boxes matching an ltrb region, in increasing order"""
+        region = np.asarray(region, dtype=np.float64)
+        candidates = np.arange(len(self.levels[-1]))
+
+        for level in reversed(range(1, len(self.levels))):
+            bounds = self.levels[level][candidates]
+            touched = (
+                (bounds[:, 0] <= region[2])
+                & (bounds[:, 2] >= region[0])
+                & (bounds[:, 1] <= region[3])
+                & (bounds[:, 3] >= region[1])
+            )
+            children = candidates[touched, None] * self.node_size + np.arange(
+                self.node_size
+            )
+            candidates = children[children < len(self.levels[level - 1])]
+
+        matched = region_mask(self.levels[0][candidates], region, mode)
+        return np.sort(self.order[candidates[matched]])
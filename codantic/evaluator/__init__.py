@@ -1 +1,4 @@
+from .cache import *
+from .engine import *
 from .object_detector import *
+from .parallel import *
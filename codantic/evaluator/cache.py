@@ -0,0 +1,100 @@
+from pathlib import Path
+from typing import *
+
+import numpy as np
+
+from codantic.io import BINARY_VERSION, DiskCache, content_key, hash_file
+
+from .engine import Detections
+
+__all__ = ["EvalCache", "GoldState", "dataset_key", "params_key"]
+
+# bumped whenever the layout of the cached values changes
+CACHE_VERSION = 1
+
+
+class GoldState(NamedTuple):
+    """Gold side of an evaluation, with categories aligned to the predictions"""
+
+    detections: Detections
+    image_ids: List[int]
+    classes: Tuple[str, ...]
+    coco: Any = None  # pycocotools index, for the pycocotools engine
+
+
+def dataset_key(dataset: Any) -> str:
+    """Hash of the content of a dataset read by the evaluator
+
+    Annotation columns, image ids and category names are hashed, so that
+    datasets differing only in other fields share their cached results.
+    """
+    detections = Detections.from_store(dataset.get_annotation_store())
+    image_ids = np.asarray(sorted(dataset.get_images_info()), dtype=np.int64)
+    categories = sorted(
+        (category.category_id, category.name.strip()) for category in dataset.categories
+    )
+    return content_key(
+        CACHE_VERSION,
+        f"{dataset.__class__.__module__}.{dataset.__class__.__qualname__}",
+        *detections,
+        image_ids,
+        categories,
+    )
+
+
+def params_key(params: Any) -> str:
+    """Hash of the pycocotools parameters changing the outcome of an evaluation"""
+    return content_key(
+        np.asarray(params.imgIds, dtype=np.int64),
+        np.asarray(params.catIds, dtype=np.int64),
+        np.asarray(params.iouThrs, dtype=np.float64),
+        np.asarray(params.recThrs, dtype=np.float64),
+        np.asarray(params.maxDets, dtype=np.int64),
+        np.asarray(params.areaRng, dtype=np.float64),
+        bool(params.useCats),
+        params.iouType,
+    )
+
+
+class EvalCache(DiskCache):
+    """Disk cache of the work repeated across evaluations against the same gold set
+
+    It holds parsed datasets, keyed by the content of their json file, the
+    aligned gold annotations with their pycocotools index, keyed by the
+    content of the gold dataset and the category names, and the matches of
+    every evaluated prediction set, keyed by the gold and prediction
+    content and the evaluation parameters.
+
+    Example:
+        cache = EvalCache("~/.cache/codantic")
+        for path in checkpoints:
+            evaluator = ODCocoEvaluator.from_files(gold_path, path, cache=cache)
+    """
+
+    def load_dataset(self, dataset_type: Type, path: Union[str, Path]) -> Any:
+        """Load a COCO json file, or its parsed copy when the file was loaded before
+
+        Args:
+            dataset_type (Type): dataset class, like ODCocoDataset
+            path (Union[str, Path]): path to the json file, optionally gzipped
+
+        Returns:
+            CocoDataset: columnar dataset
+        """
+        key = content_key(
+            CACHE_VERSION,
+            BINARY_VERSION,
+            f"{dataset_type.__module__}.{dataset_type.__qualname__}",
+            hash_file(path),
+        )
+        entry = self.get(key)
+        if entry is not None:
+            try:
+                return dataset_type.open_binary(entry)
+            except FileNotFoundError:
+                # evicted by another process in the meantime
+                pass
+
+        dataset = dataset_type.load(path, columnar=True)
+        self.put(key, dataset.save_binary)
+        return dataset
@@ -0,0 +1,394 @@
+from collections import defaultdict
+from typing import *
+
+import numpy as np
+
+from codantic.core.bbox import bbox_iou
+
+__all__ = [
+    "Detections",
+    "Matches",
+    "accumulate_matches",
+    "bbox_iou",
+    "count_gold",
+    "match_detections",
+]
+
+
+class Detections(NamedTuple):
+    """Annotation columns read by the evaluation engine, boxes in ltwh"""
+
+    annotation_id: np.ndarray
+    image_id: np.ndarray
+    category_id: np.ndarray
+    bbox: np.ndarray
+    area: np.ndarray
+    score: np.ndarray
+
+    @classmethod
+    def from_store(cls, store: Any) -> "Detections":
+        return cls(
+            annotation_id=store.annotation_id,
+            image_id=store.image_id,
+            category_id=store.category_id,
+            bbox=store.bbox.astype(np.float64),
+            area=store.area.astype(np.float64),
+            score=store.score.astype(np.float64),
+        )
+
+    def __len__(self) -> int:
+        return len(self.annotation_id)
+
+    @classmethod
+    def concat(cls, detections: Sequence["Detections"]) -> "Detections":
+        return cls(
+            *(
+                np.concatenate([detection[i] for detection in detections])
+                for i in range(len(cls._fields))
+            )
+        )
+
+    def take(self, rows: np.ndarray) -> "Detections":
+        return Detections(*(column[rows] for column in self))
+
+
+class Matches(NamedTuple):
+    """Outcome of matching the detections kept for evaluation.
+
+    Detections are indexed along the last axis. `matched` and `ignored` have
+    one row per area range and IoU threshold. Like pycocotools, which reads
+    the matched gold id as a boolean, a match with gold id 0 is not counted.
+    """
+
+    image_position: np.ndarray
+    category_position: np.ndarray
+    rank: np.ndarray
+    score: np.ndarray
+    matched: np.ndarray
+    ignored: np.ndarray
+
+    @classmethod
+    def empty(cls, num_areas: int, num_thresholds: int) -> "Matches":
+        return cls(
+            image_position=np.empty(0, dtype=np.int64),
+            category_position=np.empty(0, dtype=np.int64),
+            rank=np.empty(0, dtype=np.int64),
+            score=np.empty(0, dtype=np.float64),
+            matched=np.empty((num_areas, num_thresholds, 0), dtype=bool),
+            ignored=np.empty((num_areas, num_thresholds, 0), dtype=bool),
+        )
+
+    @classmethod
+    def concat(cls, matches: Sequence["Matches"]) -> "Matches":
+        return cls(
+            *(
+                np.concatenate([match[i] for match in matches], axis=-1)
+                for i in range(len(cls._fields))
+            )
+        )
+
+    def take(self, rows: np.ndarray) -> "Matches":
+        return Matches(*(column[..., rows] for column in self))
+
+
+def lookup(keys: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Positions of `values` in the sorted `keys`, with a mask of found values"""
+    positions = np.searchsorted(keys, values)
+    positions = np.minimum(positions, max(len(keys) - 1, 0))
+    found = keys[positions] == values if len(keys) else np.zeros(len(values), bool)
+    return positions, found
+
+
+def out_of_range(area: np.ndarray, area_ranges: np.ndarray) -> np.ndarray:
+    """Mask of shape (A, N) of areas outside each [min, max] range"""
+    return (area[None, :] < area_ranges[:, :1]) | (area[None, :] > area_ranges[:, 1:])
+
+
+def prepare(
+    detections: Detections, params: Any
+) -> Tuple[Detections, np.ndarray, np.ndarray]:
+    """Drop annotations outside the evaluated images and categories"""
+    image_ids = np.asarray(params.imgIds, dtype=np.int64)
+    category_ids = np.asarray(params.catIds, dtype=np.int64)
+
+    image_positions, image_found = lookup(image_ids, detections.image_id)
+    category_positions, category_found = lookup(category_ids, detections.category_id)
+    rows = np.flatnonzero(image_found & category_found)
+
+    return (
+        detections.take(rows),
+        image_positions[rows],
+        category_positions[rows],
+    )
+
+
+def count_gold(gold: Detections, params: Any) -> np.ndarray:
+    """Number of gold annotations counted for recall, per category and area range
+
+    Returns:
+        np.ndarray: counts of shape (K, A)
+    """
+    gold, _, category_positions = prepare(gold, params)
+    area_ranges = np.asarray(params.areaRng, dtype=np.float64)
+    counted = ~out_of_range(gold.area, area_ranges)
+
+    counts = np.zeros((len(params.catIds), len(area_ranges)), dtype=np.int64)
+    for a in range(len(area_ranges)):
+        counts[:, a] = np.bincount(
+            category_positions[counted[a]], minlength=len(params.catIds)
+        )
+    return counts
+
+
+def next_power_of_two(values: np.ndarray) -> np.ndarray:
+    return 1 << np.ceil(np.log2(np.maximum(values, 1))).astype(np.int64)
+
+
+def last_argmax(mask: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Index of the last maximum of `values` where `mask` holds, along the last axis"""
+    masked = np.where(mask, values, -np.inf)[..., ::-1]
+    index = masked.shape[-1] - 1 - np.argmax(masked, axis=-1)
+    return mask.any(axis=-1), index
+
+
+def match_bucket(
+    ious: np.ndarray,
+    gt_valid: np.ndarray,
+    gt_ignored: np.ndarray,
+    gt_ids: np.ndarray,
+    dt_valid: np.ndarray,
+    dt_ids: np.ndarray,
+    thresholds: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Greedy matching of padded (image, category) pairs
+
+    Detections are visited by decreasing score, all pairs, area ranges and
+    thresholds at once. Each takes the best available gold annotation, ties
+    going to the last one, preferring gold annotations which are not ignored.
+
+    Args:
+        ious (np.ndarray): IoU of shape (P, D, G)
+        gt_valid (np.ndarray): padding mask of shape (P, G)
+        gt_ignored (np.ndarray): ignore flags of shape (A, P, G)
+        gt_ids (np.ndarray): gold ids of shape (P, G)
+        dt_valid (np.ndarray): padding mask of shape (P, D)
+        dt_ids (np.ndarray): detection ids of shape (P, D)
+        thresholds (np.ndarray): IoU thresholds of shape (T,)
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: matched and ignore flags of shape (A, T, P, D)
+    """
+    num_pairs, num_dt, num_gt = ious.shape
+    num_areas = gt_ignored.shape[0]
+    shape = (num_areas, len(thresholds), num_pairs)
+
+    thresholds = np.minimum(thresholds, 1 - 1e-10)[None, :, None, None]
+    gt_ignored = gt_ignored[:, None]
+    gt_ids = np.broadcast_to(gt_ids, shape + (num_gt,))
+    gt_ignored_full = np.broadcast_to(gt_ignored, shape + (num_gt,))
+
+    taken = np.zeros(shape + (num_gt,), dtype=bool)
+    matched = np.zeros(shape + (num_dt,), dtype=bool)
+    ignored = np.zeros(shape + (num_dt,), dtype=bool)
+
+    for d in range(num_dt):
+        iou = ious[:, d, :]
+        available = (iou >= thresholds) & ~taken & gt_valid
+
+        has_kept, kept = last_argmax(available & ~gt_ignored, iou)
+        has_ignored, ignored_index = last_argmax(available & gt_ignored, iou)
+
+        hit = (has_kept | has_ignored) & dt_valid[:, d]
+        index = np.where(has_kept, kept, ignored_index)[..., None]
+
+        matched[..., d] = hit & (
+            np.take_along_axis(gt_ids, index, axis=-1)[..., 0] != 0
+        )
+        ignored[..., d] = (
+            hit & np.take_along_axis(gt_ignored_full, index, axis=-1)[..., 0]
+        )
+
+        # pycocotools only marks a gold annotation as taken for positive detection ids
+        mark = hit & (dt_ids[:, d] > 0)
+        taken_at = np.take_along_axis(taken, index, axis=-1)
+        np.put_along_axis(taken, index, taken_at | mark[..., None], axis=-1)
+
+    return matched, ignored
+
+
+def match_detections(gold: Detections, pred: Detections, params: Any) -> Matches:
+    """Match predictions to gold annotations like `COCOeval.evaluate`
+
+    Args:
+        gold (Detections): gold annotations
+        pred (Detections): predictions
+        params (Params): pycocotools evaluation parameters, with useCats enabled
+
+    Returns:
+        Matches: matching of the top `maxDets[-1]` predictions of every image and category
+    """
+    if not params.useCats:
+        raise ValueError("The native engine requires params.useCats")
+
+    thresholds = np.asarray(params.iouThrs, dtype=np.float64)
+    area_ranges = np.asarray(params.areaRng, dtype=np.float64)
+    num_categories = len(params.catIds)
+    max_dets = max(params.maxDets)
+
+    gold, gt_images, gt_categories = prepare(gold, params)
+    pred, dt_images, dt_categories = prepare(pred, params)
+    if not len(pred):
+        return Matches.empty(len(area_ranges), len(thresholds))
+
+    # predictions grouped by (image, category) and sorted by decreasing score,
+    # ties kept in dataset order as mergesort does in pycocotools
+    dt_pairs = dt_images * num_categories + dt_categories
+    order = np.lexsort((np.arange(len(pred)), -pred.score, dt_pairs))
+    dt_pairs = dt_pairs[order]
+    pairs, dt_starts, dt_counts = np.unique(
+        dt_pairs, return_index=True, return_counts=True
+    )
+    rank = np.arange(len(order)) - np.repeat(dt_starts, dt_counts)
+
+    kept = rank < max_dets
+    order, rank, dt_pairs = order[kept], rank[kept], dt_pairs[kept]
+    pred = pred.take(order)
+    pairs, dt_starts, dt_counts = np.unique(
+        dt_pairs, return_index=True, return_counts=True
+    )
+
+    gt_pairs = gt_images * num_categories + gt_categories
+    gt_order = np.argsort(gt_pairs, kind="stable")
+    gold = gold.take(gt_order)
+    gt_pairs = gt_pairs[gt_order]
+    gt_starts = np.searchsorted(gt_pairs, pairs, side="left")
+    gt_counts = np.searchsorted(gt_pairs, pairs, side="right") - gt_starts
+
+    gt_ignored = out_of_range(gold.area, area_ranges)
+    dt_out_of_range = out_of_range(pred.area, area_ranges)
+
+    matched = np.zeros((len(area_ranges), len(thresholds), len(pred)), dtype=bool)
+    ignored = np.zeros(matched.shape, dtype=bool)
+
+    # pad pairs of similar sizes together to keep the batched arrays dense
+    buckets = defaultdict(list)
+    both = np.flatnonzero(gt_counts > 0)
+    for bucket, pair in zip(
+        zip(
+            next_power_of_two(dt_counts[both]).tolist(),
+            next_power_of_two(gt_counts[both]).tolist(),
+        ),
+        both.tolist(),
+    ):
+        buckets[bucket].append(pair)
+
+    for (num_dt, num_gt), bucket in buckets.items():
+        bucket = np.asarray(bucket)
+
+        dt_offsets = np.arange(num_dt)
+        dt_valid = dt_offsets < dt_counts[bucket, None]
+        dt_rows = np.where(dt_valid, dt_starts[bucket, None] + dt_offsets, 0)
+
+        gt_offsets = np.arange(num_gt)
+        gt_valid = gt_offsets < gt_counts[bucket, None]
+        gt_rows = np.where(gt_valid, gt_starts[bucket, None] + gt_offsets, 0)
+
+        bucket_matched, bucket_ignored = match_bucket(
+            ious=bbox_iou(pred.bbox[dt_rows], gold.bbox[gt_rows]),
+            gt_valid=gt_valid,
+            gt_ignored=gt_ignored[:, gt_rows],
+            gt_ids=gold.annotation_id[gt_rows],
+            dt_valid=dt_valid,
+            dt_ids=pred.annotation_id[dt_rows],
+            thresholds=thresholds,
+        )
+
+        rows = dt_rows[dt_valid]
+        matched[..., rows] = bucket_matched[..., dt_valid]
+        ignored[..., rows] = bucket_ignored[..., dt_valid]
+
+    ignored |= ~matched & dt_out_of_range[:, None, :]
+
+    return Matches(
+        image_position=dt_images[order],
+        category_position=dt_categories[order],
+        rank=rank,
+        score=pred.score,
+        matched=matched,
+        ignored=ignored,
+    )
+
+
+def accumulate_matches(
+    matches: Matches, gold_counts: np.ndarray, params: Any
+) -> Dict[str, Any]:
+    """Precision and recall curves like `COCOeval.accumulate`
+
+    Args:
+        matches (Matches): matched predictions
+        gold_counts (np.ndarray): output of `count_gold`
+        params (Params): pycocotools evaluation parameters
+
+    Returns:
+        Dict[str, Any]: `COCOeval.eval` compatible dict, with precision of shape [TxRxKxAxM] and recall of shape [TxKxAxM]
+    """
+    thresholds = np.asarray(params.iouThrs)
+    recall_thresholds = np.asarray(params.recThrs)
+    max_dets = sorted(params.maxDets)
+    T, R, K = len(thresholds), len(recall_thresholds), len(params.catIds)
+    A, M = len(params.areaRng), len(max_dets)
+
+    precision = -np.ones((T, R, K, A, M))
+    recall = -np.ones((T, K, A, M))
+    scores = -np.ones((T, R, K, A, M))
+
+    order = np.lexsort(
+        (
+            matches.rank,
+            matches.image_position,
+            -matches.score,
+            matches.category_position,
+        )
+    )
+    matches = matches.take(order)
+    starts = np.searchsorted(matches.category_position, np.arange(K + 1))
+
+    for k in range(K):
+        category = matches.take(np.arange(starts[k], starts[k + 1]))
+        for m, max_det in enumerate(max_dets):
+            selected = category.take(np.flatnonzero(category.rank < max_det))
+            num_dt = len(selected.score)
+
+            for a in range(A):
+                num_gold = gold_counts[k, a]
+                if num_gold == 0:
+                    continue
+
+                kept = ~selected.ignored[a]
+                tp_sum = np.cumsum(selected.matched[a] & kept, axis=1)
+                fp_sum = np.cumsum(~selected.matched[a] & kept, axis=1)
+                tp_sum = tp_sum.astype(dtype=float)
+                fp_sum = fp_sum.astype(dtype=float)
+
+                rc = tp_sum / num_gold
+                pr = tp_sum / (fp_sum + tp_sum + np.spacing(1))
+                pr = np.maximum.accumulate(pr[:, ::-1], axis=1)[:, ::-1]
+                recall[:, k, a, m] = rc[:, -1] if num_dt else 0
+
+                for t in range(T):
+                    inds = np.searchsorted(rc[t], recall_thresholds, side="left")
+                    found = inds < num_dt
+                    q = np.zeros(R)
+                    ss = np.zeros(R)
+                    q[found] = pr[t, inds[found]]
+                    ss[found] = selected.score[inds[found]]
+                    precision[t, :, k, a, m] = q
+                    scores[t, :, k, a, m] = ss
+
+    return {
+        "params": params,
+        "counts": [T, R, K, A, M],
+        "precision": precision,
+        "recall": recall,
+        "scores": scores,
+    }
@@ -1,46 +1,323 @@
+import contextlib
+import copy
+import functools
+import io
 from enum import Enum
+from pathlib import Path
 from typing import *
 
 import numpy as np
 import pandas as pd
 from pycocotools.coco import COCO
 from pycocotools.cocoeval import COCOeval as BaseCOCOEval
+from pycocotools.cocoeval import Params
 
-from mousse import asdict
-
+from codantic.io import content_key
 from codantic.models import Category
-from codantic.models.object_detection import ODCocoDataset
+from codantic.models.columnar import ODAnnotationStore, record_to_dict, remap_ids
+from codantic.models.object_detection import ODAnnotation, ODCocoDataset
+from codantic.profiling import profiled, stage
+
+from .cache import EvalCache, GoldState, dataset_key, params_key
+from .engine import (
+    Detections,
+    Matches,
+    accumulate_matches,
+    count_gold,
+    lookup,
+    match_detections,
+)
+from .parallel import ParallelBackend, evaluate_images_parallel, evaluate_parallel
 
-__all__ = ["ODCocoEvaluator", "IOUType"]
+__all__ = ["ODCocoEvaluator", "IOUType", "EvalEngine"]
 
 
 class IOUType(Enum):
     bbox = "bbox"
 
 
+class EvalEngine(Enum):
+    native = "native"
+    pycocotools = "pycocotools"
+
+
 class ODCocoEvaluator(BaseCOCOEval):
+    @profiled()
     def __init__(
         self,
         gold_dataset: ODCocoDataset,
-        pred_dataset: ODCocoDataset,
+        pred_dataset: ODCocoDataset = None,
         iou_type: IOUType = IOUType.bbox,
+        engine: EvalEngine = EvalEngine.pycocotools,
+        workers: int = 1,
+        backend: ParallelBackend = ParallelBackend.process,
+        cache: EvalCache = None,
     ):
-        align_categories(gold_dataset, pred_dataset)
+        """
+        Args:
+            gold_dataset (ODCocoDataset): ground truth
+            pred_dataset (ODCocoDataset, optional): predictions. Defaults to no predictions, to be fed with `update` by the native engine.
+            iou_type (IOUType, optional): Defaults to IOUType.bbox.
+            engine (EvalEngine, optional): the native engine is vectorized, pycocotools is the reference. Defaults to EvalEngine.pycocotools.
+            workers (int, optional): number of workers sharing the images in `evaluate`. Defaults to 1.
+            backend (ParallelBackend, optional): run workers as processes or threads. Defaults to ParallelBackend.process.
+            cache (EvalCache, optional): reuse the aligned gold annotations and the matches of earlier evaluations. The gold dataset is then only aligned when missing from the cache. Defaults to None.
+        """
+        if pred_dataset is None:
+            pred_dataset = gold_dataset.__class__(
+                images=[], annotations=[], categories=list(gold_dataset.categories)
+            )
+
+        self.pred_categories = {
+            category.category_id: category.name.strip()
+            for category in pred_dataset.categories
+        }
+        self.engine = engine = EvalEngine(engine)
+        self.workers = workers
+        self.backend = ParallelBackend(backend)
+        self.cache = cache
+
+        categories, gold_ids, pred_ids = aligned_categories(gold_dataset, pred_dataset)
+        gold = None
+        self.gold_key = self.pred_key = None
+        if cache is not None:
+            self.pred_key = dataset_key(pred_dataset)
+            self.gold_key = content_key(
+                dataset_key(gold_dataset),
+                [category.name for category in categories],
+                iou_type.value,
+                engine.value,
+            )
+            gold = cache.load(self.gold_key)
 
-        gold_coco = COCO()
-        gold_coco.dataset = asdict(gold_dataset, by_alias=True)
-        gold_coco.createIndex()
+        if gold is None:
+            remap_categories(gold_dataset, categories, gold_ids, clear_attributes=True)
+            gold = GoldState(
+                detections=Detections.from_store(gold_dataset.get_annotation_store()),
+                image_ids=sorted(gold_dataset.get_images_info()),
+                classes=tuple(category.name for category in categories),
+                coco=(
+                    to_coco(gold_dataset) if engine == EvalEngine.pycocotools else None
+                ),
+            )
+            if cache is not None:
+                cache.dump(self.gold_key, gold)
+
+        remap_categories(pred_dataset, categories, pred_ids)
+
+        if engine == EvalEngine.pycocotools:
+            pred_coco = to_coco(pred_dataset)
+            super().__init__(cocoGt=gold.coco, cocoDt=pred_coco, iouType=iou_type.value)
+        else:
+            super().__init__(iouType=iou_type.value)
+            self.params.imgIds = list(gold.image_ids)
+            self.params.catIds = list(range(len(categories)))
+            self.matches = None
+            self.gold_counts = None
+
+        self.gold = gold.detections
+        self.pred = Detections.from_store(pred_dataset.get_annotation_store())
+        self.gold_order = np.argsort(self.gold.image_id, kind="stable")
+        self.pred_image_ids = np.unique(self.pred.image_id)
+
+        self.classes = gold.classes
+
+    @classmethod
+    def from_files(
+        cls,
+        gold_path: Union[str, Path],
+        pred_path: Union[str, Path] = None,
+        cache: EvalCache = None,
+        dataset_type: Type[ODCocoDataset] = ODCocoDataset,
+        **kwargs,
+    ) -> "ODCocoEvaluator":
+        """Evaluate COCO json files, parsed through the cache when given
+
+        Args:
+            gold_path (Union[str, Path]): ground truth json file
+            pred_path (Union[str, Path], optional): predictions json file. Defaults to no predictions.
+            cache (EvalCache, optional): cache of parsed files and evaluation results. Defaults to None.
+            dataset_type (Type[ODCocoDataset], optional): dataset class of both files. Defaults to ODCocoDataset.
+            kwargs: other arguments of the evaluator, like engine
+
+        Returns:
+            ODCocoEvaluator: evaluator of the predictions
+        """
+        if cache is None:
+            load = functools.partial(dataset_type.load, columnar=True)
+        else:
+            load = functools.partial(cache.load_dataset, dataset_type)
+
+        pred_dataset = None if pred_path is None else load(pred_path)
+        return cls(load(gold_path), pred_dataset, cache=cache, **kwargs)
+
+    @profiled()
+    def evaluate(self):
+        """Match predictions to gold annotations for every image and category
+
+        With several workers, images are split into contiguous shards holding
+        similar numbers of predictions, and the shards are evaluated
+        concurrently before their results are merged. With a cache, matches
+        of the same predictions and parameters are read back instead.
+        """
+        key = None
+        if self.cache is not None and self.pred_key is not None:
+            key = content_key(self.gold_key, self.pred_key, params_key(self.params))
+            cached = self.cache.load(key)
+            if cached is not None:
+                self._paramsEval, results = cached
+                self.params = copy.deepcopy(self._paramsEval)
+                if self.engine == EvalEngine.pycocotools:
+                    self.evalImgs = results
+                else:
+                    self.matches, self.gold_counts = results
+                return
+
+        self._evaluate()
+        if key is not None:
+            if self.engine == EvalEngine.pycocotools:
+                results = self.evalImgs
+            else:
+                results = (self.matches, self.gold_counts)
+            self.cache.dump(key, (self._paramsEval, results))
+
+    def _evaluate(self):
+        if self.engine == EvalEngine.pycocotools:
+            if self.workers <= 1:
+                return super().evaluate()
+
+            p = self.params
+            p.imgIds = list(np.unique(p.imgIds))
+            if p.useCats:
+                p.catIds = list(np.unique(p.catIds))
+            p.maxDets = sorted(p.maxDets)
+            self.evalImgs = evaluate_images_parallel(
+                self.gold, self.pred, p, self.workers, self.backend
+            )
+            self._paramsEval = copy.deepcopy(p)
+            return
+
+        p = self.params
+        p.imgIds = list(np.unique(p.imgIds))
+        p.catIds = list(np.unique(p.catIds))
+        p.maxDets = sorted(p.maxDets)
+        self._paramsEval = copy.deepcopy(p)
+        self.gold_counts = count_gold(self.gold, p)
+        if self.workers > 1:
+            self.matches = evaluate_parallel(
+                self.gold, self.pred, p, self.workers, self.backend
+            )
+        else:
+            self.matches = match_detections(self.gold, self.pred, p)
+
+    @profiled()
+    def accumulate(self, p: Params = None):
+        """Accumulate matches into precision and recall curves stored in `eval`"""
+        if self.engine == EvalEngine.pycocotools:
+            return super().accumulate(p)
+
+        if self.matches is None:
+            raise Exception("Please run evaluate() first")
+
+        if p is None:
+            p, gold_counts = self._paramsEval, self.gold_counts
+        else:
+            gold_counts = count_gold(self.gold, p)
 
-        pred_coco = COCO()
-        pred_coco.dataset = asdict(pred_dataset, by_alias=True)
-        pred_coco.createIndex()
+        self.eval = accumulate_matches(self.matches, gold_counts, p)
 
-        super().__init__(cocoGt=gold_coco, cocoDt=pred_coco, iouType=iou_type.value)
-        self.classes = tuple(category.name for category in gold_dataset.categories)
+    @profiled()
+    def update(self, pred_batch: Union[ODCocoDataset, Iterable[ODAnnotation]]):
+        """Match a batch of predictions, re-evaluating only the images it touches
+
+        Matches of the images seen in earlier batches are kept, so the cost of
+        an update grows with the size of the batch rather than with the number
+        of predictions seen so far. Parameters are fixed by the first update.
+
+        Args:
+            pred_batch (Union[ODCocoDataset, Iterable[ODAnnotation]]): predictions. Categories of a dataset are aligned by name, bare annotations use the category ids of the prediction dataset given at construction.
+        """
+        if self.engine != EvalEngine.native:
+            raise ValueError("Incremental evaluation requires the native engine")
+
+        if self.matches is None:
+            self.evaluate()
+
+        batch = self._to_detections(pred_batch)
+        if not len(batch):
+            return
+
+        p = self._paramsEval
+        batch_image_ids = np.unique(batch.image_id)
+        position = np.searchsorted(self.pred_image_ids, batch_image_ids)
+        seen = batch_image_ids[
+            position
+            < np.searchsorted(self.pred_image_ids, batch_image_ids, side="right")
+        ]
+
+        if len(seen):
+            # images fed again are matched from scratch with all their predictions
+            selected = np.isin(self.pred.image_id, seen)
+            batch_pred = Detections.concat([self.pred.take(selected), batch])
+
+            positions, found = lookup(np.asarray(p.imgIds, dtype=np.int64), seen)
+            kept = ~np.isin(self.matches.image_position, positions[found])
+            matches = self.matches.take(np.flatnonzero(kept))
+        else:
+            batch_pred, matches = batch, self.matches
+
+        batch_gold = self.gold.take(self._gold_rows(batch_image_ids))
+        self.matches = Matches.concat(
+            [matches, match_detections(batch_gold, batch_pred, p)]
+        )
+        self.pred = Detections.concat([self.pred, batch])
+        self.pred_image_ids = np.union1d(self.pred_image_ids, batch_image_ids)
+        # the predictions no longer match their key, so later matches are not cached
+        self.pred_key = None
+
+    @profiled()
+    def compute(self) -> pd.DataFrame:
+        """Summarize the predictions seen so far, without matching them again"""
+        if self.engine == EvalEngine.native and self.matches is None:
+            self.evaluate()
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.accumulate()
+
+        return self.summarize()
+
+    def _to_detections(
+        self, pred_batch: Union[ODCocoDataset, Iterable[ODAnnotation]]
+    ) -> Detections:
+        if isinstance(pred_batch, ODCocoDataset):
+            store = pred_batch.get_annotation_store()
+            names = {
+                category.category_id: category.name.strip()
+                for category in pred_batch.categories
+            }
+        else:
+            store = ODAnnotationStore.from_annotations(pred_batch, ODAnnotation)
+            names = self.pred_categories
+
+        detections = Detections.from_store(store)
+        category_id = remap_category_ids(
+            detections.category_id, names, list(self.classes)
+        )
+        return Detections(**{**detections._asdict(), "category_id": category_id})
+
+    def _gold_rows(self, image_ids: np.ndarray) -> np.ndarray:
+        sorted_ids = self.gold.image_id[self.gold_order]
+        starts = np.searchsorted(sorted_ids, image_ids, side="left")
+        counts = np.searchsorted(sorted_ids, image_ids, side="right") - starts
+        offsets = np.arange(counts.sum()) - np.repeat(
+            np.cumsum(counts) - counts, counts
+        )
+        return self.gold_order[np.repeat(starts, counts) + offsets]
 
     def _load_classes(self, x: int):
         return self.classes[int(x)]
 
+    @profiled()
     def summarize(self) -> pd.DataFrame:
         """
         Compute and display summary metrics for evaluation results.
@@ -130,38 +407,111 @@ class ODCocoEvaluator(BaseCOCOEval):
         return pd_stat
 
 
-def align_categories(gold_dataset: ODCocoDataset, pred_dataset: ODCocoDataset):
-    categories = set()
-
-    gold_categories = {}
-    for category in gold_dataset.categories:
-        name = category.name.strip()
-        gold_categories[category.category_id] = name
-        categories.add(name)
-
-    pred_categories = {}
-    for category in pred_dataset.categories:
-        name = category.name.strip()
-        pred_categories[category.category_id] = category.name
-        categories.add(name)
-
-    categories = list(categories)
-    categories.sort()
-    aligned_categories = [
-        Category(id=categories.index(category), name=category)
-        for category in categories
+@profiled()
+def to_coco(dataset: ODCocoDataset) -> COCO:
+    """Index a dataset with pycocotools, reading the annotations from columns"""
+    store = dataset.get_annotation_store()
+
+    annotations = [
+        {
+            "id": annotation_id,
+            "image_id": image_id,
+            "category_id": category_id,
+            "bbox": bbox,
+            "area": area,
+            "score": score,
+            "iscrowd": 0,
+        }
+        for annotation_id, image_id, category_id, bbox, area, score in zip(
+            store.annotation_id.tolist(),
+            store.image_id.tolist(),
+            store.category_id.tolist(),
+            store.bbox.tolist(),
+            store.area.tolist(),
+            store.score.tolist(),
+        )
     ]
 
-    gold_dataset.categories = aligned_categories
-    pred_dataset.categories = aligned_categories
+    coco = COCO()
+    coco.dataset = {
+        "images": [record_to_dict(image, by_alias=True) for image in dataset.images],
+        "categories": [
+            record_to_dict(category, by_alias=True) for category in dataset.categories
+        ],
+        "annotations": annotations,
+    }
+    with stage("createIndex"):
+        coco.createIndex()
+    return coco
 
-    for annotation in gold_dataset.annotations:
-        annotation.category_id = categories.index(
-            gold_categories[annotation.category_id]
-        )
-        annotation.attributes = {}
 
-    for annotation in pred_dataset.annotations:
-        annotation.category_id = categories.index(
-            pred_categories[annotation.category_id]
-        )
+def aligned_categories(
+    gold_dataset: ODCocoDataset, pred_dataset: ODCocoDataset
+) -> Tuple[List[Category], Dict[int, int], Dict[int, int]]:
+    """Categories of both datasets numbered by name, with the new id of every old one"""
+    gold_categories = {
+        category.category_id: category.name.strip()
+        for category in gold_dataset.categories
+    }
+    pred_categories = {
+        category.category_id: category.name.strip()
+        for category in pred_dataset.categories
+    }
+
+    categories = sorted({*gold_categories.values(), *pred_categories.values()})
+    positions = {category: i for i, category in enumerate(categories)}
+    aligned = [
+        Category(category_id=i, name=category) for i, category in enumerate(categories)
+    ]
+
+    gold_ids = {
+        category_id: positions[name] for category_id, name in gold_categories.items()
+    }
+    pred_ids = {
+        category_id: positions[name] for category_id, name in pred_categories.items()
+    }
+    return aligned, gold_ids, pred_ids
+
+
+def remap_categories(
+    dataset: ODCocoDataset,
+    categories: List[Category],
+    ids: Dict[int, int],
+    clear_attributes: bool = False,
+):
+    """Replace the categories of a dataset, renumbering its annotations with `ids`"""
+    dataset.categories = categories
+    if dataset.is_columnar:
+        store = dataset.annotations
+        store.category_id[:] = remap_ids(store.category_id, ids)
+        if clear_attributes:
+            for extra in store.extras.values():
+                extra.pop("attributes", None)
+    else:
+        for annotation in dataset.annotations:
+            annotation.category_id = ids[annotation.category_id]
+            if clear_attributes:
+                annotation.attributes = {}
+
+    dataset.invalidate_index()
+
+
+@profiled()
+def align_categories(gold_dataset: ODCocoDataset, pred_dataset: ODCocoDataset):
+    categories, gold_ids, pred_ids = aligned_categories(gold_dataset, pred_dataset)
+    remap_categories(gold_dataset, categories, gold_ids, clear_attributes=True)
+    remap_categories(pred_dataset, categories, pred_ids)
+
+
+def remap_category_ids(
+    category_ids: np.ndarray, names: Dict[int, str], categories: List[str]
+) -> np.ndarray:
+    """Translate a column of category ids through their names, without a per-row lookup
+
+    Ids whose name is not in `categories` are mapped to -1.
+    """
+    positions = {category: i for i, category in enumerate(categories)}
+    mapping = {
+        category_id: positions.get(name, -1) for category_id, name in names.items()
+    }
+    return remap_ids(category_ids, mapping)
@@ -0,0 +1,228 @@
+import contextlib
+import copy
+import io
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from enum import Enum
+from multiprocessing import shared_memory
+from typing import *
+
+import numpy as np
+
+from .engine import Detections, Matches, match_detections
+
+__all__ = ["ParallelBackend", "evaluate_parallel", "evaluate_images_parallel"]
+
+
+class ParallelBackend(str, Enum):
+    process: str = "process"
+    thread: str = "thread"
+
+
+class SharedArray(NamedTuple):
+    name: str
+    shape: Tuple[int, ...]
+    dtype: str
+
+
+class SharedDetections:
+    """Detections copied once into shared memory, attached by name in workers"""
+
+    def __init__(self, detections: Detections):
+        self.blocks: List[shared_memory.SharedMemory] = []
+        self.arrays: List[SharedArray] = []
+
+        for column in detections:
+            block = shared_memory.SharedMemory(create=True, size=max(column.nbytes, 1))
+            np.ndarray(column.shape, dtype=column.dtype, buffer=block.buf)[...] = column
+            self.blocks.append(block)
+            self.arrays.append(SharedArray(block.name, column.shape, column.dtype.str))
+
+    def close(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+
+@contextlib.contextmanager
+def attach(arrays: Sequence[SharedArray]) -> Iterator[Detections]:
+    # workers share the resource tracker of the parent, which registered the
+    # blocks already and unlinks them once the pool is done
+    blocks = [shared_memory.SharedMemory(name=array.name) for array in arrays]
+
+    try:
+        yield Detections(
+            *(
+                np.ndarray(array.shape, dtype=np.dtype(array.dtype), buffer=block.buf)
+                for array, block in zip(arrays, blocks)
+            )
+        )
+    finally:
+        for block in blocks:
+            block.close()
+
+
+def select_images(detections: Detections, image_ids: np.ndarray) -> Detections:
+    rows = np.flatnonzero(
+        (detections.image_id >= image_ids[0]) & (detections.image_id <= image_ids[-1])
+    )
+    return detections.take(rows)
+
+
+def match_shard(
+    gold: Union[Detections, Sequence[SharedArray]],
+    pred: Union[Detections, Sequence[SharedArray]],
+    params: Any,
+    image_ids: np.ndarray,
+) -> Matches:
+    if isinstance(gold, Detections):
+        return match_detections(
+            select_images(gold, image_ids), select_images(pred, image_ids), params
+        )
+
+    with attach(gold) as gold, attach(pred) as pred:
+        return match_shard(gold, pred, params, image_ids)
+
+
+def to_coco_dict(detections: Detections, image_ids: np.ndarray) -> Dict[str, Any]:
+    annotations = [
+        {
+            "id": annotation_id,
+            "image_id": image_id,
+            "category_id": category_id,
+            "bbox": bbox,
+            "area": area,
+            "score": score,
+            "iscrowd": 0,
+        }
+        for annotation_id, image_id, category_id, bbox, area, score in zip(
+            *(column.tolist() for column in detections)
+        )
+    ]
+    return {
+        "images": [{"id": image_id} for image_id in image_ids.tolist()],
+        "categories": [],
+        "annotations": annotations,
+    }
+
+
+def evaluate_images_shard(
+    gold: Union[Detections, Sequence[SharedArray]],
+    pred: Union[Detections, Sequence[SharedArray]],
+    params: Any,
+    image_ids: np.ndarray,
+) -> List[Optional[Dict[str, Any]]]:
+    from pycocotools.coco import COCO
+    from pycocotools.cocoeval import COCOeval
+
+    if not isinstance(gold, Detections):
+        with attach(gold) as gold, attach(pred) as pred:
+            return evaluate_images_shard(gold, pred, params, image_ids)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        cocos = []
+        for detections in (gold, pred):
+            coco = COCO()
+            coco.dataset = to_coco_dict(select_images(detections, image_ids), image_ids)
+            coco.createIndex()
+            cocos.append(coco)
+
+        evaluator = COCOeval(*cocos, iouType=params.iouType)
+        evaluator.params = copy.deepcopy(params)
+        evaluator.params.imgIds = image_ids.tolist()
+        evaluator.evaluate()
+
+    return evaluator.evalImgs
+
+
+def split_images(
+    pred: Detections, image_ids: np.ndarray, num_shards: int
+) -> List[np.ndarray]:
+    """Split sorted image ids into contiguous shards holding similar numbers of predictions"""
+    counts = np.bincount(
+        np.searchsorted(image_ids, pred.image_id).clip(0, len(image_ids) - 1),
+        minlength=len(image_ids),
+    )
+    # every image weighs at least one unit so that gold only images spread too
+    cumulative = np.cumsum(counts + 1)
+    bounds = np.searchsorted(
+        cumulative, np.linspace(0, cumulative[-1], num_shards + 1)[1:-1], side="right"
+    )
+    return [shard for shard in np.split(image_ids, bounds) if len(shard)]
+
+
+@contextlib.contextmanager
+def run_shards(
+    func: Callable,
+    gold: Detections,
+    pred: Detections,
+    params: Any,
+    workers: int,
+    backend: ParallelBackend,
+) -> Iterator[Tuple[List[np.ndarray], List[Any]]]:
+    image_ids = np.asarray(params.imgIds, dtype=np.int64)
+    shards = split_images(pred, image_ids, workers * 4) if len(image_ids) else []
+
+    shared = []
+    executor: Executor
+    if ParallelBackend(backend) == ParallelBackend.process:
+        shared = [SharedDetections(gold), SharedDetections(pred)]
+        gold, pred = (detections.arrays for detections in shared)
+        executor = ProcessPoolExecutor(max_workers=workers)
+    else:
+        executor = ThreadPoolExecutor(max_workers=workers)
+
+    try:
+        with executor:
+            futures = [
+                executor.submit(func, gold, pred, params, shard) for shard in shards
+            ]
+            yield shards, [future.result() for future in futures]
+    finally:
+        for detections in shared:
+            detections.close()
+
+
+def evaluate_parallel(
+    gold: Detections,
+    pred: Detections,
+    params: Any,
+    workers: int,
+    backend: ParallelBackend = ParallelBackend.process,
+) -> Matches:
+    """Match predictions with the native engine, sharding images across workers"""
+    with run_shards(match_shard, gold, pred, params, workers, backend) as (_, results):
+        if not results:
+            return Matches.empty(len(params.areaRng), len(params.iouThrs))
+
+        return Matches.concat(results)
+
+
+def evaluate_images_parallel(
+    gold: Detections,
+    pred: Detections,
+    params: Any,
+    workers: int,
+    backend: ParallelBackend = ParallelBackend.process,
+) -> List[Optional[Dict[str, Any]]]:
+    """Run `COCOeval.evaluate` over shards of images and merge their `evalImgs`
+
+    Returns:
+        List[Optional[Dict[str, Any]]]: per image evaluations laid out as [KxAxI], like `COCOeval.evalImgs`
+    """
+    image_ids = np.asarray(params.imgIds, dtype=np.int64)
+    num_categories = len(params.catIds) if params.useCats else 1
+    shape = (num_categories, len(params.areaRng))
+
+    evaluations = np.empty(shape + (len(image_ids),), dtype=object)
+    with run_shards(evaluate_images_shard, gold, pred, params, workers, backend) as (
+        shards,
+        results,
+    ):
+        for shard, result in zip(shards, results):
+            local = np.empty(len(result), dtype=object)
+            local[:] = result
+            positions = np.searchsorted(image_ids, shard)
+            evaluations[:, :, positions] = local.reshape(shape + (len(shard),))
+
+    return evaluations.ravel().tolist()
@@ -0,0 +1,4 @@
+from .binary import *
+from .cache import *
+from .json_stream import *
+from .json_writer import *
@@ -0,0 +1,145 @@
+import json
+import struct
+from pathlib import Path
+from typing import *
+
+import numpy as np
+
+__all__ = [
+    "BINARY_VERSION",
+    "decode_strings",
+    "encode_strings",
+    "read_arrays",
+    "write_arrays",
+]
+
+MAGIC = b"CODANTIC"
+BINARY_VERSION = 1
+ALIGNMENT = 64
+
+# magic, format version, length of the json header
+PREAMBLE = struct.Struct("<8sII")
+
+
+def align(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def write_arrays(
+    path: Union[str, Path], arrays: Dict[str, np.ndarray], meta: Dict[str, Any] = None
+):
+    """Write named arrays to a single file which can be memory-mapped
+
+    The file starts with a fixed preamble and a json header describing the
+    dtype, shape and offset of every array. Arrays follow, each aligned on 64
+    bytes and stored in little-endian C order.
+
+    Args:
+        path (Union[str, Path]): output file
+        arrays (Dict[str, np.ndarray]): arrays to store
+        meta (Dict[str, Any], optional): json serializable metadata kept in the header. Defaults to None.
+    """
+    arrays = {
+        name: np.ascontiguousarray(
+            array, dtype=np.asarray(array).dtype.newbyteorder("<")
+        )
+        for name, array in arrays.items()
+    }
+
+    entries = {}
+    offset = 0
+    for name, array in arrays.items():
+        entries[name] = {
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+            "offset": offset,
+        }
+        offset = align(offset + array.nbytes)
+
+    header = json.dumps({"arrays": entries, "meta": meta or {}}).encode("utf-8")
+    start = align(PREAMBLE.size + len(header))
+
+    with open(path, "wb") as f:
+        f.write(PREAMBLE.pack(MAGIC, BINARY_VERSION, len(header)))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(start + entries[name]["offset"])
+            f.write(array.tobytes())
+        f.truncate(start + offset)
+
+
+def read_arrays(
+    path: Union[str, Path], mmap: bool = True
+) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    """Read a file written by `write_arrays`
+
+    Args:
+        path (Union[str, Path]): input file
+        mmap (bool, optional): map the file instead of reading it. Pages are shared between processes mapping the same file and copied on write. Defaults to True.
+
+    Returns:
+        Tuple[Dict[str, np.ndarray], Dict[str, Any]]: arrays and metadata
+    """
+    with open(path, "rb") as f:
+        magic, version, size = PREAMBLE.unpack(f.read(PREAMBLE.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a codantic binary file")
+        if version > BINARY_VERSION:
+            raise ValueError(
+                f"{path} uses format version {version}, "
+                f"newer than the supported version {BINARY_VERSION}"
+            )
+        header = json.loads(f.read(size).decode("utf-8"))
+
+    start = align(PREAMBLE.size + size)
+    if mmap:
+        buffer = np.memmap(path, dtype=np.uint8, mode="c")
+    else:
+        buffer = np.fromfile(path, dtype=np.uint8)
+
+    arrays = {}
+    for name, entry in header["arrays"].items():
+        dtype = np.dtype(entry["dtype"])
+        shape = tuple(entry["shape"])
+        offset = start + entry["offset"]
+        count = int(np.prod(shape, dtype=np.int64))
+        arrays[name] = (
+            buffer[offset : offset + count * dtype.itemsize].view(dtype).reshape(shape)
+        )
+
+    return arrays, header["meta"]
+
+
+def encode_strings(values: Sequence[Optional[str]]) -> Dict[str, np.ndarray]:
+    """Pack strings into a table of utf-8 bytes with offsets
+
+    Returns:
+        Dict[str, np.ndarray]: `offsets` of length n + 1 and `data`, plus a `null` mask when some values are None
+    """
+    encoded = [b"" if value is None else value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+
+    table = {
+        "offsets": offsets,
+        "data": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+    }
+    if any(value is None for value in values):
+        table["null"] = np.array([value is None for value in values], dtype=bool)
+
+    return table
+
+
+def decode_strings(table: Dict[str, np.ndarray]) -> List[Optional[str]]:
+    """Unpack a table built by `encode_strings`"""
+    data = table["data"].tobytes()
+    offsets = table["offsets"].tolist()
+    values = [
+        data[start:end].decode("utf-8") for start, end in zip(offsets[:-1], offsets[1:])
+    ]
+
+    if "null" in table:
+        for row in np.flatnonzero(table["null"]).tolist():
+            values[row] = None
+
+    return values
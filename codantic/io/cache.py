@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+import pickle
+from pathlib import Path
+from typing import *
+
+import numpy as np
+
+__all__ = ["DiskCache", "content_key", "hash_file"]
+
+# content hashes of files, keyed by path, size and modification time
+FILE_HASHES: Dict[Tuple[str, int, int], str] = {}
+
+
+def new_hasher() -> "hashlib.blake2b":
+    return hashlib.blake2b(digest_size=16)
+
+
+def hash_file(path: Union[str, Path], chunk_size: int = 1 << 20) -> str:
+    """Hash of the content of a file, remembered until the file changes
+
+    Args:
+        path (Union[str, Path]): path to the file
+        chunk_size (int, optional): number of bytes hashed at once. Defaults to 1MB.
+
+    Returns:
+        str: hex digest
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    memo = (path, stat.st_size, stat.st_mtime_ns)
+    digest = FILE_HASHES.get(memo)
+    if digest is None:
+        hasher = new_hasher()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                hasher.update(chunk)
+        digest = FILE_HASHES[memo] = hasher.hexdigest()
+
+    return digest
+
+
+def update_hasher(hasher: "hashlib.blake2b", part: Any):
+    if isinstance(part, np.ndarray):
+        part = np.ascontiguousarray(part)
+        hasher.update(f"{part.dtype.str}{part.shape}".encode("utf-8"))
+        hasher.update(part.tobytes())
+    elif isinstance(part, bytes):
+        hasher.update(part)
+    else:
+        hasher.update(json.dumps(part, sort_keys=True, default=str).encode("utf-8"))
+    # separate parts, so that ("ab", "c") and ("a", "bc") differ
+    hasher.update(b"\0")
+
+
+def content_key(*parts: Any) -> str:
+    """Hash of a sequence of arrays, bytes and json serializable values
+
+    Args:
+        parts (Any): values the key depends on, in order
+
+    Returns:
+        str: hex digest
+    """
+    hasher = new_hasher()
+    for part in parts:
+        update_hasher(hasher, part)
+    return hasher.hexdigest()
+
+
+class DiskCache:
+    """Directory of values keyed by content hash, evicting the least recently used
+
+    Every entry is a file named after its key. Reading an entry touches it,
+    and once the entries exceed `max_bytes`, the least recently read ones
+    are removed. Entries are written to a temporary file first, so that
+    concurrent processes sharing the directory never read a partial entry.
+    """
+
+    def __init__(self, directory: Union[str, Path], max_bytes: int = 1 << 30):
+        """
+        Args:
+            directory (Union[str, Path]): directory of the entries, created if missing
+            max_bytes (int, optional): total size of the entries kept. Defaults to 1GB.
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+    def path(self, key: str) -> Path:
+        return self.directory / key
+
+    def __contains__(self, key: str) -> bool:
+        return self.path(key).exists()
+
+    def __len__(self) -> int:
+        return len(self.entries())
+
+    @property
+    def size(self) -> int:
+        """Total size of the entries, in bytes"""
+        return sum(stat.st_size for _, stat in self.entries())
+
+    def entries(self) -> List[Tuple[Path, os.stat_result]]:
+        """Entries with their stats, least recently used first"""
+        entries = []
+        for path in self.directory.iterdir():
+            if path.name.startswith("."):
+                continue
+            try:
+                entries.append((path, path.stat()))
+            except FileNotFoundError:
+                continue
+        return sorted(entries, key=lambda entry: entry[1].st_mtime_ns)
+
+    def get(self, key: str) -> Optional[Path]:
+        """Path of an entry, marked as used, or None when missing"""
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key: str, write: Callable[[Path], Any]) -> Path:
+        """Add an entry written by `write` to the path it is given, then evict old entries
+
+        Args:
+            key (str): key of the entry
+            write (Callable[[Path], Any]): function writing the entry to a file
+
+        Returns:
+            Path: path of the entry
+        """
+        path = self.path(key)
+        temp = self.directory / f".{key}.{os.getpid()}.tmp"
+        try:
+            write(temp)
+            os.replace(temp, path)
+        finally:
+            if temp.exists():
+                temp.unlink()
+
+        self.evict(keep=path)
+        return path
+
+    def load(self, key: str, default: Any = None) -> Any:
+        """Value of a pickled entry, or `default` when missing"""
+        path = self.get(key)
+        if path is None:
+            return default
+
+        try:
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            # evicted by another process in the meantime
+            return default
+
+    def dump(self, key: str, value: Any) -> Path:
+        """Pickle a value as an entry"""
+
+        def write(path: Path):
+            with open(path, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        return self.put(key, write)
+
+    def evict(self, keep: Path = None):
+        """Remove the least recently used entries until they fit in `max_bytes`
+
+        Args:
+            keep (Path, optional): entry never removed, like the one just written. Defaults to None.
+        """
+        entries = self.entries()
+        size = sum(stat.st_size for _, stat in entries)
+        for path, stat in entries:
+            if size <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            path.unlink(missing_ok=True)
+            size -= stat.st_size
+
+    def clear(self):
+        for path, _ in self.entries():
+            path.unlink(missing_ok=True)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(directory={self.directory}, max_bytes={self.max_bytes})"
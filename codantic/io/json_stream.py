@@ -0,0 +1,148 @@
+import codecs
+import gzip
+import json
+import re
+import time
+from pathlib import Path
+from typing import *
+
+__all__ = ["JSONStream"]
+
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+class JSONStream:
+    """Incremental reader for a JSON document whose root is an object.
+
+    Members of the root object are yielded as `(key, value)` pairs. Members
+    holding an array are flattened: one `(key, item)` pair is yielded per
+    element, so only a single element is materialized at a time.
+    """
+
+    def __init__(self, path: Union[str, Path], chunk_size: int = 1 << 20):
+        self.path = Path(path)
+        self.chunk_size = chunk_size
+        self.total_bytes = self.path.stat().st_size
+
+        self.bytes_read = 0
+        self.elapsed = 0.0
+
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        self._raw: BinaryIO = None
+        self._file: BinaryIO = None
+        self._text = None
+
+    @property
+    def throughput(self) -> float:
+        """Bytes of the file consumed per second"""
+        if self.elapsed == 0:
+            return 0.0
+        return self.bytes_read / self.elapsed
+
+    def __iter__(self) -> Iterator[Tuple[str, Any]]:
+        start = time.perf_counter()
+        self._raw = open(self.path, "rb")
+        self._file = self._raw
+        if self.path.suffix.lower() == ".gz":
+            self._file = gzip.GzipFile(fileobj=self._raw)
+        self._text = codecs.getincrementaldecoder("utf-8")()
+
+        try:
+            for item in self._iter_members():
+                self.elapsed = time.perf_counter() - start
+                yield item
+        finally:
+            self.elapsed = time.perf_counter() - start
+            self._file.close()
+            self._raw.close()
+            self._buffer = ""
+            self._pos = 0
+            self._eof = False
+
+    def _iter_members(self) -> Iterator[Tuple[str, Any]]:
+        self._expect("{")
+        if self._peek() == "}":
+            return
+
+        while True:
+            key = self._decode()
+            self._expect(":")
+
+            if self._peek() == "[":
+                self._pos += 1
+                if self._peek() == "]":
+                    self._pos += 1
+                else:
+                    while True:
+                        yield key, self._decode()
+                        if self._next() == "]":
+                            break
+
+            else:
+                yield key, self._decode()
+
+            if self._next() == "}":
+                break
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+
+        chunk = self._file.read(self.chunk_size)
+        self.bytes_read = self._raw.tell()
+        if not chunk:
+            self._eof = True
+            self._buffer = self._buffer[self._pos :] + self._text.decode(
+                b"", final=True
+            )
+            self._pos = 0
+            return False
+
+        self._buffer = self._buffer[self._pos :] + self._text.decode(chunk)
+        self._pos = 0
+        return True
+
+    def _peek(self) -> str:
+        while True:
+            self._pos = WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+
+            if not self._fill():
+                return ""
+
+    def _next(self) -> str:
+        char = self._peek()
+        if char not in (",", "]", "}"):
+            raise ValueError(
+                f"Malformed JSON in {self.path}: unexpected {char or 'EOF'!r}"
+            )
+
+        self._pos += 1
+        return char
+
+    def _expect(self, char: str):
+        if self._peek() != char:
+            raise ValueError(f"Malformed JSON in {self.path}: expected {char!r}")
+
+        self._pos += 1
+
+    def _decode(self) -> Any:
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+
+            # a value touching the end of the buffer may be a truncated number
+            if end == len(self._buffer) and self._fill():
+                continue
+
+            self._pos = end
+            return value
@@ -0,0 +1,100 @@
+import gzip
+import json
+import os
+from pathlib import Path
+from typing import *
+
+__all__ = ["JSONWriter"]
+
+
+class JSONWriter:
+    """Incremental writer of a JSON document whose root is an object.
+
+    Members are written in the order they are given. Arrays can be written
+    one item at a time, so a document larger than memory can be produced
+    from a stream of items. Paths ending with `.gz` are gzipped.
+
+    The document is written to a temporary file next to `path`, which only
+    replaces `path` once closed. Leaving the writer on an exception removes
+    it instead, so that a failed write never leaves a truncated but valid
+    document behind.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.temp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        if self.path.suffix.lower() == ".gz":
+            self._file = gzip.open(self.temp_path, "wt", encoding="utf-8")
+        else:
+            self._file = open(self.temp_path, "w", encoding="utf-8")
+
+        self._file.write("{")
+        self._members = 0
+        self._items = None
+
+    def __enter__(self) -> "JSONWriter":
+        return self
+
+    def __exit__(self, exc_type, *args):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _key(self, key: str):
+        if self._items is not None:
+            self.end_array()
+        if self._members:
+            self._file.write(", ")
+        self._file.write(json.dumps(key) + ": ")
+        self._members += 1
+
+    def write(self, key: str, value: Any):
+        """Write a member holding a JSON serializable value"""
+        self._key(key)
+        self._file.write(json.dumps(value))
+
+    def begin_array(self, key: str):
+        """Open a member holding an array, filled with `append`"""
+        self._key(key)
+        self._file.write("[")
+        self._items = 0
+
+    def append(self, item: Any, encoded: bool = False):
+        """Append an item to the open array
+
+        Args:
+            item (Any): JSON serializable value, or an already encoded JSON text
+            encoded (bool, optional): whether `item` is already encoded. Defaults to False.
+        """
+        if self._items:
+            self._file.write(", ")
+        self._file.write(item if encoded else json.dumps(item))
+        self._items += 1
+
+    def end_array(self):
+        self._file.write("]")
+        self._items = None
+
+    def write_array(self, key: str, items: Iterable[Any], encoded: bool = False):
+        """Write a member holding an array, consuming `items` one at a time"""
+        self.begin_array(key)
+        for item in items:
+            self.append(item, encoded=encoded)
+        self.end_array()
+
+    def close(self):
+        if self._file.closed:
+            return
+
+        if self._items is not None:
+            self.end_array()
+        self._file.write("}")
+        self._file.close()
+        os.replace(self.temp_path, self.path)
+
+    def abort(self):
+        """Discard the document, leaving `path` untouched"""
+        if not self._file.closed:
+            self._file.close()
+        self.temp_path.unlink(missing_ok=True)
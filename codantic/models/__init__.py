@@ -1,4 +1,14 @@
+from .arrow import *
 from .base import *
+from .binary import *
+from .columnar import *
+from .compact import *
 from .face_detection import *
 from .image_captioning import *
+from .loader import *
+from .merge import *
 from .object_detection import *
+from .split import *
+from .stats import *
+from .suppression import *
+from .writer import *
@@ -0,0 +1,340 @@
+import copy
+import json
+from pathlib import Path
+from typing import *
+
+import numpy as np
+from mousse.types import get_args, get_fields_info
+
+from .columnar import AnnotationStore, point_size, record_to_dict, set_raw_field
+
+__all__ = ["from_arrow", "read_parquet", "to_arrow", "to_parquet"]
+
+# key of the table metadata holding everything but the annotations
+METADATA_KEY = b"codantic"
+
+
+def import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError as error:
+        raise ImportError(
+            "pyarrow is required for Arrow and Parquet support: pip install pyarrow"
+        ) from error
+
+    return pyarrow
+
+
+def encode_extra(pa, annotation: Any, values: Dict[int, Any], size: int):
+    """Arrow array of a field kept in the side-table of a store
+
+    Rows missing from `values` hold the field default, and are written as
+    nulls for scalars, empty lists for sequences.
+    """
+    if annotation in (int, float, str, bool):
+        types = {
+            int: pa.int64(),
+            float: pa.float64(),
+            str: pa.string(),
+            bool: pa.bool_(),
+        }
+        column = [None] * size
+        for row, value in values.items():
+            column[row] = value
+        return pa.array(column, type=types[annotation])
+
+    size_of_point = point_size(annotation)
+    if size_of_point is not None:
+        lengths = np.zeros(size, dtype=np.int32)
+        for row, value in values.items():
+            lengths[row] = len(value)
+        offsets = np.zeros(size + 1, dtype=np.int32)
+        np.cumsum(lengths, out=offsets[1:])
+
+        points = np.zeros((offsets[-1], size_of_point), dtype=np.float64)
+        for row, value in values.items():
+            points[offsets[row] : offsets[row + 1]] = np.reshape(
+                value, (-1, size_of_point)
+            )
+
+        items = pa.array(points.ravel())
+        if size_of_point > 1:
+            items = pa.FixedSizeListArray.from_arrays(items, size_of_point)
+        return pa.ListArray.from_arrays(pa.array(offsets), items)
+
+    column = [None] * size
+    for row, value in values.items():
+        column[row] = json.dumps(value)
+    return pa.array(column, type=pa.string())
+
+
+def decode_extra(pa, annotation: Any, column: Any) -> Dict[int, Any]:
+    """Rows of a column written by `encode_extra` whose value is not the default"""
+    if column.null_count == len(column):
+        return {}
+
+    size_of_point = point_size(annotation)
+    if size_of_point is not None:
+        column = column.combine_chunks()
+        offsets = column.offsets.to_numpy() - column.offsets[0].as_py()
+        items = column.flatten()
+        if size_of_point > 1:
+            items = items.flatten()
+        points = items.to_numpy(zero_copy_only=False).reshape(-1, size_of_point)
+        if size_of_point == 1:
+            points = points[:, 0]
+
+        values = {}
+        for row in np.flatnonzero(np.diff(offsets)).tolist():
+            value = points[offsets[row] : offsets[row + 1]].tolist()
+            values[row] = (
+                [tuple(point) for point in value] if size_of_point > 1 else value
+            )
+        return values
+
+    values = column.to_pylist()
+    if annotation not in (int, float, str, bool):
+        return {
+            row: json.loads(value)
+            for row, value in enumerate(values)
+            if value is not None
+        }
+
+    return {row: value for row, value in enumerate(values) if value is not None}
+
+
+def records_to_columns(
+    records: Sequence[Any], record_type: Type
+) -> Dict[str, List[Any]]:
+    """Public fields of Dataclass objects as one list of plain values per field"""
+    columns = {
+        name: []
+        for name, field in get_fields_info(record_type).items()
+        if not field.private
+    }
+    for record in records:
+        for name, value in record_to_dict(record).items():
+            columns[name].append(value)
+
+    return columns
+
+
+def build_records(record_type: Type, columns: Dict[str, List[Any]]) -> List[Any]:
+    """Rebuild records saved with `records_to_columns`, skipping validation"""
+    size = max((len(column) for column in columns.values()), default=0)
+    records = [record_type.__new__(record_type) for _ in range(size)]
+    for name, field in get_fields_info(record_type).items():
+        values = columns.get(name)
+        for row, record in enumerate(records):
+            if values is not None:
+                value = values[row]
+            else:
+                value = copy.deepcopy(field.default)
+            set_raw_field(record, name, value)
+
+    return records
+
+
+def to_arrow(dataset: Any) -> Any:
+    """Annotations of a dataset as an Arrow table, one row per annotation
+
+    Store columns keep their dtype, boxes becoming fixed-size lists. Float
+    sequences, like keypoints, become list columns, and sequences of points,
+    like landmarks, lists of fixed-size lists. Any other field is stored as
+    json text. Info, licenses, images and categories are kept as json in the
+    table metadata.
+
+    Args:
+        dataset (CocoDataset): dataset to convert
+
+    Returns:
+        pyarrow.Table: annotation table
+    """
+    pa = import_pyarrow()
+    store = dataset.get_annotation_store()
+    fields = get_fields_info(store.annotation_type)
+
+    arrays = {}
+    for name, column in store.columns.items():
+        if column.ndim > 1:
+            arrays[name] = pa.FixedSizeListArray.from_arrays(
+                pa.array(np.ascontiguousarray(column).ravel()), column.shape[1]
+            )
+        else:
+            arrays[name] = pa.array(column)
+
+    for name, field in fields.items():
+        if name in store.schema or field.private:
+            continue
+        values = {
+            row: extra[name] for row, extra in store.extras.items() if name in extra
+        }
+        arrays[name] = encode_extra(pa, field.annotation, values, len(store))
+
+    metadata = {
+        "dataset_type": type(dataset).__name__,
+        "info": record_to_dict(dataset.info),
+    }
+    dataset_fields = get_fields_info(type(dataset))
+    for name in ("licenses", "images", "categories"):
+        record_type, *_ = get_args(dataset_fields[name].annotation)
+        metadata[name] = records_to_columns(getattr(dataset, name), record_type)
+
+    table = pa.table(arrays)
+    return table.replace_schema_metadata({METADATA_KEY: json.dumps(metadata)})
+
+
+def from_arrow(dataset_type: Type, table: Any) -> Any:
+    """Build a columnar dataset from a table written by `to_arrow`
+
+    Columns left out of the table take their default. Without the metadata
+    of `to_arrow`, the dataset only holds annotations.
+
+    Args:
+        dataset_type (Type[CocoDataset]): type of the dataset to build
+        table (pyarrow.Table): annotation table, possibly projected or filtered
+
+    Returns:
+        CocoDataset: columnar dataset
+    """
+    pa = import_pyarrow()
+    annotation_type = dataset_type.get_annotation_type()
+    store_type: Type[AnnotationStore] = dataset_type.annotation_store_type
+
+    columns = {}
+    for name, (dtype, shape, default) in store_type.schema.items():
+        if name not in table.column_names:
+            continue
+        column = table.column(name)
+        if shape:
+            values = column.combine_chunks().flatten()
+            column = values.to_numpy(zero_copy_only=False).reshape((-1,) + shape)
+        else:
+            column = column.cast(pa.from_numpy_dtype(np.dtype(dtype)))
+            column = column.fill_null(default).to_numpy()
+        columns[name] = column.astype(dtype, copy=False)
+
+    if not columns:
+        columns["annotation_id"] = np.full(table.num_rows, -1, dtype=np.int64)
+
+    extras: Dict[int, Dict[str, Any]] = {}
+    for name, field in get_fields_info(annotation_type).items():
+        if name in store_type.schema or field.private or name not in table.column_names:
+            continue
+        for row, value in decode_extra(
+            pa, field.annotation, table.column(name)
+        ).items():
+            extras.setdefault(row, {})[name] = value
+
+    store = store_type(annotation_type, columns=columns, extras=extras)
+
+    metadata = (table.schema.metadata or {}).get(METADATA_KEY)
+    metadata = json.loads(metadata) if metadata else {}
+    fields = get_fields_info(dataset_type)
+    records = {}
+    for name in ("licenses", "images", "categories"):
+        record_type, *_ = get_args(fields[name].annotation)
+        records[name] = build_records(record_type, metadata.get(name, {}))
+    info_type = fields["info"].annotation
+
+    return dataset_type.from_store(
+        store, info=info_type(**metadata.get("info", {})), **records
+    )
+
+
+def to_parquet(
+    dataset: Any,
+    path: Union[str, Path],
+    partition_by: Sequence[str] = None,
+    **kwargs,
+):
+    """Write the annotation table of a dataset to a Parquet file
+
+    Args:
+        dataset (CocoDataset): dataset to write
+        path (Union[str, Path]): Parquet file, or directory of a partitioned dataset
+        partition_by (Sequence[str], optional): columns partitioning the rows into directories. Defaults to None.
+        kwargs: options of `pyarrow.parquet.write_table`
+    """
+    import_pyarrow()
+    import pyarrow.parquet as pq
+
+    table = to_arrow(dataset)
+    if not partition_by:
+        pq.write_table(table, str(path), **kwargs)
+        return
+
+    # the metadata is written once, in the `_common_metadata` file of the
+    # dataset, instead of in the footer of every partition
+    pq.write_to_dataset(
+        table.replace_schema_metadata(None),
+        str(path),
+        partition_cols=list(partition_by),
+        **kwargs,
+    )
+    pq.write_metadata(table.schema, str(Path(path) / "_common_metadata"))
+
+
+def filter_columns(filters: Any) -> Optional[Set[str]]:
+    """Names of the columns a filter reads, or None for a filter expression
+
+    Filters are lists of (column, op, value) tuples, or lists of such lists
+    combined by OR.
+    """
+    if filters is None:
+        return set()
+    if not isinstance(filters, (list, tuple)):
+        return None
+
+    names = set()
+    for item in filters:
+        if isinstance(item, tuple) and item and isinstance(item[0], str):
+            names.add(item[0])
+        else:
+            names.update(name for name, *_ in item)
+    return names
+
+
+def read_parquet(
+    dataset_type: Type,
+    path: Union[str, Path],
+    columns: Sequence[str] = None,
+    filters: Any = None,
+) -> Any:
+    """Read a dataset written by `to_parquet`
+
+    Only the requested columns are read, along with the partitioning columns
+    and the columns the filters read, and `filters` are pushed down to skip
+    partitions and row groups, so that a single category or image can be read
+    from a large file. Every column is read for a filter expression.
+
+    Args:
+        dataset_type (Type[CocoDataset]): type of the dataset to build
+        path (Union[str, Path]): Parquet file, or directory of a partitioned dataset
+        columns (Sequence[str], optional): annotation columns to read besides the partitioning and filtered ones, others taking their default. Defaults to None.
+        filters (Any, optional): row filters of `pyarrow.parquet.read_table`, like [("category_id", "=", 3)]. Defaults to None.
+
+    Returns:
+        CocoDataset: columnar dataset
+    """
+    import_pyarrow()
+    import pyarrow.parquet as pq
+
+    if columns is not None:
+        # partitioning and filtered columns would otherwise take their default,
+        # like a category id of -1 for all the rows of a category partition
+        required = filter_columns(filters)
+        if required is None:
+            columns = None
+        else:
+            partitioning = pq.ParquetDataset(str(path)).partitioning
+            if partitioning is not None:
+                required.update(partitioning.schema.names)
+            columns = [*columns, *sorted(required.difference(columns))]
+
+    table = pq.read_table(str(path), columns=columns, filters=filters)
+    common_metadata = Path(path) / "_common_metadata"
+    if common_metadata.is_file():
+        table = table.replace_schema_metadata(pq.read_schema(common_metadata).metadata)
+
+    return from_arrow(dataset_type, table)
@@ -1,7 +1,26 @@
-from collections import defaultdict
+from pathlib import Path
 from typing import *
 
+import numpy as np
 from mousse import Dataclass, Field
+from mousse.types import get_args, get_fields_info
+
+from codantic.core.index import IndexedMetaclass
+from codantic.profiling import profiled, stage
+
+from .arrow import from_arrow, read_parquet, to_arrow, to_parquet
+from .binary import open_binary, save_binary
+from .columnar import AnnotationStore, remap_ids, set_raw_field
+from .compact import CompactRecord, to_compact
+from .index import CocoDatasetIndex
+from .loader import CocoStreamLoader, default_fields
+from .merge import DatasetMerger, ImageKey, MergeConflict
+from .split import SampleUnit, assign_splits, image_strata, sample_groups, write_splits
+from .stats import DatasetStats, StatsAccumulator, file_stats
+from .writer import write_json
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 __all__ = ["CocoDataset", "Image", "Annotation", "Category"]
 
@@ -45,35 +64,535 @@ class Category(Dataclass):
     super_category: str = Field(default=None, alias="supercategory")
 
 
-class CocoDataset(Dataclass):
-    info: Info = Info()
+class CocoDataset(Dataclass, metaclass=IndexedMetaclass):
+    # built by a factory: mousse deep copies of the default may pick up the fields
+    # of a freed object which had the same id
+    info: Info = Field(Info(), factory=Info)
     licenses: List[License] = []
     images: List[Image] = []
     annotations: List[Annotation] = []
     categories: List[Category] = []
 
+    annotation_store_type = AnnotationStore
+
+    @classmethod
+    def get_annotation_type(cls) -> Type[Annotation]:
+        fields = get_fields_info(cls)
+        annotation_type, *_ = get_args(fields["annotations"].annotation)
+        return annotation_type
+
+    @classmethod
+    def iter_load(
+        cls,
+        path: Union[str, Path],
+        batch_size: int = 10000,
+        chunk_size: int = 1 << 20,
+        raw: bool = False,
+    ) -> CocoStreamLoader:
+        """Read a COCO json file incrementally
+
+        Args:
+            path (Union[str, Path]): path to the json file, optionally gzipped
+            batch_size (int, optional): number of annotations per batch. Defaults to 10000.
+            chunk_size (int, optional): number of bytes read at once. Defaults to 1MB.
+            raw (bool, optional): yield annotations as json records, without parsing them. Defaults to False.
+
+        Returns:
+            CocoStreamLoader: iterable of annotation batches, with images and categories gathered in its `dataset`
+        """
+        return CocoStreamLoader(
+            cls, path, batch_size=batch_size, chunk_size=chunk_size, raw=raw
+        )
+
+    @classmethod
+    @profiled()
+    def load(
+        cls,
+        path: Union[str, Path],
+        batch_size: int = 10000,
+        columnar: bool = False,
+        lazy: bool = False,
+    ) -> "CocoDataset":
+        """Load a COCO json file without materializing the raw json tree
+
+        A lazy dataset is columnar and skips parsing annotations: columns are
+        filled from the json records, other fields are kept as read, and an
+        annotation is only built when one of these fields is accessed.
+
+        Args:
+            path (Union[str, Path]): path to the json file, optionally gzipped
+            batch_size (int, optional): number of annotations parsed per batch. Defaults to 10000.
+            columnar (bool, optional): store annotations in columns as they are read. Defaults to False.
+            lazy (bool, optional): store raw annotations in columns, indexed into views. Defaults to False.
+
+        Returns:
+            CocoDataset: loaded dataset
+        """
+        loader = cls.iter_load(path, batch_size=batch_size, raw=lazy)
+        if columnar or lazy:
+            loader.dataset.to_columnar()
+
+        annotations = loader.dataset.annotations
+        for batch in loader:
+            if lazy:
+                with stage("from_records"):
+                    batch = cls.annotation_store_type.from_records(
+                        batch, annotations.annotation_type
+                    )
+            annotations.extend(batch)
+
+        if lazy:
+            annotations.lazy = True
+
+        return loader.dataset
+
+    @classmethod
+    @profiled()
+    def merge(
+        cls,
+        *datasets: Union["CocoDataset", str, Path],
+        on_conflict: MergeConflict = MergeConflict.keep_first,
+        dedupe: Optional[ImageKey] = ImageKey.file_name,
+        image_root: Union[str, Path] = None,
+        path: Union[str, Path] = None,
+    ) -> Optional["CocoDataset"]:
+        """Merge datasets, renumbering their ids and unifying categories by name
+
+        Images and annotations are numbered from 1 in the order of the
+        datasets. Datasets given as paths are loaded one at a time, and with
+        `path` the merged dataset is written there without being held in
+        memory.
+
+        Args:
+            datasets (Union[CocoDataset, str, Path]): datasets, or paths to their json files
+            on_conflict (MergeConflict, optional): what to do with a duplicate image. Defaults to MergeConflict.keep_first.
+            dedupe (Optional[ImageKey], optional): how duplicate images are found, None to keep every image. Defaults to ImageKey.file_name.
+            image_root (Union[str, Path], optional): directory of the image files, to hash their content. Defaults to None.
+            path (Union[str, Path], optional): json file to write the merged dataset to, optionally gzipped. Defaults to None.
+
+        Returns:
+            Optional[CocoDataset]: merged columnar dataset, or None when written to `path`
+        """
+        merger = DatasetMerger(
+            cls, on_conflict=on_conflict, dedupe=dedupe, image_root=image_root
+        )
+        if path is not None:
+            merger.write(datasets, path)
+            return None
+
+        return merger.merge(datasets)
+
+    @classmethod
+    def from_store(cls, store: AnnotationStore, **fields) -> "CocoDataset":
+        """Build a columnar dataset around an existing store
+
+        Args:
+            store (AnnotationStore): annotations of the dataset, used as is
+            fields: other fields of the dataset, such as images and categories
+
+        Returns:
+            CocoDataset: dataset backed by `store`
+        """
+        dataset = cls(**{**default_fields(cls), **fields})
+        set_raw_field(dataset, "annotations", store)
+        return dataset
+
+    @property
+    def is_columnar(self) -> bool:
+        return isinstance(self.annotations, AnnotationStore)
+
+    def get_annotation_store(self) -> AnnotationStore:
+        """Annotations as a columnar store, without copy for a columnar dataset
+
+        Returns:
+            AnnotationStore: the backing store of a columnar dataset, otherwise a cached columnar copy of the annotations
+        """
+        return self.index.store
+
+    def to_columnar(self) -> "CocoDataset":
+        """Switch the annotations to the columnar backend, in place
+
+        `annotations` keeps behaving as a sequence of typed annotations, built
+        on access. Edits must go through the columns of the store since the
+        built annotations are detached copies.
+
+        Returns:
+            CocoDataset: the dataset itself
+        """
+        set_raw_field(self, "annotations", self.get_annotation_store())
+        return self
+
+    def with_annotations(
+        self, annotations: Union[List[Annotation], AnnotationStore]
+    ) -> "CocoDataset":
+        """New dataset holding other annotations, sharing everything else with this one
+
+        Info, licenses, images and categories are the same objects, held in
+        new lists. Annotations are used as given, without being parsed.
+
+        Args:
+            annotations (Union[List[Annotation], AnnotationStore]): annotations of the new dataset
+
+        Returns:
+            CocoDataset: dataset of the same type
+        """
+        dataset = self.__class__.__new__(self.__class__)
+        for name in get_fields_info(self.__class__):
+            value = getattr(self, name)
+            set_raw_field(
+                dataset, name, list(value) if isinstance(value, list) else value
+            )
+
+        set_raw_field(dataset, "annotations", annotations)
+        return dataset
+
+    def select(self, rows: np.ndarray, **columns: np.ndarray) -> "CocoDataset":
+        """New dataset holding some annotations, optionally with new column values
+
+        Args:
+            rows (np.ndarray): positions of the annotations to keep
+            columns (np.ndarray): new values of store columns, such as score or bbox, one per kept row
+
+        Returns:
+            CocoDataset: dataset sharing the unchanged annotations and everything else with this one
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        store = self.get_annotation_store()
+        selected = store.take(rows)
+
+        changed = np.zeros(len(rows), dtype=bool)
+        for name, values in columns.items():
+            column = selected.columns[name]
+            values = np.asarray(values, dtype=column.dtype)
+            differs = column != values
+            changed |= differs.reshape(len(rows), -1).any(axis=1)
+            column[...] = values
+
+        if self.is_columnar:
+            return self.with_annotations(selected)
+
+        annotations = self.annotations
+        return self.with_annotations(
+            [
+                selected[i] if changed[i] else annotations[row]
+                for i, row in enumerate(rows.tolist())
+            ]
+        )
+
+    def subset(self, image_ids: Iterable[int]) -> "CocoDataset":
+        """New dataset holding some images and their annotations
+
+        Args:
+            image_ids (Iterable[int]): images to keep
+
+        Returns:
+            CocoDataset: dataset sharing the kept images and annotations with this one, the rows of a columnar store being copied
+        """
+        image_ids = set(np.fromiter(image_ids, dtype=np.int64).tolist())
+        positions = [
+            position
+            for position, image in enumerate(self.images)
+            if image.image_id in image_ids
+        ]
+        return self._view(np.asarray(positions, dtype=np.int64))
+
+    def sample(
+        self, n: int, by: SampleUnit = SampleUnit.image, seed: int = None
+    ) -> "CocoDataset":
+        """New dataset holding a random sample of this one
+
+        Args:
+            n (int): number of images or annotations to draw, or of annotations per category
+            by (SampleUnit, optional): what is drawn. Defaults to SampleUnit.image.
+            seed (int, optional): seed of the random generator. Defaults to None.
+
+        Returns:
+            CocoDataset: dataset sharing the sampled images and annotations with this one, in their original order
+        """
+        by = SampleUnit(by)
+        rng = np.random.default_rng(seed)
+        if by == SampleUnit.image:
+            size = min(n, len(self.images))
+            positions = np.sort(rng.choice(len(self.images), size=size, replace=False))
+            return self._view(positions)
+
+        image_positions = self._image_positions()
+        known = np.flatnonzero(image_positions >= 0)
+        if by == SampleUnit.annotation:
+            rows = np.sort(rng.choice(known, size=min(n, len(known)), replace=False))
+        else:
+            category_ids = self.index.keys["category_id"][known]
+            rows = known[sample_groups(category_ids, n, rng)]
+
+        return self._view(np.unique(image_positions[rows]), rows)
+
+    def split(
+        self,
+        ratios: Union[Sequence[float], Dict[str, float]],
+        stratify_by: Optional[str] = "category",
+        seed: int = None,
+        paths: Union[Sequence[Union[str, Path]], Dict[str, Union[str, Path]]] = None,
+    ) -> Union[List["CocoDataset"], Dict[str, "CocoDataset"], None]:
+        """Split the images, with their annotations, into disjoint datasets
+
+        With `stratify_by="category"`, every image is filed under its rarest
+        category, and each stratum is split following the ratios, so that
+        rare categories are spread over every split.
+
+        Args:
+            ratios (Union[Sequence[float], Dict[str, float]]): relative size of each split, optionally named
+            stratify_by (Optional[str], optional): "category", or None for a plain random split. Defaults to "category".
+            seed (int, optional): seed of the random generator. Defaults to None.
+            paths (Union[Sequence[Union[str, Path]], Dict[str, Union[str, Path]]], optional): json file of each split, written in one pass over the annotations. Defaults to None.
+
+        Raises:
+            ValueError: if `stratify_by` is unknown or the ratios are invalid
+
+        Returns:
+            Union[List[CocoDataset], Dict[str, CocoDataset], None]: splits sharing their images and annotations with this dataset, named like the ratios, or None when written to `paths`
+        """
+        names = list(ratios) if isinstance(ratios, Mapping) else None
+        weights = list(ratios.values()) if names is not None else list(ratios)
+        rng = np.random.default_rng(seed)
+
+        image_positions = self._image_positions()
+        if stratify_by == "category":
+            strata = image_strata(
+                len(self.images), image_positions, self.index.keys["category_id"]
+            )
+        elif stratify_by is None:
+            strata = np.zeros(len(self.images), dtype=np.int64)
+        else:
+            raise ValueError(
+                f"Cannot stratify by {stratify_by!r}, use 'category' or None"
+            )
+
+        image_splits = assign_splits(weights, strata, rng)
+        annotation_splits = np.append(image_splits, -1)[image_positions]
+
+        if paths is not None:
+            if names is not None:
+                paths = [paths[name] for name in names]
+            write_splits(self, paths, image_splits, annotation_splits)
+            return None
+
+        splits = [
+            self._view(
+                np.flatnonzero(image_splits == split),
+                np.flatnonzero(annotation_splits == split),
+            )
+            for split in range(len(weights))
+        ]
+        if names is not None:
+            return dict(zip(names, splits))
+
+        return splits
+
+    def _image_positions(self) -> np.ndarray:
+        """Position in `images` of the image of every annotation, -1 if unknown"""
+        positions: Dict[int, int] = {}
+        for position, image in enumerate(self.images):
+            positions.setdefault(image.image_id, position)
+
+        return remap_ids(self.index.keys["image_id"], positions)
+
+    def _view(
+        self, image_positions: np.ndarray, rows: np.ndarray = None
+    ) -> "CocoDataset":
+        if rows is None:
+            selected = np.zeros(len(self.images) + 1, dtype=bool)
+            selected[image_positions] = True
+            rows = np.flatnonzero(selected[self._image_positions()])
+
+        dataset = self.with_annotations(self.index.select(rows))
+        images = self.images
+        set_raw_field(
+            dataset,
+            "images",
+            [images[position] for position in image_positions.tolist()],
+        )
+        return dataset
+
+    @classmethod
+    def open_binary(cls, path: Union[str, Path], mmap: bool = True) -> "CocoDataset":
+        """Open a dataset saved with `save_binary`
+
+        Args:
+            path (Union[str, Path]): path to the binary file
+            mmap (bool, optional): map annotation columns from the file instead of reading them. Defaults to True.
+
+        Returns:
+            CocoDataset: columnar dataset
+        """
+        return open_binary(cls, path, mmap=mmap)
+
+    def save_binary(self, path: Union[str, Path]):
+        """Save the dataset in a compact binary layout, fast to open
+
+        Args:
+            path (Union[str, Path]): path to the binary file
+        """
+        save_binary(self, path)
+
+    @profiled()
+    def write_json(
+        self, path: Union[str, Path], shard_size: int = 50000, workers: int = 1
+    ):
+        """Write the dataset as a COCO json file, streaming it shard by shard
+
+        Args:
+            path (Union[str, Path]): path to the json file, gzipped if it ends with .gz
+            shard_size (int, optional): number of records encoded at once. Defaults to 50000.
+            workers (int, optional): number of processes encoding annotations. Defaults to 1.
+        """
+        write_json(self, path, shard_size=shard_size, workers=workers)
+
+    def to_arrow(self) -> "pyarrow.Table":
+        """Annotations as an Arrow table, other fields being kept in its metadata
+
+        Returns:
+            pyarrow.Table: one row per annotation, with fixed-size list boxes and list keypoints
+        """
+        return to_arrow(self)
+
+    @classmethod
+    def from_arrow(cls, table: "pyarrow.Table") -> "CocoDataset":
+        """Build a columnar dataset from a table written by `to_arrow`
+
+        Args:
+            table (pyarrow.Table): annotation table, possibly projected or filtered
+
+        Returns:
+            CocoDataset: columnar dataset
+        """
+        return from_arrow(cls, table)
+
+    def to_parquet(
+        self, path: Union[str, Path], partition_by: Sequence[str] = None, **kwargs
+    ):
+        """Write the annotation table to Parquet
+
+        Args:
+            path (Union[str, Path]): Parquet file, or directory of a partitioned dataset
+            partition_by (Sequence[str], optional): columns partitioning the rows, like ["category_id"]. Defaults to None.
+        """
+        to_parquet(self, path, partition_by=partition_by, **kwargs)
+
+    @classmethod
+    def read_parquet(
+        cls,
+        path: Union[str, Path],
+        columns: Sequence[str] = None,
+        filters: Any = None,
+    ) -> "CocoDataset":
+        """Read a dataset written by `to_parquet`, reading only what is asked for
+
+        Args:
+            path (Union[str, Path]): Parquet file, or directory of a partitioned dataset
+            columns (Sequence[str], optional): annotation columns to read besides the partitioning and filtered ones, others taking their default. Defaults to None.
+            filters (Any, optional): row filters pushed down to the reader, like [("category_id", "=", 3)]. Defaults to None.
+
+        Returns:
+            CocoDataset: columnar dataset
+        """
+        return read_parquet(cls, path, columns=columns, filters=filters)
+
+    def to_compact(self, field: str = "annotations") -> List[CompactRecord]:
+        """Slotted copies of the records of a field, for loops reading many of them
+
+        Annotations are built from the columns of the annotation store.
+
+        Args:
+            field (str, optional): list field to convert, like "images". Defaults to "annotations".
+
+        Returns:
+            List[CompactRecord]: read-only records, in the order of the field
+        """
+        if field == "annotations":
+            return to_compact(self.get_annotation_store())
+
+        record_type, *_ = get_args(get_fields_info(self.__class__)[field].annotation)
+        return to_compact(getattr(self, field), record_type)
+
+    @profiled()
+    def stats(self) -> DatasetStats:
+        """Counts and histograms of the annotations, read from their columns in one pass
+
+        Returns:
+            DatasetStats: statistics, area ranges matching those of the COCO evaluation
+        """
+        accumulator = StatsAccumulator()
+        accumulator.update(self.get_annotation_store())
+        accumulator.add_images([image.image_id for image in self.images])
+        return accumulator.result(
+            {category.category_id: category.name for category in self.categories}
+        )
+
+    @classmethod
+    @profiled()
+    def file_stats(
+        cls, path: Union[str, Path], batch_size: int = 10000
+    ) -> DatasetStats:
+        """Statistics of a json file, like `stats`, without loading its annotations at once
+
+        Args:
+            path (Union[str, Path]): path to the json file, optionally gzipped
+            batch_size (int, optional): number of annotations read at once. Defaults to 10000.
+
+        Returns:
+            DatasetStats: statistics of the file
+        """
+        return file_stats(cls, path, batch_size=batch_size)
+
+    @profiled()
+    def to_df(self, columns: Sequence[str] = None) -> "pd.DataFrame":
+        """Annotations as a data frame, built from the columnar store
+
+        Args:
+            columns (Sequence[str], optional): columns to keep. Defaults to None.
+
+        Returns:
+            pd.DataFrame: one row per annotation, with the category name resolved
+        """
+        df = self.get_annotation_store().to_df()
+        categories = {
+            category.category_id: category.name for category in self.categories
+        }
+        df.insert(
+            df.columns.get_loc("category_id") + 1,
+            "category_name",
+            df["category_id"].map(categories),
+        )
+
+        if columns is not None:
+            return df.reindex(columns=columns)
+
+        return df
+
+    @property
+    def index(self) -> CocoDatasetIndex:
+        """Lazily built id lookups, rebuilt when images, categories or annotations change"""
+        return CocoDatasetIndex.of(self)
+
+    def invalidate_index(self):
+        """Drop cached lookups after editing ids in place"""
+        self.index.invalidate()
+
     def get_images_info(self) -> Dict[int, Image]:
         """_summary_
 
         Returns:
-            Dict[int, Image]: Mapping from image_id to Image object
+            Dict[int, Image]: Mapping from image_id to Image object, copied from a cached index
         """
-        images = {}
-        for image_info in self.images:
-            images[image_info.image_id] = image_info
-
-        return images
+        return dict(self.index.images)
 
     def get_categories_info(self) -> Dict[int, Category]:
         """_summary_
 
         Returns:
-            Dict[int, Category]: Mapping from category_id to Category object
+            Dict[int, Category]: Mapping from category_id to Category object, copied from a cached index
         """
-        categories = {}
-        for category_info in self.categories:
-            categories[category_info.category_id] = category_info
-        return categories
+        return dict(self.index.categories)
 
     def get_annotation_groups(
         self, category_id: Optional[int] = None
@@ -84,14 +603,21 @@ class CocoDataset(Dataclass):
             category_id (Optional[int], optional): category to select. Defaults to None.
 
         Returns:
-            Dict[int, List[Annotation]]: Mapping from image_id to list of annotations, filtered by category if provided
+            Dict[int, List[Annotation]]: Mapping from image_id to list of annotations, filtered by category if provided.
+                The mapping and its groups are new on every call; groups of a columnar dataset are stores sharing no data with the dataset.
         """
-        annotation_groups = defaultdict(list)
-        for annotation in self.annotations:
-            if category_id is not None:
-                if annotation.category_id == category_id:
-                    annotation_groups[annotation.image_id].append(annotation)
-            else:
-                annotation_groups[annotation.image_id].append(annotation)
+        return self.index.annotation_groups(category_id)
+
+    def annotations_for(
+        self, image_id: int, category_id: Optional[int] = None
+    ) -> Sequence[Annotation]:
+        """Annotations of an image, looked up in a cached index
 
-        return dict(annotation_groups)
+        Args:
+            image_id (int): image to select
+            category_id (Optional[int], optional): category to select. Defaults to None.
+
+        Returns:
+            Sequence[Annotation]: annotations of the image, filtered by category if provided
+        """
+        return self.index.annotations_for(image_id, category_id)
@@ -0,0 +1,235 @@
+import collections.abc
+import copy
+import json
+from pathlib import Path
+from typing import *
+
+import numpy as np
+from mousse.types import get_accessors_info, get_args, get_fields_info, get_origin
+
+from codantic.io.binary import decode_strings, encode_strings, read_arrays, write_arrays
+
+from .columnar import AnnotationStore, record_to_dict, unpack
+
+__all__ = ["open_binary", "save_binary"]
+
+NUMERIC_TYPES = {int: np.int64, float: np.float64}
+
+
+def is_ragged(annotation: Any) -> bool:
+    """Whether a field holds a variable-length sequence of floats, like keypoints"""
+    return get_origin(annotation) in (list, collections.abc.Sequence) and get_args(
+        annotation
+    ) == (float,)
+
+
+def encode_field(
+    arrays: Dict[str, np.ndarray],
+    prefix: str,
+    annotation: Any,
+    values: Dict[int, Any],
+    size: int,
+):
+    """Encode the values of a field, given as a mapping from row to value
+
+    Rows missing from `values` take the field default on decoding.
+    """
+    if annotation in NUMERIC_TYPES:
+        column = np.zeros(size, dtype=NUMERIC_TYPES[annotation])
+        null = np.ones(size, dtype=bool)
+        for row, value in values.items():
+            if value is not None:
+                column[row] = value
+                null[row] = False
+        arrays[prefix] = column
+        if null.any():
+            arrays[f"{prefix}.null"] = null
+
+    elif annotation is str:
+        table = encode_strings([values.get(row) for row in range(size)])
+        for name, array in table.items():
+            arrays[f"{prefix}.{name}"] = array
+
+    elif is_ragged(annotation):
+        lengths = np.zeros(size, dtype=np.int64)
+        for row, value in values.items():
+            lengths[row] = len(value)
+        offsets = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+
+        data = np.zeros(offsets[-1], dtype=np.float64)
+        for row, value in values.items():
+            data[offsets[row] : offsets[row + 1]] = value
+        arrays[f"{prefix}.offsets"] = offsets
+        arrays[f"{prefix}.values"] = data
+
+    else:
+        blob = json.dumps({row: value for row, value in values.items()})
+        arrays[f"{prefix}.json"] = np.frombuffer(blob.encode("utf-8"), dtype=np.uint8)
+
+
+def decode_field(arrays: Dict[str, np.ndarray], prefix: str) -> Dict[int, Any]:
+    """Decode the rows of a field written by `encode_field`"""
+    if prefix in arrays:
+        values = arrays[prefix].tolist()
+        rows = range(len(values))
+        if f"{prefix}.null" in arrays:
+            rows = np.flatnonzero(~arrays[f"{prefix}.null"]).tolist()
+        return {row: values[row] for row in rows}
+
+    if f"{prefix}.data" in arrays:
+        table = {
+            name: arrays[f"{prefix}.{name}"]
+            for name in ("offsets", "data", "null")
+            if f"{prefix}.{name}" in arrays
+        }
+        values = decode_strings(table)
+        return {row: value for row, value in enumerate(values) if value is not None}
+
+    if f"{prefix}.values" in arrays:
+        offsets = arrays[f"{prefix}.offsets"]
+        data = arrays[f"{prefix}.values"]
+        rows = np.flatnonzero(np.diff(offsets)).tolist()
+        return {row: data[offsets[row] : offsets[row + 1]].tolist() for row in rows}
+
+    if f"{prefix}.json" in arrays:
+        blob = json.loads(arrays[f"{prefix}.json"].tobytes().decode("utf-8"))
+        return {int(row): value for row, value in blob.items()}
+
+    return {}
+
+
+def public_fields(record_type: Type) -> Dict[str, Any]:
+    return {
+        name: field
+        for name, field in get_fields_info(record_type).items()
+        if not field.private
+    }
+
+
+def encode_records(
+    arrays: Dict[str, np.ndarray],
+    prefix: str,
+    records: Sequence[Any],
+    record_type: Type,
+):
+    for name, field in public_fields(record_type).items():
+        values = {row: getattr(record, name) for row, record in enumerate(records)}
+        if field.annotation not in NUMERIC_TYPES and field.annotation is not str:
+            values = {
+                row: value for row, value in values.items() if value != field.default
+            }
+        encode_field(arrays, f"{prefix}/{name}", field.annotation, values, len(records))
+
+
+def decode_records(
+    arrays: Dict[str, np.ndarray], prefix: str, size: int, record_type: Type
+) -> List[Any]:
+    """Rebuild records from their columns
+
+    Decoded values already have the field types, so records are filled
+    through their accessors rather than parsed again by the constructor.
+    """
+    records = [record_type.__new__(record_type) for _ in range(size)]
+    accessors = get_accessors_info(record_type)
+    for name, field in get_fields_info(record_type).items():
+        storage = accessors[name].storage
+        values = decode_field(arrays, f"{prefix}/{name}")
+        mutable = isinstance(field.default, (dict, list))
+        for row, record in enumerate(records):
+            if row in values:
+                storage[id(record)] = values[row]
+            else:
+                storage[id(record)] = (
+                    copy.deepcopy(field.default) if mutable else field.default
+                )
+
+    return records
+
+
+def save_binary(dataset: Any, path: Union[str, Path]):
+    """Write a dataset in the binary layout read by `open_binary`
+
+    Annotation columns are stored as they are in the annotation store. Other
+    fields of the annotations are stored as float arrays with offsets for
+    keypoints, string tables for text and a json blob for anything else.
+    Images, categories and licenses are stored column-wise the same way.
+
+    Args:
+        dataset (CocoDataset): dataset to save
+        path (Union[str, Path]): output file
+    """
+    store = dataset.get_annotation_store()
+    annotation_type = store.annotation_type
+
+    arrays = {f"annotations/{name}": column for name, column in store.columns.items()}
+    for name, field in public_fields(annotation_type).items():
+        if name in store.schema:
+            continue
+
+        values = {
+            row: unpack(extra[name])
+            for row, extra in store.extras.items()
+            if name in extra
+        }
+        encode_field(
+            arrays, f"annotations/{name}", field.annotation, values, len(store)
+        )
+
+    sizes = {"annotations": len(store)}
+    for name in ("images", "categories", "licenses"):
+        records = getattr(dataset, name)
+        record_type, *_ = get_args(get_fields_info(type(dataset))[name].annotation)
+        encode_records(arrays, name, records, record_type)
+        sizes[name] = len(records)
+
+    meta = {
+        "dataset_type": type(dataset).__name__,
+        "annotation_type": annotation_type.__name__,
+        "sizes": sizes,
+        "info": record_to_dict(dataset.info),
+    }
+    write_arrays(path, arrays, meta)
+
+
+def open_binary(dataset_type: Type, path: Union[str, Path], mmap: bool = True) -> Any:
+    """Open a dataset written by `save_binary`
+
+    Annotation columns are views over the file, so opening costs little more
+    than decoding images and categories. The dataset comes back columnar.
+
+    Args:
+        dataset_type (Type[CocoDataset]): type of the dataset to build
+        path (Union[str, Path]): input file
+        mmap (bool, optional): map the file, sharing its pages with other processes mapping it. Defaults to True.
+
+    Returns:
+        CocoDataset: columnar dataset
+    """
+    arrays, meta = read_arrays(path, mmap=mmap)
+    sizes = meta["sizes"]
+    fields = get_fields_info(dataset_type)
+    annotation_type = dataset_type.get_annotation_type()
+    store_type: Type[AnnotationStore] = dataset_type.annotation_store_type
+
+    columns = {
+        name: arrays[f"annotations/{name}"]
+        for name in store_type.schema
+        if f"annotations/{name}" in arrays
+    }
+    extras: Dict[int, Dict[str, Any]] = {}
+    for name in public_fields(annotation_type):
+        if name in store_type.schema:
+            continue
+        for row, value in decode_field(arrays, f"annotations/{name}").items():
+            extras.setdefault(row, {})[name] = value
+
+    store = store_type(annotation_type, columns=columns, extras=extras)
+
+    records = {}
+    for name in ("images", "categories", "licenses"):
+        record_type, *_ = get_args(fields[name].annotation)
+        records[name] = decode_records(arrays, name, sizes[name], record_type)
+
+    info_type = fields["info"].annotation
+    return dataset_type.from_store(store, info=info_type(**meta["info"]), **records)
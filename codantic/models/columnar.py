@@ -0,0 +1,650 @@
+import collections.abc
+import copy
+from typing import *
+
+import numpy as np
+from mousse import asdict
+from mousse.types import get_accessors_info, get_args, get_fields_info, get_origin
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+__all__ = [
+    "AnnotationStore",
+    "AnnotationView",
+    "ODAnnotationStore",
+    "group_rows",
+    "point_size",
+    "remap_ids",
+]
+
+SCALAR_TYPES = (int, float, str, bool, type(None))
+SEQUENCE_TYPES = (list, collections.abc.Sequence)
+
+
+def set_raw_field(obj: Any, key: str, val: Any):
+    """Store a value in a Dataclass field without parsing it.
+
+    Assigning through `setattr` converts a store into a list of annotations,
+    which would defeat the point of keeping the columns.
+    """
+    get_accessors_info(type(obj))[key].storage[id(obj)] = val
+
+
+def copy_record(record: Any, **changes: Any) -> Any:
+    """Shallow copy of a Dataclass object, with some fields replaced, skipping validation"""
+    record_type = type(record)
+    copied = record_type.__new__(record_type)
+    accessors = get_accessors_info(record_type)
+    for name in get_fields_info(record_type):
+        value = changes[name] if name in changes else getattr(record, name)
+        accessors[name].storage[id(copied)] = value
+
+    return copied
+
+
+def has_empty_default(field: Any) -> bool:
+    """Whether the default of a field is None or an empty container
+
+    Fields holding such a default are left out of written json, like the
+    loader leaves them missing from the records it reads.
+    """
+    default = field.default
+    return default is None or (isinstance(default, (list, dict)) and not default)
+
+
+def is_empty_default(value: Any, field: Any) -> bool:
+    return has_empty_default(field) and (
+        value is None if field.default is None else value == field.default
+    )
+
+
+def record_to_dict(
+    record: Any, by_alias: bool = False, skip_empty: bool = False
+) -> Dict[str, Any]:
+    """Plain dict of the declared public fields of a Dataclass object
+
+    Unlike `asdict`, only fields of the class are read, so stale per-instance
+    fields left by mousse under a recycled `id()` never leak in. Stored values
+    are read straight from the accessors, and only containers are converted.
+    With `skip_empty`, fields holding an empty default are left out.
+    """
+    accessors = get_accessors_info(type(record))
+    data = {}
+    for name, field in get_fields_info(type(record)).items():
+        if field.private:
+            continue
+
+        accessor = accessors[name]
+        if field.getters or id(record) not in accessor.storage:
+            value = getattr(record, name)
+        else:
+            value = accessor.storage[id(record)]
+        if not isinstance(value, SCALAR_TYPES):
+            value = asdict(value, by_alias=by_alias)
+        if skip_empty and is_empty_default(value, field):
+            continue
+
+        data[(field.alias or name) if by_alias else name] = value
+
+    return data
+
+
+def point_size(annotation: Any) -> Optional[int]:
+    """Length of the items of a sequence field
+
+    Returns 1 for a sequence of floats, like keypoints, the tuple length for a
+    sequence of float tuples, like landmarks, and None for anything else.
+    """
+    if get_origin(annotation) not in SEQUENCE_TYPES:
+        return None
+
+    (item,) = get_args(annotation) or (None,)
+    if item is float:
+        return 1
+    if get_origin(item) is tuple and set(get_args(item)) == {float}:
+        return len(get_args(item))
+
+    return None
+
+
+def pack_points(value: Any, size: int) -> Any:
+    """Sequence of floats, or of float tuples of `size`, as a float array
+
+    Values that are not numeric are returned as is, to fail on parsing.
+    """
+    try:
+        points = np.asarray(value, dtype=np.float64)
+    except (TypeError, ValueError):
+        return value
+
+    shape = (len(points),) if size == 1 else (len(points), size)
+    return points if points.shape == shape else value
+
+
+def unpack(value: Any) -> Any:
+    """Plain python value of a side-table entry, which may be a packed array"""
+    return value.tolist() if isinstance(value, np.ndarray) else value
+
+
+def remap_ids(
+    ids: np.ndarray, mapping: Dict[int, int], missing: int = -1
+) -> np.ndarray:
+    """Translate a column of ids through a mapping, looking up each distinct id once
+
+    Args:
+        ids (np.ndarray): ids to translate
+        mapping (Dict[int, int]): new id of every known id
+        missing (int, optional): id given to unknown ids. Defaults to -1.
+
+    Returns:
+        np.ndarray: translated ids, with the dtype of `ids`
+    """
+    ids = np.asarray(ids)
+    source_ids, inverse = np.unique(ids, return_inverse=True)
+    target_ids = np.fromiter(
+        (mapping.get(source_id, missing) for source_id in source_ids.tolist()),
+        dtype=ids.dtype,
+        count=len(source_ids),
+    )
+    return target_ids[inverse.reshape(ids.shape)]
+
+
+def group_rows(*columns: np.ndarray) -> Dict[Hashable, np.ndarray]:
+    """Group row positions by the values of one or several columns
+
+    Groups are ordered by first appearance and keep the row order inside each
+    group. Several columns produce tuple keys.
+    """
+    if not len(columns[0]):
+        return {}
+
+    order = np.lexsort(columns[::-1])
+    columns = [column[order] for column in columns]
+
+    changed = np.zeros(len(order), dtype=bool)
+    changed[0] = True
+    for column in columns:
+        changed[1:] |= column[1:] != column[:-1]
+
+    starts = np.flatnonzero(changed)
+    groups = np.split(order, starts[1:])
+    if len(columns) == 1:
+        keys = columns[0][starts].tolist()
+    else:
+        keys = list(zip(*(column[starts].tolist() for column in columns)))
+
+    return {keys[i]: groups[i] for i in np.argsort(order[starts]).tolist()}
+
+
+class AnnotationView:
+    """Typed view over a row of an annotation store
+
+    Fields held in columns are read from the store, and the annotation is
+    only built, then kept, when any other attribute is accessed. Like the
+    annotations built by a store, views are read-only copies: edits go
+    through the columns.
+    """
+
+    __slots__ = ("_store", "_row", "_annotation")
+
+    def __init__(self, store: "AnnotationStore", row: int):
+        self._store = store
+        self._row = row
+        self._annotation = None
+
+    def __getattr__(self, key: str) -> Any:
+        column = self._store._columns.get(key)
+        if column is not None:
+            value = column[self._row].tolist()
+            if column.ndim > 1:
+                return tuple(value)
+            nulls = self._store._nulls()
+            return None if key in nulls and value == nulls[key] else value
+
+        return getattr(self.materialize(), key)
+
+    def materialize(self) -> Any:
+        """The typed annotation of the row, built on first call"""
+        if self._annotation is None:
+            self._annotation = self._store._build(self._row)
+        return self._annotation
+
+    def __repr__(self) -> str:
+        return repr(self.materialize())
+
+
+class AnnotationStore(Sequence):
+    """Struct-of-arrays storage of annotations.
+
+    Fields listed in `schema` are kept in NumPy columns, every other field is
+    kept in a sparse side-table holding only rows whose value differs from the
+    field default. Indexing a row builds a typed annotation on the fly, so the
+    store can stand in for the list of annotations of a dataset. A lazy store
+    returns an `AnnotationView` instead, which defers building the annotation
+    until a field outside the columns is read.
+
+    Scalar columns of fields defaulting to None, like the ids of a caption
+    annotation without category, hold the default of the schema instead,
+    which reads back as None.
+
+    `version` is bumped whenever rows are added, which lets cached indexes
+    notice the change. Bump it after editing columns in place.
+    """
+
+    schema: Dict[str, Tuple[type, Tuple[int, ...], Any]] = {
+        "annotation_id": (np.int64, (), -1),
+        "image_id": (np.int64, (), -1),
+        "category_id": (np.int64, (), -1),
+    }
+
+    def __init__(
+        self,
+        annotation_type: Type,
+        columns: Dict[str, np.ndarray] = None,
+        extras: Dict[int, Dict[str, Any]] = None,
+        lazy: bool = False,
+    ):
+        columns = columns or {}
+        size = 0
+        for column in columns.values():
+            size = len(column)
+            break
+
+        self.annotation_type = annotation_type
+        self.extras: Dict[int, Dict[str, Any]] = extras or {}
+        self.lazy = lazy
+        self.version = 0
+        self._size = size
+        self._columns: Dict[str, np.ndarray] = {}
+
+        for name, (dtype, shape, default) in self.schema.items():
+            if name in columns:
+                column = np.asarray(columns[name], dtype=dtype)
+                column = column.reshape((size,) + shape)
+            else:
+                column = np.full((size,) + shape, default, dtype=dtype)
+            self._columns[name] = column
+
+    @classmethod
+    def from_annotations(
+        cls, annotations: Iterable[Any], annotation_type: Type = None
+    ) -> "AnnotationStore":
+        """Build a store from annotation objects in a single pass
+
+        Args:
+            annotations (Iterable[Annotation]): annotations to store
+            annotation_type (Type, optional): type of the rows. Defaults to the type of the first annotation.
+
+        Returns:
+            AnnotationStore: store holding a copy of the annotations
+        """
+        if isinstance(annotations, AnnotationStore):
+            return annotations.take(np.arange(len(annotations)))
+
+        annotations = list(annotations)
+        if annotation_type is None:
+            if not annotations:
+                raise ValueError("annotation_type is required for an empty store")
+            annotation_type = type(annotations[0])
+
+        fields = get_fields_info(annotation_type)
+        names = [name for name in cls.schema if name in fields]
+        others = [
+            (name, field.default)
+            for name, field in fields.items()
+            if name not in cls.schema and not field.private
+        ]
+
+        values = {name: [] for name in names}
+        extras = {}
+        for row, annotation in enumerate(annotations):
+            for name in names:
+                values[name].append(getattr(annotation, name))
+
+            extra = {}
+            for name, default in others:
+                value = getattr(annotation, name)
+                if value is not Ellipsis and value != default:
+                    extra[name] = value
+
+            if extra:
+                extras[row] = extra
+
+        return cls._from_values(annotation_type, values, extras, len(annotations))
+
+    @classmethod
+    def from_records(
+        cls,
+        records: Iterable[Dict[str, Any]],
+        annotation_type: Type,
+        lazy: bool = False,
+    ) -> "AnnotationStore":
+        """Build a store from raw json records, without parsing them
+
+        Columns are filled straight from the records, and other fields are
+        kept in the side-table as read, to be parsed only when a row is built.
+        Point sequences, like keypoints or landmarks, are packed into float
+        arrays, which take a fraction of the memory of nested lists. Keys
+        unknown to `annotation_type` are dropped.
+
+        Args:
+            records (Iterable[Dict[str, Any]]): annotations as read from json, keyed by alias
+            annotation_type (Type): type of the rows
+            lazy (bool, optional): index the store into views rather than annotations. Defaults to False.
+
+        Returns:
+            AnnotationStore: store holding the records
+        """
+        names = {}
+        defaults = {}
+        point_sizes = {}
+        for name, field in get_fields_info(annotation_type).items():
+            if field.private:
+                continue
+            names[field.alias or name] = name
+            if name not in cls.schema:
+                defaults[name] = field.default
+                point_sizes[name] = point_size(field.annotation)
+
+        columns = {key: name for key, name in names.items() if name in cls.schema}
+        values = {name: [] for name in columns.values()}
+        extras = {}
+        size = 0
+        for row, record in enumerate(records):
+            for key, name in columns.items():
+                values[name].append(record.get(key))
+
+            extra = {}
+            for key, value in record.items():
+                name = names.get(key)
+                if name in defaults and value != defaults[name]:
+                    if point_sizes[name] is not None:
+                        value = pack_points(value, point_sizes[name])
+                    extra[name] = value
+
+            if extra:
+                extras[row] = extra
+            size = row + 1
+
+        store = cls._from_values(annotation_type, values, extras, size)
+        store.lazy = lazy
+        return store
+
+    @classmethod
+    def _from_values(
+        cls,
+        annotation_type: Type,
+        values: Dict[str, List[Any]],
+        extras: Dict[int, Dict[str, Any]],
+        size: int,
+    ) -> "AnnotationStore":
+        store = cls(annotation_type, extras=extras)
+        store._resize(size)
+        for name, column in values.items():
+            _, shape, default = cls.schema[name]
+            if any(value is None for value in column):
+                if shape:
+                    default = np.full(shape, default).tolist()
+                column = [default if value is None else value for value in column]
+            if len(column):
+                store._columns[name][:size] = column
+
+        return store
+
+    @property
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Views over the filled part of every column"""
+        return {name: column[: self._size] for name, column in self._columns.items()}
+
+    def __getattr__(self, key: str) -> np.ndarray:
+        columns = self.__dict__.get("_columns")
+        if columns is not None and key in columns:
+            return columns[key][: self._size]
+
+        raise AttributeError(key)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[Any]:
+        for row in range(self._size):
+            yield self._get(row)
+
+    def __getitem__(self, key: Union[int, slice, Sequence[int], np.ndarray]):
+        if isinstance(key, (int, np.integer)):
+            row = int(key)
+            if row < 0:
+                row += self._size
+            if not 0 <= row < self._size:
+                raise IndexError("annotation index out of range")
+            return self._get(row)
+
+        if isinstance(key, slice):
+            return self.take(np.arange(self._size)[key])
+
+        return self.take(key)
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}"
+            f"(annotation_type={self.annotation_type.__name__}, size={self._size})"
+        )
+
+    def _get(self, row: int) -> Any:
+        return AnnotationView(self, row) if self.lazy else self._build(row)
+
+    def _build(self, row: int) -> Any:
+        # every field is given, since mousse would otherwise fill a missing
+        # field with the value left by a collected annotation of the same id
+        data = {
+            name: (
+                copy.deepcopy(default) if isinstance(default, (list, dict)) else default
+            )
+            for name, default in self._defaults()
+        }
+        data.update(
+            (name, column[row].tolist()) for name, column in self._columns.items()
+        )
+        for name, null in self._nulls().items():
+            if data[name] == null:
+                data[name] = None
+        for name, value in self.extras.get(row, {}).items():
+            data[name] = unpack(value)
+        return self.annotation_type(**data)
+
+    def _defaults(self) -> List[Tuple[str, Any]]:
+        defaults = self.__dict__.get("_field_defaults")
+        if defaults is None:
+            defaults = [
+                (name, field.default)
+                for name, field in get_fields_info(self.annotation_type).items()
+                if name not in self._columns
+                and not field.private
+                and field.default is not Ellipsis
+            ]
+            self._field_defaults = defaults
+        return defaults
+
+    def _nulls(self) -> Dict[str, Any]:
+        """Schema default of every scalar column whose field defaults to None"""
+        nulls = self.__dict__.get("_field_nulls")
+        if nulls is None:
+            fields = get_fields_info(self.annotation_type)
+            nulls = {
+                name: default
+                for name, (_, shape, default) in self.schema.items()
+                if not shape and name in fields and fields[name].default is None
+            }
+            self._field_nulls = nulls
+        return nulls
+
+    def _resize(self, size: int):
+        capacity = len(self._columns["annotation_id"])
+        if size > capacity:
+            capacity = max(size, 2 * capacity, 16)
+            for name, column in self._columns.items():
+                resized = np.empty((capacity,) + column.shape[1:], dtype=column.dtype)
+                resized[: self._size] = column[: self._size]
+                self._columns[name] = resized
+
+        self._size = size
+
+    def append(self, annotation: Any):
+        """Append an annotation object as a new row"""
+        self.extend([annotation])
+
+    def extend(self, annotations: Iterable[Any]):
+        """Append annotation objects, or the rows of another store"""
+        if not isinstance(annotations, AnnotationStore):
+            annotations = self.from_annotations(annotations, self.annotation_type)
+
+        offset = self._size
+        self._resize(offset + len(annotations))
+        for name, column in self._columns.items():
+            column[offset : self._size] = annotations._columns[name][: len(annotations)]
+
+        for row, extra in annotations.extras.items():
+            self.extras[offset + row] = extra
+
+        self.version += 1
+
+    def take(self, rows: Union[Sequence[int], np.ndarray]) -> "AnnotationStore":
+        """Select rows into a new store
+
+        Args:
+            rows (Union[Sequence[int], np.ndarray]): row positions, or a boolean mask
+
+        Returns:
+            AnnotationStore: store holding the selected rows, in the given order
+        """
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        rows = rows.astype(np.int64, copy=False)
+
+        columns = {name: column[rows] for name, column in self.columns.items()}
+        extras = {}
+        if self.extras:
+            for new_row, row in enumerate(rows.tolist()):
+                if row in self.extras:
+                    extras[new_row] = self.extras[row]
+
+        return self.__class__(
+            self.annotation_type, columns=columns, extras=extras, lazy=self.lazy
+        )
+
+    def values(self, name: str) -> List[Any]:
+        """Values of a column as python objects, with None for the null default"""
+        column = self._columns[name][: self._size]
+        values = column.tolist()
+        null = self._nulls().get(name)
+        if null is not None:
+            for row in np.flatnonzero(column == null).tolist():
+                values[row] = None
+        return values
+
+    def to_records(
+        self, by_alias: bool = False, skip_empty: bool = False
+    ) -> Iterator[Dict[str, Any]]:
+        """Rows as plain dicts holding every public field, built column-wise
+
+        Args:
+            by_alias (bool, optional): key fields by their alias, like `id` for `annotation_id`. Defaults to False.
+            skip_empty (bool, optional): leave out fields holding an empty default, like `keypoints: []`. Defaults to False.
+        """
+        fields = {
+            name: field
+            for name, field in get_fields_info(self.annotation_type).items()
+            if not field.private
+        }
+        keys = {
+            name: (field.alias or name) if by_alias else name
+            for name, field in fields.items()
+        }
+        defaults = {
+            keys[name]: field.default
+            for name, field in fields.items()
+            if name not in self._columns
+            and field.default is not Ellipsis
+            and not (skip_empty and has_empty_default(field))
+        }
+
+        names = [name for name in self._columns if name in fields]
+        nulls = self._nulls()
+        columns = [self.values(name) for name in names]
+        skipped = [keys[name] for name in names if name in nulls and skip_empty]
+        names = [keys[name] for name in names]
+
+        for row, values in enumerate(zip(*columns)):
+            record = dict(zip(names, values))
+            for key in skipped:
+                if record[key] is None:
+                    del record[key]
+            record.update(defaults)
+            extra = self.extras.get(row)
+            if extra:
+                for name, value in extra.items():
+                    value = asdict(unpack(value), by_alias=by_alias)
+                    if skip_empty and name in fields:
+                        if is_empty_default(value, fields[name]):
+                            continue
+                    record[keys.get(name, name)] = value
+            yield record
+
+    def group_rows(self, *keys: str) -> Dict[Hashable, np.ndarray]:
+        """Positions of the rows sharing the same values of some columns
+
+        Args:
+            keys (str): columns to group by. Defaults to "image_id".
+
+        Returns:
+            Dict[Hashable, np.ndarray]: mapping from column value, or tuple of values for several columns, to row positions
+        """
+        keys = keys or ("image_id",)
+        return group_rows(*(getattr(self, key) for key in keys))
+
+    def to_df(self) -> "pd.DataFrame":
+        """Export the store column-wise, with free-form fields as object columns"""
+        import pandas as pd
+
+        data = {}
+        for name, column in self.columns.items():
+            if column.ndim == 1:
+                data[name] = column
+            else:
+                data[name] = list(column)
+
+        names = {}
+        for extra in self.extras.values():
+            for name in extra:
+                names[name] = None
+
+        for name in names:
+            column = [None] * self._size
+            for row, extra in self.extras.items():
+                if name in extra:
+                    column[row] = unpack(extra[name])
+            data[name] = column
+
+        return pd.DataFrame(data=data)
+
+
+class ODAnnotationStore(AnnotationStore):
+    """Columnar storage of object detection annotations, with ltwh boxes"""
+
+    schema = {
+        **AnnotationStore.schema,
+        "bbox": (np.float64, (4,), np.nan),
+        "area": (np.float64, (), 0),
+        "score": (np.float64, (), 1),
+    }
+
+    def to_df(self) -> "pd.DataFrame":
+        df = super().to_df()
+        bbox = self.bbox
+        df = df.drop(columns="bbox")
+        for i, name in enumerate(("left", "top", "width", "height")):
+            df.insert(3 + i, name, bbox[:, i])
+
+        return df
@@ -0,0 +1,197 @@
+from types import FunctionType, MappingProxyType
+from typing import *
+
+from mousse import Dataclass
+from mousse.types import get_fields_info
+
+from .columnar import AnnotationStore, unpack
+
+__all__ = ["CompactRecord", "compact_type", "to_compact"]
+
+# shared by every record whose mapping field is empty
+EMPTY_MAPPING = MappingProxyType({})
+
+
+def freeze(value: Any) -> Any:
+    """Immutable counterpart of a field value: lists become tuples, empty dicts a shared mapping"""
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, dict) and not value:
+        return EMPTY_MAPPING
+
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """Value of a compact field as expected by the Dataclass constructor"""
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    if isinstance(value, MappingProxyType):
+        return dict(value)
+
+    return value
+
+
+class CompactRecord:
+    """Slotted, read-mostly counterpart of a Dataclass model
+
+    Fields are plain slots, so reading one costs a descriptor lookup instead
+    of the accessor machinery of mousse, and instances carry no `__dict__`.
+    Sequences are stored as tuples and empty defaults are shared between
+    instances. Values are not validated: build compact records from parsed
+    objects or stores, and go back with `to_record` to edit them.
+    """
+
+    __slots__ = ()
+
+    record_type: Type = None
+    _fields: Tuple[str, ...] = ()
+    _defaults: Tuple[Any, ...] = ()
+
+    def __init__(self, **values: Any):
+        for name, default in zip(self._fields, self._defaults):
+            setattr(self, name, freeze(values.get(name, default)))
+
+    @classmethod
+    def from_values(cls, values: Sequence[Any]) -> "CompactRecord":
+        """Build a record from values already frozen, in the order of `_fields`"""
+        record = cls.__new__(cls)
+        for name, value in zip(cls._fields, values):
+            setattr(record, name, value)
+
+        return record
+
+    @classmethod
+    def from_record(cls, record: Any) -> "CompactRecord":
+        return cls.from_values([freeze(getattr(record, name)) for name in cls._fields])
+
+    def to_record(self) -> Any:
+        """The Dataclass object holding the same values"""
+        return self.record_type(**{name: thaw(value) for name, value in self})
+
+    def __iter__(self) -> Iterator[Tuple[str, Any]]:
+        for name in self._fields:
+            yield name, getattr(self, name)
+
+    def __eq__(self, other: Any) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+
+        return all(getattr(self, name) == getattr(other, name) for name in self._fields)
+
+    __hash__ = None
+
+    def __reduce__(self):
+        # compact classes are built at runtime, so they are pickled through their model
+        return rebuild_record, (self.record_type, [thaw(value) for _, value in self])
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={value!r}" for name, value in self)
+        return f"{self.__class__.__name__}({fields})"
+
+
+COMPACT_TYPES: Dict[Type, Type[CompactRecord]] = {}
+
+
+def compact_type(record_type: Type) -> Type[CompactRecord]:
+    """Slotted class mirroring the public fields of a Dataclass model, built once per model
+
+    Plain methods and properties of the model, like `ODAnnotation.get_bbox`,
+    are carried over, since they only read fields.
+
+    Args:
+        record_type (Type): Dataclass model, like `ODAnnotation`
+
+    Returns:
+        Type[CompactRecord]: compact class, named after the model
+    """
+    compact = COMPACT_TYPES.get(record_type)
+    if compact is not None:
+        return compact
+
+    fields = {
+        name: field
+        for name, field in get_fields_info(record_type).items()
+        if not field.private
+    }
+    namespace = {}
+    for base in reversed(record_type.__mro__):
+        if base in (Dataclass, object):
+            continue
+        for key, value in vars(base).items():
+            if key.startswith("__") or key in fields:
+                continue
+            if isinstance(value, (FunctionType, property, classmethod, staticmethod)):
+                namespace[key] = value
+
+    namespace.update(
+        __slots__=tuple(fields),
+        __module__=record_type.__module__,
+        record_type=record_type,
+        _fields=tuple(fields),
+        _defaults=tuple(
+            None if field.default is Ellipsis else freeze(field.default)
+            for field in fields.values()
+        ),
+    )
+    compact = type(f"Compact{record_type.__name__}", (CompactRecord,), namespace)
+    COMPACT_TYPES[record_type] = compact
+    return compact
+
+
+def rebuild_record(record_type: Type, values: List[Any]) -> CompactRecord:
+    return compact_type(record_type).from_values([freeze(value) for value in values])
+
+
+def store_to_compact(store: AnnotationStore) -> List[CompactRecord]:
+    compact = compact_type(store.annotation_type)
+    defaults = dict(zip(compact._fields, compact._defaults))
+
+    columns = []
+    for name in compact._fields:
+        column = store.columns.get(name)
+        if column is None:
+            columns.append([defaults[name]] * len(store))
+        elif column.ndim > 1:
+            columns.append(list(map(tuple, column.tolist())))
+        else:
+            columns.append(store.values(name))
+
+    positions = {name: i for i, name in enumerate(compact._fields)}
+    records = []
+    for row, values in enumerate(zip(*columns)):
+        extra = store.extras.get(row)
+        if extra:
+            values = list(values)
+            for name, value in extra.items():
+                if name in positions:
+                    values[positions[name]] = freeze(unpack(value))
+        records.append(compact.from_values(values))
+
+    return records
+
+
+def to_compact(
+    records: Union[Sequence[Any], AnnotationStore], record_type: Type = None
+) -> List[CompactRecord]:
+    """Compact copies of Dataclass objects, or of the rows of an annotation store
+
+    Rows of a store are built column-wise, without going through typed
+    annotations.
+
+    Args:
+        records (Union[Sequence[Any], AnnotationStore]): objects to convert
+        record_type (Type, optional): model of the objects. Defaults to the type of the first one.
+
+    Returns:
+        List[CompactRecord]: compact records, in the same order
+    """
+    if isinstance(records, AnnotationStore):
+        return store_to_compact(records)
+
+    records = list(records)
+    if not records:
+        return []
+
+    compact = compact_type(record_type or type(records[0]))
+    return [compact.from_record(record) for record in records]
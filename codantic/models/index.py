@@ -0,0 +1,137 @@
+from typing import *
+
+import numpy as np
+
+from codantic.core.bbox import BBoxType, convert_bboxes
+from codantic.core.index import LazyIndex, cached_index
+from codantic.core.rtree import PackedRTree
+
+from .columnar import AnnotationStore, group_rows
+
+__all__ = ["CocoDatasetIndex"]
+
+EMPTY_ROWS = np.empty(0, dtype=np.int64)
+
+
+class CocoDatasetIndex(LazyIndex):
+    """Cached id lookups over a CocoDataset.
+
+    Annotation lookups are kept as row positions and resolved against the
+    annotations on demand, which works the same for a list of annotations and
+    for a columnar store. Mappings held by the index are shared by every
+    caller and must be treated as read-only, the getters of the dataset
+    return copies of them.
+    """
+
+    @cached_index("images")
+    def images(self, dataset) -> Dict[int, Any]:
+        return {image.image_id: image for image in dataset.images}
+
+    @cached_index("categories")
+    def categories(self, dataset) -> Dict[int, Any]:
+        return {category.category_id: category for category in dataset.categories}
+
+    @cached_index("annotations")
+    def keys(self, dataset) -> Dict[str, np.ndarray]:
+        annotations = dataset.annotations
+        if isinstance(annotations, AnnotationStore):
+            return {
+                "annotation_id": annotations.annotation_id,
+                "image_id": annotations.image_id,
+                "category_id": annotations.category_id,
+            }
+
+        keys = {}
+        for key in ("annotation_id", "image_id", "category_id"):
+            values = (getattr(annotation, key) for annotation in annotations)
+            keys[key] = np.fromiter(
+                (-1 if value is None else value for value in values),
+                dtype=np.int64,
+                count=len(annotations),
+            )
+        return keys
+
+    @cached_index("annotations")
+    def store(self, dataset) -> AnnotationStore:
+        if dataset.is_columnar:
+            return dataset.annotations
+
+        return dataset.annotation_store_type.from_annotations(
+            dataset.annotations, dataset.get_annotation_type()
+        )
+
+    @cached_index("annotations")
+    def annotation_rows(self, dataset) -> Dict[int, int]:
+        annotation_ids = self.keys["annotation_id"].tolist()
+        return dict(zip(annotation_ids, range(len(annotation_ids))))
+
+    @cached_index("annotations")
+    def image_rows(self, dataset) -> Dict[int, np.ndarray]:
+        return group_rows(self.keys["image_id"])
+
+    @cached_index("annotations")
+    def category_rows(self, dataset) -> Dict[int, np.ndarray]:
+        return group_rows(self.keys["category_id"])
+
+    @cached_index("annotations")
+    def image_category_rows(self, dataset) -> Dict[Tuple[int, int], np.ndarray]:
+        return group_rows(self.keys["image_id"], self.keys["category_id"])
+
+    def select(self, rows: np.ndarray) -> Sequence[Any]:
+        """Annotations at some row positions, as a list or as a store for a columnar dataset"""
+        annotations = self.dataset.annotations
+        if isinstance(annotations, AnnotationStore):
+            return annotations.take(rows)
+
+        return [annotations[row] for row in rows.tolist()]
+
+    def annotation(self, annotation_id: int) -> Optional[Any]:
+        row = self.annotation_rows.get(annotation_id)
+        if row is None:
+            return None
+
+        return self.dataset.annotations[row]
+
+    def annotations_for(
+        self, image_id: int, category_id: Optional[int] = None
+    ) -> Sequence[Any]:
+        if category_id is None:
+            rows = self.image_rows.get(image_id, EMPTY_ROWS)
+        else:
+            rows = self.image_category_rows.get((image_id, category_id), EMPTY_ROWS)
+
+        return self.select(rows)
+
+    def category_annotations(self, category_id: int) -> Sequence[Any]:
+        return self.select(self.category_rows.get(category_id, EMPTY_ROWS))
+
+    def annotation_groups(
+        self, category_id: Optional[int] = None
+    ) -> Dict[int, Sequence[Any]]:
+        """Annotations of every image, as a new mapping of new groups on every call"""
+
+        def build(index: CocoDatasetIndex, dataset) -> Dict[int, Sequence[Any]]:
+            if category_id is None:
+                return {
+                    image_id: index.select(rows)
+                    for image_id, rows in index.image_rows.items()
+                }
+
+            return {
+                image_id: index.select(rows)
+                for (image_id, _category_id), rows in index.image_category_rows.items()
+                if _category_id == category_id
+            }
+
+        groups = self.get(f"annotation_groups[{category_id}]", ("annotations",), build)
+        return {image_id: group[:] for image_id, group in groups.items()}
+
+    def spatial(self, image_id: int) -> Tuple[np.ndarray, PackedRTree]:
+        """Rows of the annotations of an image, with an R-tree over their boxes"""
+
+        def build(index: CocoDatasetIndex, dataset) -> Tuple[np.ndarray, PackedRTree]:
+            rows = index.image_rows.get(image_id, EMPTY_ROWS)
+            boxes = convert_bboxes(index.store.bbox[rows], BBoxType.ltwh, BBoxType.ltrb)
+            return rows, PackedRTree(boxes)
+
+        return self.get(f"spatial[{image_id}]", ("annotations",), build)
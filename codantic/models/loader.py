@@ -0,0 +1,163 @@
+import copy
+from pathlib import Path
+from typing import *
+
+from mousse import Dataclass, asclass
+from mousse.types import get_args, get_fields_info
+
+from codantic.io import JSONStream
+from codantic.profiling import timed
+
+__all__ = ["CocoStreamLoader", "stream_annotations"]
+
+
+def default_fields(dataset_type: Type) -> Dict[str, Any]:
+    """Fresh values of the container fields of a dataset type.
+
+    mousse keeps per-instance field info keyed by `id()`, so deep copying a
+    Dataclass default, like `info`, fails when the copy reuses the id of a
+    collected object of another class. Giving these fields skips that copy.
+    """
+    fields = {}
+    for name, field in get_fields_info(dataset_type).items():
+        if isinstance(field.default, (Dataclass, list, dict)):
+            fields[name] = type(field.default)()
+
+    return fields
+
+
+def record_defaults(record_type: Type) -> List[Tuple[str, Any]]:
+    """Json key and default of every public field of a record type having a default"""
+    return [
+        (field.alias or name, field.default)
+        for name, field in get_fields_info(record_type).items()
+        if not field.private and field.default is not Ellipsis
+    ]
+
+
+def with_defaults(
+    value: Dict[str, Any], defaults: List[Tuple[str, Any]]
+) -> Dict[str, Any]:
+    """Fill the keys missing from a json record with their default
+
+    mousse keeps field values keyed by `id()`, so a field left out of the
+    constructor may read the value of a collected object of the same id.
+    """
+    for key, default in defaults:
+        if key not in value:
+            value[key] = (
+                copy.deepcopy(default) if isinstance(default, (list, dict)) else default
+            )
+
+    return value
+
+
+def new_dataset(dataset_type: Type) -> Any:
+    """Empty dataset built with a fresh value for every container field"""
+    return dataset_type(**default_fields(dataset_type))
+
+
+class CocoStreamLoader:
+    """Incremental loader of a COCO json file.
+
+    Iterating over the loader yields batches of typed annotations, or of raw
+    json records with `raw`. Every other top-level member (info, licenses,
+    images, categories) is collected into `dataset` as soon as it is read, so
+    the dataset is complete, except for its annotations, once the iteration
+    ends.
+    """
+
+    def __init__(
+        self,
+        dataset_type: Type,
+        path: Union[str, Path],
+        batch_size: int = 10000,
+        chunk_size: int = 1 << 20,
+        raw: bool = False,
+    ):
+        self.dataset_type = dataset_type
+        self.dataset = new_dataset(dataset_type)
+        self.batch_size = batch_size
+        self.raw = raw
+        self.stream = JSONStream(path, chunk_size=chunk_size)
+
+    @property
+    def bytes_read(self) -> int:
+        return self.stream.bytes_read
+
+    @property
+    def total_bytes(self) -> int:
+        return self.stream.total_bytes
+
+    @property
+    def elapsed(self) -> float:
+        return self.stream.elapsed
+
+    @property
+    def throughput(self) -> float:
+        """Bytes of the file parsed per second"""
+        return self.stream.throughput
+
+    def __iter__(self) -> Iterator[List[Any]]:
+        fields = get_fields_info(self.dataset_type)
+        item_types = {}
+        defaults = {}
+        for key, field in fields.items():
+            args = get_args(field.annotation)
+            if args:
+                item_types[key] = args[0]
+                defaults[key] = record_defaults(args[0])
+
+        annotation_type = item_types["annotations"]
+        annotation_defaults = defaults["annotations"]
+        # building records is timed apart, the rest of the loop being json parsing
+        build = timed("build", asclass)
+        batch = []
+        for key, value in self.stream:
+            if key == "annotations":
+                if not self.raw:
+                    value = build(
+                        annotation_type, with_defaults(value, annotation_defaults)
+                    )
+                batch.append(value)
+                if len(batch) >= self.batch_size:
+                    yield batch
+                    batch = []
+
+            elif key in item_types:
+                value = with_defaults(value, defaults[key])
+                getattr(self.dataset, key).append(build(item_types[key], value))
+
+            elif key in fields:
+                setattr(self.dataset, key, value)
+
+        if batch:
+            yield batch
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(path={self.stream.path}, "
+            f"bytes_read={self.bytes_read}/{self.total_bytes}, "
+            f"throughput={self.throughput / (1 << 20):.2f}MB/s)"
+        )
+
+
+def stream_annotations(
+    path: Union[str, Path], dataset_type: Type = None, batch_size: int = 10000
+) -> Iterator[List[Any]]:
+    """Stream the annotations of a COCO json file in batches
+
+    Args:
+        path (Union[str, Path]): path to the json file, optionally gzipped
+        dataset_type (Type, optional): dataset class deciding the annotation type. Defaults to CocoDataset.
+        batch_size (int, optional): number of annotations per batch. Defaults to 10000.
+
+    Yields:
+        List[Annotation]: batch of typed annotations
+    """
+    if dataset_type is None:
+        from .base import CocoDataset
+
+        dataset_type = CocoDataset
+
+    yield from CocoStreamLoader(dataset_type, path, batch_size=batch_size)
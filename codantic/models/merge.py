@@ -0,0 +1,249 @@
+import contextlib
+import json
+import tempfile
+from enum import Enum
+from pathlib import Path
+from typing import *
+
+import numpy as np
+
+from codantic.io import JSONWriter, hash_file
+
+from .columnar import AnnotationStore, copy_record, record_to_dict, remap_ids
+from .loader import new_dataset
+from .writer import iter_records
+
+__all__ = ["DatasetMerger", "ImageKey", "MergeConflict"]
+
+
+class MergeConflict(str, Enum):
+    # annotations of a duplicate image go to the first copy
+    keep_first: str = "keep_first"
+    # later copies of an image are dropped with their annotations
+    drop: str = "drop"
+    # a duplicate image raises a ValueError
+    error: str = "error"
+
+
+class ImageKey(str, Enum):
+    file_name: str = "file_name"  # images sharing a file name are duplicates
+    content: str = "content"  # images whose files have the same bytes are duplicates
+
+
+class DatasetMerger:
+    """Merge COCO datasets one shard at a time.
+
+    Images and annotations are renumbered from 1 in the order they are
+    added, categories are unified by name and licenses by name and url. Only
+    the id mappings of images, categories and licenses are kept across
+    shards, so a shard can be released as soon as it has been added.
+    """
+
+    def __init__(
+        self,
+        dataset_type: Type,
+        on_conflict: MergeConflict = MergeConflict.keep_first,
+        dedupe: Optional[ImageKey] = ImageKey.file_name,
+        image_root: Union[str, Path] = None,
+    ):
+        self.dataset_type = dataset_type
+        self.on_conflict = MergeConflict(on_conflict)
+        self.dedupe = None if dedupe is None else ImageKey(dedupe)
+        self.image_root = Path(image_root or ".")
+
+        self.info = None
+        self.categories: Dict[str, Any] = {}
+        self.licenses: Dict[Tuple[str, str], Any] = {}
+        self.image_ids: Dict[Hashable, int] = {}
+        self.num_images = 0
+        self.num_annotations = 0
+
+    def load(self, source: Union[Any, str, Path]) -> Any:
+        if isinstance(source, (str, Path)):
+            return self.dataset_type.load(source, columnar=True)
+
+        return source
+
+    def image_key(self, image: Any) -> Hashable:
+        if self.dedupe == ImageKey.content:
+            return hash_file(self.image_root / image.file_name)
+
+        return image.file_name
+
+    def add(self, dataset: Any) -> Tuple[List[Any], Union[AnnotationStore, List[Any]]]:
+        """Remap the ids of a shard against the shards added before
+
+        Annotations of unknown or dropped images, or whose category is set but
+        unknown, are left out. Columnar annotations are remapped column-wise,
+        and a list of annotations is copied record by record, keeping their
+        other values as they are.
+
+        Args:
+            dataset (CocoDataset): shard to add
+
+        Raises:
+            ValueError: if an image is duplicated and `on_conflict` is error
+
+        Returns:
+            Tuple[List[Image], Union[AnnotationStore, List[Annotation]]]: new images of the shard, and its remapped annotations
+        """
+        if self.info is None:
+            self.info = dataset.info
+
+        category_ids = {}
+        for category in dataset.categories:
+            name = category.name.strip()
+            if name not in self.categories:
+                self.categories[name] = copy_record(
+                    category, category_id=len(self.categories) + 1, name=name
+                )
+            category_ids[category.category_id] = self.categories[name].category_id
+
+        license_ids = {}
+        for dataset_license in dataset.licenses:
+            key = (dataset_license.name, dataset_license.url)
+            if key not in self.licenses:
+                self.licenses[key] = copy_record(
+                    dataset_license, license_id=len(self.licenses) + 1
+                )
+            license_ids[dataset_license.license_id] = self.licenses[key].license_id
+
+        images = []
+        image_ids = {}
+        for image in dataset.images:
+            key = None if self.dedupe is None else self.image_key(image)
+            if key is not None and key in self.image_ids:
+                if self.on_conflict == MergeConflict.error:
+                    raise ValueError(f"Duplicate image {key!r}")
+                if self.on_conflict == MergeConflict.keep_first:
+                    image_ids[image.image_id] = self.image_ids[key]
+                continue
+
+            self.num_images += 1
+            image_ids[image.image_id] = self.num_images
+            if key is not None:
+                self.image_ids[key] = self.num_images
+            images.append(
+                copy_record(
+                    image,
+                    image_id=self.num_images,
+                    license_id=license_ids.get(image.license_id),
+                )
+            )
+
+        keys = dataset.index.keys
+        image_id = remap_ids(keys["image_id"], image_ids)
+        category_id = remap_ids(keys["category_id"], category_ids)
+        # annotations without a category, like captions, keep their -1 sentinel
+        known = (category_id >= 0) | (keys["category_id"] < 0)
+        rows = np.flatnonzero((image_id >= 0) & known)
+        annotation_id = np.arange(
+            self.num_annotations + 1, self.num_annotations + len(rows) + 1
+        )
+        self.num_annotations += len(rows)
+
+        annotations = dataset.annotations
+        if isinstance(annotations, AnnotationStore):
+            store = annotations.take(rows)
+            store.annotation_id[:] = annotation_id
+            store.image_id[:] = image_id[rows]
+            store.category_id[:] = category_id[rows]
+            return images, store
+
+        copies = []
+        for row, new_id, new_image_id, new_category_id in zip(
+            rows.tolist(),
+            annotation_id.tolist(),
+            image_id[rows].tolist(),
+            category_id[rows].tolist(),
+        ):
+            changes = dict(annotation_id=new_id, image_id=new_image_id)
+            if new_category_id >= 0:
+                changes["category_id"] = new_category_id
+            copies.append(copy_record(annotations[row], **changes))
+
+        return images, copies
+
+    def merge(self, sources: Iterable[Union[Any, str, Path]]) -> Any:
+        """Merge shards into a columnar dataset
+
+        Args:
+            sources (Iterable[Union[CocoDataset, str, Path]]): datasets, or paths to their json files
+
+        Returns:
+            CocoDataset: merged dataset
+        """
+        images = []
+        store = self.dataset_type.annotation_store_type(
+            self.dataset_type.get_annotation_type()
+        )
+        for source in sources:
+            shard_images, annotations = self.add(self.load(source))
+            images.extend(shard_images)
+            store.extend(annotations)
+
+        info = self.info
+        if info is None:
+            info = new_dataset(self.dataset_type).info
+
+        return self.dataset_type.from_store(
+            store,
+            info=info,
+            licenses=list(self.licenses.values()),
+            images=images,
+            categories=list(self.categories.values()),
+        )
+
+    def write(self, sources: Iterable[Union[Any, str, Path]], path: Union[str, Path]):
+        """Merge shards straight into a COCO json file, optionally gzipped
+
+        Images and annotations of every shard are spilled to temporary files
+        as soon as the shard is added, so only one shard is held in memory.
+
+        Args:
+            sources (Iterable[Union[CocoDataset, str, Path]]): datasets, or paths to their json files
+            path (Union[str, Path]): path of the merged json file
+        """
+        with contextlib.ExitStack() as stack:
+            images_file = stack.enter_context(tempfile.TemporaryFile("w+"))
+            annotations_file = stack.enter_context(tempfile.TemporaryFile("w+"))
+            for source in sources:
+                images, annotations = self.add(self.load(source))
+                for image in images:
+                    images_file.write(
+                        json.dumps(
+                            record_to_dict(image, by_alias=True, skip_empty=True)
+                        )
+                    )
+                    images_file.write("\n")
+                for record in iter_records(annotations):
+                    annotations_file.write(json.dumps(record))
+                    annotations_file.write("\n")
+
+            writer = stack.enter_context(JSONWriter(path))
+            if self.info is not None:
+                writer.write(
+                    "info", record_to_dict(self.info, by_alias=True, skip_empty=True)
+                )
+            writer.write_array(
+                "licenses",
+                (
+                    record_to_dict(item, by_alias=True, skip_empty=True)
+                    for item in self.licenses.values()
+                ),
+            )
+            writer.write_array(
+                "categories",
+                (
+                    record_to_dict(item, by_alias=True, skip_empty=True)
+                    for item in self.categories.values()
+                ),
+            )
+            for key, spilled in (
+                ("images", images_file),
+                ("annotations", annotations_file),
+            ):
+                spilled.seek(0)
+                writer.write_array(
+                    key, (line.rstrip("\n") for line in spilled), encoded=True
+                )
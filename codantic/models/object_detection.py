@@ -1,9 +1,16 @@
 from typing import *
 
+import numpy as np
 from mousse import Dataclass
+
+from codantic.core.bbox import BBoxArray, BBoxType, convert_bboxes
+from codantic.core.rtree import RegionMode, region_mask
+
 from .base import Annotation, CocoDataset
+from .columnar import AnnotationStore, ODAnnotationStore
+from .suppression import NMSMethod, suppress
 
-__all__ = ["BBox", "ODAnnotation", "ODCocoDataset"]
+__all__ = ["BBox", "ODAnnotation", "ODCocoDataset", "Tile"]
 
 
 class BBox(Dataclass):
@@ -24,6 +31,9 @@ class BBox(Dataclass):
     def area(self):
         return (self.right - self.left) * (self.bottom - self.top)
 
+    def to_array(self) -> BBoxArray:
+        return BBoxArray([self.ltrb()], BBoxType.ltrb)
+
     def ltrb(self, dtype: Type = float):
         return dtype(self.left), dtype(self.top), dtype(self.right), dtype(self.bottom)
 
@@ -75,10 +85,10 @@ class BBox(Dataclass):
 
     def __and__(self, other: "BBox") -> Optional["BBox"]:
         if (
-            self.left <= other.right
+            self.left >= other.right
             or self.right <= other.left
-            or self.bottom >= other.top
-            or self.top <= other.bottom
+            or self.top >= other.bottom
+            or self.bottom <= other.top
         ):
             return None
 
@@ -100,5 +110,209 @@ class ODAnnotation(Annotation):
         return BBox(left=x_min, top=y_min, right=x_min + width, bottom=y_min + height)
 
 
+class Tile(NamedTuple):
+    """Window of an image, with the annotations it holds"""
+
+    bbox: Tuple[float, float, float, float]  # ltwh, in image coordinates
+    annotations: AnnotationStore
+
+
 class ODCocoDataset(CocoDataset):
     annotations: List[ODAnnotation] = []
+
+    annotation_store_type = ODAnnotationStore
+
+    def get_bboxes(self, type: BBoxType = BBoxType.ltwh) -> BBoxArray:
+        """Boxes of all annotations as a batch, in annotation order
+
+        Args:
+            type (BBoxType, optional): format of the returned boxes. Defaults to BBoxType.ltwh.
+
+        Returns:
+            BBoxArray: boxes read from the annotation store
+        """
+        return BBoxArray(self.get_annotation_store().bbox, BBoxType.ltwh).to(type)
+
+    def filter_score(self, min_score: float) -> "ODCocoDataset":
+        """Keep annotations scored at least `min_score`
+
+        Returns:
+            ODCocoDataset: new dataset sharing the kept annotations and everything else with this one
+        """
+        store = self.get_annotation_store()
+        return self.select(np.flatnonzero(store.score >= min_score))
+
+    def nms(
+        self,
+        iou_threshold: float = 0.5,
+        per_category: bool = True,
+        top_k: int = None,
+        method: NMSMethod = NMSMethod.hard,
+        sigma: float = 0.5,
+        min_score: float = 0.0,
+        workers: int = 1,
+    ) -> "ODCocoDataset":
+        """Suppress overlapping predictions of each image
+
+        Args:
+            iou_threshold (float, optional): overlap above which boxes suppress or fuse with each other. Defaults to 0.5.
+            per_category (bool, optional): only compare boxes of the same category. Defaults to True.
+            top_k (int, optional): number of boxes kept per image, or per image and category. Defaults to None.
+            method (NMSMethod, optional): hard NMS, linear or gaussian soft-NMS, or weighted box fusion. Defaults to NMSMethod.hard.
+            sigma (float, optional): spread of the gaussian soft-NMS. Defaults to 0.5.
+            min_score (float, optional): lowest score kept, after soft-NMS decay. Defaults to 0.0.
+            workers (int, optional): number of threads. Defaults to 1.
+
+        Returns:
+            ODCocoDataset: new dataset. Annotations whose box and score are unchanged are shared with this one.
+        """
+        store = self.get_annotation_store()
+        keys = (store.image_id,)
+        if per_category:
+            keys += (store.category_id,)
+
+        kept = suppress(
+            store.bbox,
+            store.score,
+            keys,
+            method=method,
+            iou_threshold=iou_threshold,
+            sigma=sigma,
+            min_score=min_score,
+            top_k=top_k,
+            workers=workers,
+        )
+        return self.select(kept.rows, score=kept.score, bbox=kept.bbox)
+
+    def query_region(
+        self,
+        image_id: int,
+        box: Union[BBox, Sequence[float]],
+        mode: RegionMode = RegionMode.intersect,
+        type: BBoxType = BBoxType.ltwh,
+    ) -> Sequence[ODAnnotation]:
+        """Annotations of an image overlapping, or lying inside, a region
+
+        The boxes of each image are indexed by an R-tree built on the first
+        query and kept until the annotations change.
+
+        Args:
+            image_id (int): image to search
+            box (Union[BBox, Sequence[float]]): region to search
+            mode (RegionMode, optional): keep boxes overlapping the region with a positive area, or boxes inside it. Defaults to RegionMode.intersect.
+            type (BBoxType, optional): format of `box` when given as a sequence. Defaults to BBoxType.ltwh.
+
+        Returns:
+            Sequence[ODAnnotation]: matching annotations in dataset order, as a store for a columnar dataset
+        """
+        if isinstance(box, BBox):
+            region = np.asarray(box.ltrb())
+        else:
+            region = convert_bboxes(np.asarray([box]), type, BBoxType.ltrb)[0]
+
+        rows, tree = self.index.spatial(image_id)
+        return self.index.select(rows[tree.query(region, mode)])
+
+    def tile(
+        self,
+        image_id: int,
+        tile_size: Union[float, Tuple[float, float]],
+        stride: Union[float, Tuple[float, float]] = None,
+        mode: RegionMode = RegionMode.intersect,
+        relative: bool = True,
+    ) -> List[Tile]:
+        """Cut an image into a grid of tiles and gather the annotations of each
+
+        Tiles start at multiples of `stride` and cover the image, the last row
+        and column possibly running past its border. The tiles each box falls
+        in are derived from its coordinates, so the whole grid is matched at
+        once. Boxes are clipped to their tile, and their area updated.
+
+        Args:
+            image_id (int): image to cut
+            tile_size (Union[float, Tuple[float, float]]): width and height of the tiles, or a single size for square tiles
+            stride (Union[float, Tuple[float, float]], optional): offset between tiles. Defaults to `tile_size`.
+            mode (RegionMode, optional): keep boxes overlapping a tile, or boxes inside it. Defaults to RegionMode.intersect.
+            relative (bool, optional): express clipped boxes in tile coordinates. Defaults to True.
+
+        Returns:
+            List[Tile]: tiles in row-major order, empty ones included
+        """
+        tile_size = np.broadcast_to(np.asarray(tile_size, dtype=np.float64), (2,))
+        stride = tile_size if stride is None else stride
+        stride = np.broadcast_to(np.asarray(stride, dtype=np.float64), (2,))
+
+        store = self.get_annotation_store()
+        rows = self.index.image_rows.get(image_id, np.empty(0, dtype=np.int64))
+        boxes = convert_bboxes(store.bbox[rows], BBoxType.ltwh, BBoxType.ltrb)
+
+        image = self.index.images.get(image_id)
+        extent = np.zeros(2)
+        if len(boxes):
+            extent = boxes[:, 2:].max(axis=0)
+        if image is not None and image.width is not None and image.height is not None:
+            extent = np.asarray([image.width, image.height], dtype=np.float64)
+
+        counts = np.maximum(np.ceil((extent - tile_size) / stride), 0).astype(int) + 1
+
+        # range of tile positions along each axis matched by each box
+        if RegionMode(mode) == RegionMode.contain:
+            low = np.ceil((boxes[:, 2:] - tile_size) / stride)
+            high = np.floor(boxes[:, :2] / stride)
+        else:
+            low = np.floor((boxes[:, :2] - tile_size) / stride) + 1
+            high = np.ceil(boxes[:, 2:] / stride) - 1
+        low = np.maximum(low, 0).astype(np.int64)
+        high = np.minimum(high, counts - 1).astype(np.int64)
+        spans = np.maximum(high - low + 1, 0)
+
+        pairs = spans[:, 0] * spans[:, 1]
+        box_index = np.repeat(np.arange(len(boxes)), pairs)
+        offsets = np.arange(pairs.sum()) - np.repeat(np.cumsum(pairs) - pairs, pairs)
+        tile_x = low[box_index, 0] + offsets // spans[box_index, 1]
+        tile_y = low[box_index, 1] + offsets % spans[box_index, 1]
+
+        origins = np.stack([tile_x, tile_y], axis=1) * stride
+        regions = np.concatenate([origins, origins + tile_size], axis=1)
+        matched = np.flatnonzero(
+            region_mask(boxes[box_index], regions.T, mode)
+            if len(box_index)
+            else np.empty(0, dtype=bool)
+        )
+        box_index, tile_index = (
+            box_index[matched],
+            (tile_y * counts[0] + tile_x)[matched],
+        )
+        regions = regions[matched]
+
+        order = np.lexsort((box_index, tile_index))
+        box_index, tile_index, regions = (
+            box_index[order],
+            tile_index[order],
+            regions[order],
+        )
+        bounds = np.searchsorted(tile_index, np.arange(counts[0] * counts[1] + 1))
+
+        clipped = np.concatenate(
+            [
+                np.maximum(boxes[box_index, :2], regions[:, :2]),
+                np.minimum(boxes[box_index, 2:], regions[:, 2:]),
+            ],
+            axis=1,
+        )
+        if relative:
+            clipped -= np.tile(regions[:, :2], 2)
+        clipped = convert_bboxes(clipped, BBoxType.ltrb, BBoxType.ltwh)
+
+        tiles = []
+        for index in range(counts[0] * counts[1]):
+            start, end = bounds[index], bounds[index + 1]
+            annotations = store.take(rows[box_index[start:end]])
+            annotations.bbox[...] = clipped[start:end]
+            annotations.area[...] = clipped[start:end, 2] * clipped[start:end, 3]
+
+            y, x = divmod(index, counts[0])
+            origin = np.asarray([x, y]) * stride
+            tiles.append(Tile((*origin.tolist(), *tile_size.tolist()), annotations))
+
+        return tiles
@@ -0,0 +1,161 @@
+import contextlib
+from enum import Enum
+from pathlib import Path
+from typing import *
+
+import numpy as np
+
+from codantic.io import JSONWriter
+
+from .columnar import record_to_dict
+from .writer import iter_records
+
+__all__ = [
+    "SampleUnit",
+    "assign_splits",
+    "image_strata",
+    "sample_groups",
+    "write_splits",
+]
+
+
+class SampleUnit(str, Enum):
+    # n images, with all their annotations
+    image: str = "image"
+    # n annotations, with their images
+    annotation: str = "annotation"
+    # up to n annotations of every category, with their images
+    category: str = "category"
+
+
+def group_ranks(keys: np.ndarray, rng: np.random.Generator) -> Tuple[np.ndarray, ...]:
+    """Random rank of every row inside the group of rows sharing its key
+
+    Returns:
+        Tuple[np.ndarray, ...]: rank of each row, size of its group and position of its group among the sorted keys
+    """
+    order = np.lexsort((rng.random(len(keys)), keys))
+    sorted_keys = keys[order]
+
+    changed = np.ones(len(keys), dtype=bool)
+    changed[1:] = sorted_keys[1:] != sorted_keys[:-1]
+    starts = np.flatnonzero(changed)
+    groups = np.cumsum(changed) - 1
+    sizes = np.diff(np.append(starts, len(keys)))
+
+    ranks = np.empty(len(keys), dtype=np.int64)
+    ranks[order] = np.arange(len(keys)) - starts[groups]
+    group_of = np.empty(len(keys), dtype=np.int64)
+    group_of[order] = groups
+    return ranks, sizes[group_of], group_of
+
+
+def image_strata(
+    num_images: int, image_positions: np.ndarray, category_ids: np.ndarray
+) -> np.ndarray:
+    """Stratum of every image: its rarest category, or -1 without annotations
+
+    Args:
+        num_images (int): number of images
+        image_positions (np.ndarray): position of the image of every annotation, -1 if unknown
+        category_ids (np.ndarray): category of every annotation
+
+    Returns:
+        np.ndarray: category id of shape (num_images,)
+    """
+    known = image_positions >= 0
+    image_positions, category_ids = image_positions[known], category_ids[known]
+    strata = np.full(num_images, -1, dtype=np.int64)
+    if not len(category_ids):
+        return strata
+
+    _, inverse, counts = np.unique(
+        category_ids, return_inverse=True, return_counts=True
+    )
+    order = np.lexsort((category_ids, counts[inverse], image_positions))
+    positions = image_positions[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = positions[1:] != positions[:-1]
+    strata[positions[first]] = category_ids[order][first]
+    return strata
+
+
+def assign_splits(
+    ratios: Sequence[float], strata: np.ndarray, rng: np.random.Generator
+) -> np.ndarray:
+    """Split index of every item, keeping the ratios inside each stratum
+
+    Items of a stratum are shuffled and cut at the cumulative ratios, from a
+    random offset, so that strata too small to be cut still follow the
+    ratios on average.
+
+    Args:
+        ratios (Sequence[float]): relative size of each split
+        strata (np.ndarray): stratum of every item
+        rng (np.random.Generator): source of randomness
+
+    Returns:
+        np.ndarray: split index of every item
+    """
+    ratios = np.asarray(ratios, dtype=np.float64)
+    if not len(ratios) or (ratios < 0).any() or ratios.sum() <= 0:
+        raise ValueError("ratios must be non-negative, with a positive sum")
+
+    bounds = np.cumsum(ratios) / ratios.sum()
+    ranks, sizes, groups = group_ranks(strata, rng)
+    offsets = rng.random(groups.max() + 1 if len(groups) else 0)
+    fractions = (ranks + offsets[groups]) / sizes
+    return np.minimum(np.searchsorted(bounds, fractions, side="right"), len(ratios) - 1)
+
+
+def sample_groups(keys: np.ndarray, n: int, rng: np.random.Generator) -> np.ndarray:
+    """Positions of up to `n` random rows of every group of equal keys, in increasing order"""
+    ranks, _, _ = group_ranks(keys, rng)
+    return np.flatnonzero(ranks < n)
+
+
+def write_splits(
+    dataset: Any,
+    paths: Sequence[Union[str, Path]],
+    image_splits: np.ndarray,
+    annotation_splits: np.ndarray,
+):
+    """Write every split of a dataset to its own COCO json file, in one pass over the annotations
+
+    Args:
+        dataset (CocoDataset): dataset to split
+        paths (Sequence[Union[str, Path]]): json file of each split, optionally gzipped
+        image_splits (np.ndarray): split index of every image
+        annotation_splits (np.ndarray): split index of every annotation, -1 to leave it out
+    """
+    info = record_to_dict(dataset.info, by_alias=True, skip_empty=True)
+    licenses = [
+        record_to_dict(item, by_alias=True, skip_empty=True)
+        for item in dataset.licenses
+    ]
+    categories = [
+        record_to_dict(item, by_alias=True, skip_empty=True)
+        for item in dataset.categories
+    ]
+
+    with contextlib.ExitStack() as stack:
+        writers = [stack.enter_context(JSONWriter(path)) for path in paths]
+        for split, writer in enumerate(writers):
+            writer.write("info", info)
+            writer.write("licenses", licenses)
+            writer.write("categories", categories)
+            writer.write_array(
+                "images",
+                (
+                    record_to_dict(
+                        dataset.images[position], by_alias=True, skip_empty=True
+                    )
+                    for position in np.flatnonzero(image_splits == split).tolist()
+                ),
+            )
+            writer.begin_array("annotations")
+
+        records = iter_records(dataset.annotations)
+        for record, split in zip(records, annotation_splits.tolist()):
+            if split >= 0:
+                writers[split].append(record)
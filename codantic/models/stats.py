@@ -0,0 +1,336 @@
+import math
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import *
+
+import numpy as np
+from mousse import Dataclass
+
+from .columnar import AnnotationStore, record_to_dict
+
+__all__ = [
+    "ANNOTATIONS_PER_IMAGE_BINS",
+    "AREA_RANGES",
+    "ASPECT_RATIO_BINS",
+    "BOX_SIZE_BINS",
+    "DatasetStats",
+    "StatsAccumulator",
+    "file_stats",
+    "files_stats",
+    "format_stats",
+]
+
+# area ranges of the COCO evaluation, bounds included, as in pycocotools `Params.areaRng`
+AREA_RANGES = {
+    "all": (0, 1e5**2),
+    "small": (0, 32**2),
+    "medium": (32**2, 96**2),
+    "large": (96**2, 1e5**2),
+}
+# edges of the histograms, the last bin being unbounded
+BOX_SIZE_BINS = (0, 8, 16, 32, 64, 96, 128, 256, 512)  # on sqrt(width * height)
+ASPECT_RATIO_BINS = (0, 1 / 4, 1 / 2, 3 / 4, 1, 4 / 3, 2, 4)  # on width / height
+ANNOTATIONS_PER_IMAGE_BINS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class DatasetStats(Dataclass):
+    num_images: int
+    num_annotations: int
+    num_categories: int
+    annotations_per_category: Dict[str, int]
+    images_per_category: Dict[str, int]
+    annotations_per_image: Dict[str, float]  # min, mean, median and max
+    annotations_per_image_histogram: Dict[str, int]
+    box_size_histogram: Dict[str, int]
+    aspect_ratio_histogram: Dict[str, int]
+    area_ranges: Dict[str, int]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return record_to_dict(self)
+
+
+class Counts:
+    """Counts of integer keys, or rows of keys, gathered over batches
+
+    Batches are only merged once they outnumber the merged keys, so that
+    adding many small batches stays linear.
+    """
+
+    def __init__(self):
+        self.keys: List[np.ndarray] = []
+        self.counts: List[np.ndarray] = []
+        self.pending = 0
+        self.merged = 0
+
+    def add(self, keys: np.ndarray, counts: np.ndarray = None):
+        if counts is None:
+            keys, counts = np.unique(keys, axis=0, return_counts=True)
+
+        self.keys.append(keys)
+        self.counts.append(counts.astype(np.int64))
+        self.pending += len(keys)
+        if self.pending > max(self.merged, 1 << 16):
+            self.reduce()
+
+    def reduce(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Unique keys, sorted, with their total counts"""
+        if len(self.keys) != 1:
+            if self.keys:
+                keys = np.concatenate(self.keys)
+                counts = np.concatenate(self.counts)
+            else:
+                keys = counts = np.empty(0, dtype=np.int64)
+
+            keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+            counts = np.bincount(inverse.ravel(), weights=counts, minlength=len(keys))
+            self.keys, self.counts = [keys], [counts.astype(np.int64)]
+
+        self.pending = self.merged = len(self.keys[0])
+        return self.keys[0], self.counts[0]
+
+    def merge(self, other: "Counts"):
+        self.add(*other.reduce())
+
+
+def histogram(values: np.ndarray, edges: Sequence[float]) -> np.ndarray:
+    """Counts of the finite values in bins starting at `edges`, the last bin being unbounded"""
+    values = values[~np.isnan(values)]
+    bins = (
+        np.searchsorted(np.asarray(edges, dtype=np.float64), values, side="right") - 1
+    )
+    return np.bincount(bins[bins >= 0], minlength=len(edges))
+
+
+def bin_labels(edges: Sequence[float], integer: bool = False) -> List[str]:
+    labels = []
+    for lo, hi in zip(edges, [*edges[1:], math.inf]):
+        if math.isinf(hi):
+            labels.append(f"{lo:.3g}+")
+        elif integer and hi - lo == 1:
+            labels.append(f"{lo}")
+        elif integer:
+            labels.append(f"{lo}-{hi - 1}")
+        else:
+            labels.append(f"{lo:.3g}-{hi:.3g}")
+    return labels
+
+
+class StatsAccumulator:
+    """Running statistics of annotation batches, mergeable across files or workers
+
+    Only counts are kept: per category, per image and per (category, image)
+    pair, and over the bins of the histograms. Memory grows with the
+    number of images, not with the number of annotations.
+    """
+
+    def __init__(self):
+        self.num_annotations = 0
+        self.image_ids = Counts()
+        self.annotated_images = Counts()
+        self.categories = Counts()
+        self.category_images = Counts()
+        self.box_sizes = np.zeros(len(BOX_SIZE_BINS), dtype=np.int64)
+        self.aspect_ratios = np.zeros(len(ASPECT_RATIO_BINS), dtype=np.int64)
+        self.area_ranges = np.zeros(len(AREA_RANGES), dtype=np.int64)
+
+    def add_images(self, image_ids: np.ndarray):
+        self.image_ids.add(np.asarray(image_ids, dtype=np.int64))
+
+    def update(self, store: AnnotationStore):
+        """Add the annotations of a store, reading its columns once"""
+        if not len(store):
+            return
+
+        self.num_annotations += len(store)
+        image_id, category_id = store.image_id, store.category_id
+        self.annotated_images.add(image_id)
+        self.categories.add(category_id)
+        self.category_images.add(np.stack([category_id, image_id], axis=1))
+
+        columns = store.columns
+        if "bbox" in columns:
+            width = columns["bbox"][:, 2].astype(np.float64)
+            height = columns["bbox"][:, 3].astype(np.float64)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                self.box_sizes += histogram(np.sqrt(width * height), BOX_SIZE_BINS)
+                self.aspect_ratios += histogram(width / height, ASPECT_RATIO_BINS)
+
+        if "area" in columns:
+            area = columns["area"]
+            for i, (lo, hi) in enumerate(AREA_RANGES.values()):
+                self.area_ranges[i] += np.count_nonzero((area >= lo) & (area <= hi))
+
+    def merge(self, other: "StatsAccumulator"):
+        self.num_annotations += other.num_annotations
+        for name in ("image_ids", "annotated_images", "categories", "category_images"):
+            getattr(self, name).merge(getattr(other, name))
+        self.box_sizes += other.box_sizes
+        self.aspect_ratios += other.aspect_ratios
+        self.area_ranges += other.area_ranges
+
+    def result(self, categories: Dict[int, str]) -> DatasetStats:
+        """Statistics of the annotations added so far
+
+        Args:
+            categories (Dict[int, str]): category names by id, unknown ids being shown as is
+
+        Returns:
+            DatasetStats: statistics, with images without annotations counted as such
+        """
+        image_ids, _ = self.image_ids.reduce()
+        annotated, per_image = self.annotated_images.reduce()
+        empty = np.count_nonzero(~np.isin(image_ids, annotated))
+        per_image = np.concatenate([per_image, np.zeros(empty, dtype=np.int64)])
+
+        def names(keys: np.ndarray, counts: np.ndarray) -> Dict[str, int]:
+            named: Dict[str, int] = {}
+            for key, count in zip(keys.tolist(), counts.tolist()):
+                name = categories.get(key, str(key))
+                named[name] = named.get(name, 0) + count
+            return named
+
+        category_ids, category_counts = self.categories.reduce()
+        pairs, _ = self.category_images.reduce()
+        pair_categories, images_per_category = np.unique(
+            pairs[:, 0] if len(pairs) else pairs, return_counts=True
+        )
+
+        summary = dict(min=0.0, mean=0.0, median=0.0, max=0.0)
+        if len(per_image):
+            summary = dict(
+                min=float(per_image.min()),
+                mean=float(per_image.mean()),
+                median=float(np.median(per_image)),
+                max=float(per_image.max()),
+            )
+
+        return DatasetStats(
+            num_images=len(np.union1d(image_ids, annotated)),
+            num_annotations=self.num_annotations,
+            num_categories=len(categories),
+            annotations_per_category=names(category_ids, category_counts),
+            images_per_category=names(pair_categories, images_per_category),
+            annotations_per_image=summary,
+            annotations_per_image_histogram=dict(
+                zip(
+                    bin_labels(ANNOTATIONS_PER_IMAGE_BINS, integer=True),
+                    histogram(
+                        per_image.astype(np.float64), ANNOTATIONS_PER_IMAGE_BINS
+                    ).tolist(),
+                )
+            ),
+            box_size_histogram=dict(
+                zip(bin_labels(BOX_SIZE_BINS), self.box_sizes.tolist())
+            ),
+            aspect_ratio_histogram=dict(
+                zip(bin_labels(ASPECT_RATIO_BINS), self.aspect_ratios.tolist())
+            ),
+            area_ranges=dict(zip(AREA_RANGES, self.area_ranges.tolist())),
+        )
+
+
+def accumulate_file(
+    dataset_type: Type, path: Union[str, Path], batch_size: int = 10000
+) -> Tuple[StatsAccumulator, Dict[int, str]]:
+    """Accumulate the statistics of a json file, one batch of raw annotations at a time"""
+    loader = dataset_type.iter_load(path, batch_size=batch_size, raw=True)
+    annotation_type = dataset_type.get_annotation_type()
+    accumulator = StatsAccumulator()
+    for batch in loader:
+        accumulator.update(
+            dataset_type.annotation_store_type.from_records(batch, annotation_type)
+        )
+
+    dataset = loader.dataset
+    accumulator.add_images([image.image_id for image in dataset.images])
+    categories = {
+        category.category_id: category.name for category in dataset.categories
+    }
+    return accumulator, categories
+
+
+def file_stats(
+    dataset_type: Type, path: Union[str, Path], batch_size: int = 10000
+) -> DatasetStats:
+    """Statistics of a json file, streamed so that its annotations are never all in memory
+
+    Args:
+        dataset_type (Type): dataset class, like ODCocoDataset
+        path (Union[str, Path]): path to the json file, optionally gzipped
+        batch_size (int, optional): number of annotations read at once. Defaults to 10000.
+
+    Returns:
+        DatasetStats: statistics of the file
+    """
+    accumulator, categories = accumulate_file(dataset_type, path, batch_size=batch_size)
+    return accumulator.result(categories)
+
+
+def files_stats(
+    dataset_type: Type,
+    paths: Sequence[Union[str, Path]],
+    batch_size: int = 10000,
+    workers: int = 1,
+) -> List[DatasetStats]:
+    """Statistics of several json files, each streamed by one of `workers` processes
+
+    Args:
+        dataset_type (Type): dataset class, like ODCocoDataset
+        paths (Sequence[Union[str, Path]]): paths to the json files
+        batch_size (int, optional): number of annotations read at once. Defaults to 10000.
+        workers (int, optional): number of processes. Defaults to 1.
+
+    Returns:
+        List[DatasetStats]: statistics of every file, in order
+    """
+    if workers <= 1 or len(paths) <= 1:
+        results = [accumulate_file(dataset_type, path, batch_size) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as executor:
+            results = list(
+                executor.map(
+                    accumulate_file,
+                    [dataset_type] * len(paths),
+                    paths,
+                    [batch_size] * len(paths),
+                )
+            )
+
+    return [accumulator.result(categories) for accumulator, categories in results]
+
+
+def format_stats(stats: DatasetStats) -> str:
+    """Statistics as aligned plain text tables"""
+    sections = [
+        (
+            "dataset",
+            {
+                "images": stats.num_images,
+                "annotations": stats.num_annotations,
+                "categories": stats.num_categories,
+            },
+        ),
+        ("annotations per image", stats.annotations_per_image),
+        ("images per annotation count", stats.annotations_per_image_histogram),
+        ("area ranges", stats.area_ranges),
+        ("box size (sqrt area)", stats.box_size_histogram),
+        ("aspect ratio (width / height)", stats.aspect_ratio_histogram),
+    ]
+
+    lines = []
+    for title, values in sections:
+        lines.append(title)
+        width = max((len(str(key)) for key in values), default=0)
+        for key, value in values.items():
+            value = f"{value:.2f}" if isinstance(value, float) else value
+            lines.append(f"  {key:<{width}}  {value:>10}")
+        lines.append("")
+
+    lines.append("categories")
+    width = max((len(name) for name in stats.annotations_per_category), default=0)
+    lines.append(f"  {'name':<{width}}  {'annotations':>11}  {'images':>8}")
+    for name, count in stats.annotations_per_category.items():
+        images = stats.images_per_category.get(name, 0)
+        lines.append(f"  {name:<{width}}  {count:>11}  {images:>8}")
+
+    return "\n".join(lines)
@@ -0,0 +1,202 @@
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from typing import *
+
+import numpy as np
+
+from codantic.core.bbox import bbox_iou
+
+__all__ = ["NMSMethod", "Suppression", "suppress"]
+
+# upper bound of the number of IoU values computed at once
+BATCH_ELEMENTS = 1 << 22
+
+
+class NMSMethod(str, Enum):
+    hard: str = "hard"  # drop boxes overlapping a better one
+    linear: str = "linear"  # soft-NMS, scores scaled by 1 - IoU above the threshold
+    gaussian: str = "gaussian"  # soft-NMS, scores scaled by exp(-IoU^2 / sigma)
+    fusion: str = "fusion"  # weighted box fusion of overlapping boxes
+
+
+class Suppression(NamedTuple):
+    """Boxes kept by `suppress`, ordered like the input rows"""
+
+    rows: np.ndarray
+    score: np.ndarray
+    bbox: np.ndarray
+
+
+def hard_kernel(
+    ious: np.ndarray, score: np.ndarray, valid: np.ndarray, iou_threshold: float
+) -> np.ndarray:
+    suppressed = ~valid
+    keep = np.zeros(valid.shape, dtype=bool)
+    for d in range(valid.shape[1]):
+        keep[:, d] = ~suppressed[:, d]
+        suppressed |= keep[:, d, None] & (ious[:, d, :] > iou_threshold)
+
+    return np.where(keep, score, -np.inf)
+
+
+def soft_kernel(
+    ious: np.ndarray,
+    score: np.ndarray,
+    valid: np.ndarray,
+    iou_threshold: float,
+    method: NMSMethod,
+    sigma: float,
+) -> np.ndarray:
+    current = np.where(valid, score, -np.inf)
+    final = np.full(score.shape, -np.inf)
+    pending = valid.copy()
+    groups = np.arange(len(score))
+
+    for _ in range(valid.shape[1]):
+        best = np.argmax(np.where(pending, current, -np.inf), axis=1)
+        active = pending[groups, best]
+        final[groups[active], best[active]] = current[groups[active], best[active]]
+        pending[groups, best] = False
+
+        iou = ious[groups, best]
+        if method == NMSMethod.linear:
+            weight = np.where(iou > iou_threshold, 1 - iou, 1.0)
+        else:
+            weight = np.exp(-(iou**2) / sigma)
+        with np.errstate(invalid="ignore"):
+            current = np.where(pending & active[:, None], current * weight, current)
+
+    return final
+
+
+def fusion_kernel(
+    boxes: np.ndarray, score: np.ndarray, valid: np.ndarray, iou_threshold: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    num_groups, size = valid.shape
+    groups = np.arange(num_groups)
+
+    # running sums of score-weighted ltrb corners per cluster, clusters being
+    # indexed by the position of their first, best scored, box
+    corners = np.concatenate([boxes[..., :2], boxes[..., :2] + boxes[..., 2:]], axis=-1)
+    weighted = np.zeros((num_groups, size, 4))
+    weights = np.zeros((num_groups, size))
+    counts = np.zeros((num_groups, size))
+    fused = np.zeros((num_groups, size, 4))
+    is_cluster = np.zeros((num_groups, size), dtype=bool)
+
+    for d in range(size):
+        iou = bbox_iou(boxes[:, d, None, :], fused)[:, 0, :]
+        iou = np.where(is_cluster, iou, -1.0)
+        best = np.argmax(iou, axis=1)
+        joined = valid[:, d] & (iou[groups, best] > iou_threshold)
+        created = valid[:, d] & ~joined
+
+        cluster = np.where(joined, best, d)
+        selected = joined | created
+        rows, cluster = groups[selected], cluster[selected]
+        weighted[rows, cluster] += score[rows, d, None] * corners[rows, d]
+        weights[rows, cluster] += score[rows, d]
+        counts[rows, cluster] += 1
+        is_cluster[rows[created[selected]], d] = True
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            left_top = weighted[rows, cluster, :2] / weights[rows, cluster, None]
+            right_bottom = weighted[rows, cluster, 2:] / weights[rows, cluster, None]
+        fused[rows, cluster] = np.concatenate(
+            [left_top, right_bottom - left_top], axis=-1
+        )
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fused_score = np.where(is_cluster, weights / counts, -np.inf)
+
+    return fused_score, fused
+
+
+def suppress(
+    bbox: np.ndarray,
+    score: np.ndarray,
+    keys: Sequence[np.ndarray],
+    method: NMSMethod = NMSMethod.hard,
+    iou_threshold: float = 0.5,
+    sigma: float = 0.5,
+    min_score: float = 0.0,
+    top_k: int = None,
+    workers: int = 1,
+) -> Suppression:
+    """Suppress overlapping boxes inside each group of rows
+
+    Groups are visited by decreasing score. Groups of similar sizes are
+    padded together so that every step of the greedy suppression runs over
+    a whole batch of groups at once.
+
+    Args:
+        bbox (np.ndarray): ltwh boxes of shape (N, 4)
+        score (np.ndarray): scores of shape (N,)
+        keys (Sequence[np.ndarray]): columns whose values define the groups, such as image and category ids
+        method (NMSMethod, optional): Defaults to NMSMethod.hard.
+        iou_threshold (float, optional): overlap above which boxes suppress or fuse with each other. Defaults to 0.5.
+        sigma (float, optional): spread of the gaussian soft-NMS. Defaults to 0.5.
+        min_score (float, optional): lowest score kept after suppression. Defaults to 0.0.
+        top_k (int, optional): number of boxes kept per group. Defaults to None.
+        workers (int, optional): number of threads sharing the batches. Defaults to 1.
+
+    Returns:
+        Suppression: kept rows, with their score and box after suppression. A fused box keeps the row of its best scored member.
+    """
+    method = NMSMethod(method)
+    bbox = np.asarray(bbox, dtype=np.float64)
+    score = np.asarray(score, dtype=np.float64)
+    if not len(score):
+        return Suppression(np.empty(0, dtype=np.int64), score, bbox)
+
+    order = np.lexsort((np.arange(len(score)), -score, *keys[::-1]))
+    changed = np.zeros(len(order), dtype=bool)
+    changed[0] = True
+    for key in keys:
+        key = key[order]
+        changed[1:] |= key[1:] != key[:-1]
+    starts = np.flatnonzero(changed)
+    counts = np.diff(np.append(starts, len(order)))
+
+    sizes = 1 << np.ceil(np.log2(counts)).astype(np.int64)
+    tasks = []
+    for size in np.unique(sizes).tolist():
+        selected = np.flatnonzero(sizes == size)
+        step = max(1, BATCH_ELEMENTS // (size * size))
+        for start in range(0, len(selected), step):
+            tasks.append((size, selected[start : start + step]))
+
+    def run(task: Tuple[int, np.ndarray]) -> Tuple[np.ndarray, ...]:
+        size, groups = task
+        offsets = np.arange(size)
+        valid = offsets < counts[groups, None]
+        rows = order[
+            np.where(valid, starts[groups, None] + offsets, starts[groups, None])
+        ]
+        boxes, scores = bbox[rows], score[rows]
+
+        if method == NMSMethod.fusion:
+            scores, boxes = fusion_kernel(boxes, scores, valid, iou_threshold)
+        else:
+            ious = bbox_iou(boxes, boxes)
+            if method == NMSMethod.hard:
+                scores = hard_kernel(ious, scores, valid, iou_threshold)
+            else:
+                scores = soft_kernel(ious, scores, valid, iou_threshold, method, sigma)
+
+        kept = valid & (scores >= min_score)
+        if top_k is not None:
+            ranks = np.argsort(np.argsort(-scores, axis=1, kind="stable"), axis=1)
+            kept &= ranks < top_k
+
+        return rows[kept], scores[kept], boxes[kept]
+
+    if workers > 1 and len(tasks) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(run, tasks))
+    else:
+        results = [run(task) for task in tasks]
+
+    rows, scores, boxes = (np.concatenate(parts) for parts in zip(*results))
+    kept = np.argsort(rows, kind="stable")
+    return Suppression(rows[kept], scores[kept], boxes[kept])
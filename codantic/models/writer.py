@@ -0,0 +1,141 @@
+import json
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import *
+
+import numpy as np
+
+from codantic.io import JSONWriter
+
+from .columnar import AnnotationStore, record_to_dict
+
+__all__ = ["write_json"]
+
+
+def encode_shard(shard: Union[AnnotationStore, List[Dict[str, Any]]]) -> str:
+    """Annotations of a shard as comma separated JSON objects, encoded in one call"""
+    if isinstance(shard, AnnotationStore):
+        shard = list(shard.to_records(by_alias=True, skip_empty=True))
+    return json.dumps(shard)[1:-1]
+
+
+def encode_records(records: Sequence[Any]) -> str:
+    """Dataclass objects as comma separated JSON objects, encoded in one call"""
+    return json.dumps(
+        [record_to_dict(record, by_alias=True, skip_empty=True) for record in records]
+    )[1:-1]
+
+
+def iter_records(
+    annotations: Union[AnnotationStore, Sequence[Any]],
+) -> Iterator[Dict[str, Any]]:
+    """Annotations as json records keyed by alias, with empty defaults left out
+
+    A store is read column-wise, and a plain list of annotations field by
+    field, keeping the values as they are rather than casting them to the
+    store columns.
+    """
+    if isinstance(annotations, AnnotationStore):
+        return annotations.to_records(by_alias=True, skip_empty=True)
+
+    return (
+        record_to_dict(annotation, by_alias=True, skip_empty=True)
+        for annotation in annotations
+    )
+
+
+def iter_shards(
+    dataset: Any, shard_size: int
+) -> Iterator[Union[AnnotationStore, List[Dict[str, Any]]]]:
+    """Consecutive slices of the annotations, ready to be encoded by `encode_shard`
+
+    Columnar annotations are sliced into stores holding only their rows. A
+    plain list of annotations is read field by field into dicts, keeping the
+    values as they are rather than casting them to the store columns.
+    """
+    annotations = dataset.annotations
+    for start in range(0, len(annotations), shard_size):
+        stop = min(start + shard_size, len(annotations))
+        if isinstance(annotations, AnnotationStore):
+            yield annotations.take(np.arange(start, stop))
+        else:
+            yield list(iter_records(annotations[start:stop]))
+
+
+def map_bounded(
+    executor: Optional[Executor], func: Callable, items: Iterable[Any], window: int
+) -> Iterator[Any]:
+    """Lazy, ordered `executor.map` keeping at most `window` items in flight"""
+    if executor is None:
+        yield from map(func, items)
+        return
+
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(func, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+
+    while pending:
+        yield pending.popleft().result()
+
+
+def write_json(
+    dataset: Any, path: Union[str, Path], shard_size: int = 50000, workers: int = 1
+):
+    """Write a dataset as a COCO json file, without building its dict tree
+
+    Images and annotations are encoded `shard_size` at a time and written as
+    soon as they are encoded, so memory holds a few shards at most whatever
+    the size of the dataset. With several workers, annotation shards are
+    encoded by a process pool and written back in order.
+
+    Args:
+        dataset (CocoDataset): dataset to write
+        path (Union[str, Path]): path of the json file, gzipped if it ends with .gz
+        shard_size (int, optional): number of records encoded at once. Defaults to 50000.
+        workers (int, optional): number of processes encoding annotations. Defaults to 1.
+    """
+    images = dataset.images
+    image_shards = (
+        images[start : start + shard_size]
+        for start in range(0, len(images), shard_size)
+    )
+
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        with JSONWriter(path) as writer:
+            writer.write(
+                "info", record_to_dict(dataset.info, by_alias=True, skip_empty=True)
+            )
+            writer.write_array(
+                "licenses",
+                (
+                    record_to_dict(item, by_alias=True, skip_empty=True)
+                    for item in dataset.licenses
+                ),
+            )
+            writer.write_array(
+                "images", map(encode_records, image_shards), encoded=True
+            )
+            writer.write_array(
+                "annotations",
+                map_bounded(
+                    executor,
+                    encode_shard,
+                    iter_shards(dataset, shard_size),
+                    2 * workers,
+                ),
+                encoded=True,
+            )
+            writer.write_array(
+                "categories",
+                (
+                    record_to_dict(item, by_alias=True, skip_empty=True)
+                    for item in dataset.categories
+                ),
+            )
+    finally:
+        if executor is not None:
+            executor.shutdown()
@@ -0,0 +1,241 @@
+import contextlib
+import functools
+import json
+import sys
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import *
+
+__all__ = ["Profiler", "StageStats", "profile", "profiled", "stage", "timed"]
+
+# profiler recording stages, set by `profile`; instrumented code only checks it
+_active: Optional["Profiler"] = None
+
+NULL_STAGE = contextlib.nullcontext()
+
+
+class StageStats:
+    """Totals of a stage over all its calls"""
+
+    __slots__ = ("path", "calls", "seconds", "objects", "peak_memory")
+
+    def __init__(self, path: Tuple[str, ...]):
+        self.path = path
+        self.calls = 0
+        self.seconds = 0.0
+        # net memory blocks allocated, roughly the objects created and kept
+        self.objects = 0
+        # bytes above the memory in use when the stage began
+        self.peak_memory: Optional[int] = None
+
+    @property
+    def name(self) -> str:
+        return self.path[-1]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "path": list(self.path),
+            "calls": self.calls,
+            "seconds": self.seconds,
+            "objects": self.objects,
+            "peak_memory": self.peak_memory,
+        }
+
+
+class Frame:
+    __slots__ = ("path", "start", "blocks", "memory_start", "peak_seen")
+
+    def __init__(self, path: Tuple[str, ...]):
+        self.path = path
+        self.start = 0.0
+        self.blocks = 0
+        self.memory_start: Optional[int] = None
+        self.peak_seen = 0
+
+
+class Profiler:
+    """Records wall time, allocated objects and peak memory of nested stages
+
+    Stages are keyed by their path, the names of the stages enclosing them,
+    and aggregated over calls. Each thread has its own stack of stages.
+    Peak memory comes from `tracemalloc`, so it is only recorded when
+    tracing, and is approximate when several threads run stages at once.
+    """
+
+    def __init__(self, memory: bool = True):
+        self.memory = memory
+        self.stats: Dict[Tuple[str, ...], StageStats] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _stack(self) -> List[Frame]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _path(self, name: str) -> Tuple[str, ...]:
+        stack = self._stack()
+        return (stack[-1].path if stack else ()) + (name,)
+
+    def _add(
+        self,
+        path: Tuple[str, ...],
+        seconds: float,
+        objects: int = 0,
+        peak_memory: Optional[int] = None,
+    ):
+        with self._lock:
+            stats = self.stats.get(path)
+            if stats is None:
+                stats = self.stats[path] = StageStats(path)
+            stats.calls += 1
+            stats.seconds += seconds
+            stats.objects += objects
+            if peak_memory is not None:
+                stats.peak_memory = max(stats.peak_memory or 0, peak_memory)
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Record the code run inside the block as a stage nested in the current one"""
+        stack = self._stack()
+        frame = Frame(self._path(name))
+        if self.memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1].peak_seen = max(stack[-1].peak_seen, peak)
+            tracemalloc.reset_peak()
+            frame.memory_start = frame.peak_seen = current
+
+        stack.append(frame)
+        frame.blocks = sys.getallocatedblocks()
+        frame.start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - frame.start
+            objects = sys.getallocatedblocks() - frame.blocks
+            stack.pop()
+
+            peak_memory = None
+            if frame.memory_start is not None:
+                _, peak = tracemalloc.get_traced_memory()
+                peak = max(peak, frame.peak_seen)
+                peak_memory = peak - frame.memory_start
+                if stack:
+                    stack[-1].peak_seen = max(stack[-1].peak_seen, peak)
+
+            self._add(frame.path, seconds, objects, peak_memory)
+
+    def timed(self, name: str, func: Callable) -> Callable:
+        """Wrap a function called many times, adding only its time and calls to a stage"""
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            path = self._path(name)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._add(path, time.perf_counter() - start)
+
+        return wrapper
+
+    def report(self) -> Dict[str, Any]:
+        """Stages as plain dicts, ordered by path"""
+        return {
+            "memory": self.memory,
+            "stages": [self.stats[path].to_dict() for path in sorted(self.stats)],
+        }
+
+    def folded(self) -> str:
+        """Self time of every stage in microseconds, as the folded stacks read by flamegraph tools"""
+        children: Dict[Tuple[str, ...], float] = {}
+        for path, stats in self.stats.items():
+            if len(path) > 1:
+                children[path[:-1]] = children.get(path[:-1], 0.0) + stats.seconds
+
+        lines = []
+        for path in sorted(self.stats):
+            own = self.stats[path].seconds - children.get(path, 0.0)
+            lines.append(f"{';'.join(path)} {max(0, round(own * 1e6))}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: Union[str, Path]):
+        """Write the report as json, or as folded stacks for a .folded path"""
+        path = Path(path)
+        if path.suffix == ".folded":
+            path.write_text(self.folded())
+        else:
+            path.write_text(json.dumps(self.report(), indent=2))
+
+
+@contextlib.contextmanager
+def profile(memory: bool = True, path: Union[str, Path] = None) -> Iterator[Profiler]:
+    """Record the instrumented stages run inside the block
+
+    Loading, exporting, merging and evaluating datasets are instrumented.
+    Outside of this block, instrumentation costs a global lookup per call.
+
+    Args:
+        memory (bool, optional): trace allocations for peak memory, which slows the code down. Defaults to True.
+        path (Union[str, Path], optional): write the report there on exit, see `Profiler.write`. Defaults to None.
+
+    Yields:
+        Profiler: profiler holding the stages
+    """
+    global _active
+
+    profiler = Profiler(memory=memory)
+    previous = _active
+    tracing = memory and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+
+    _active = profiler
+    try:
+        yield profiler
+    finally:
+        _active = previous
+        if tracing:
+            tracemalloc.stop()
+        if path is not None:
+            profiler.write(path)
+
+
+def stage(name: str) -> ContextManager[None]:
+    """Block recorded as a stage by the active profiler, if any"""
+    profiler = _active
+    if profiler is None:
+        return NULL_STAGE
+    return profiler.stage(name)
+
+
+def timed(name: str, func: Callable) -> Callable:
+    """`func`, timed as a stage by the active profiler, if any, see `Profiler.timed`"""
+    profiler = _active
+    if profiler is None:
+        return func
+    return profiler.timed(name, func)
+
+
+def profiled(name: str = None) -> Callable[[Callable], Callable]:
+    """Decorate a function to record its calls as a stage, named after it by default"""
+
+    def decorator(func: Callable) -> Callable:
+        stage_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = _active
+            if profiler is None:
+                return func(*args, **kwargs)
+            with profiler.stage(stage_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
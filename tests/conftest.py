@@ -0,0 +1,24 @@
+import itertools
+import json
+from pathlib import Path
+from typing import *
+
+import pytest
+
+
+@pytest.fixture
+def load_dict(tmp_path: Path) -> Callable:
+    """Load a dataset from a COCO dict, through a json file
+
+    Datasets are loaded rather than built from dicts, since mousse fills the
+    fields left out of a constructor with the values of a collected object
+    of the same id, while the loader gives every field.
+    """
+    counter = itertools.count()
+
+    def load(dataset_type: Type, data: Dict[str, Any], **options) -> Any:
+        path = tmp_path / f"dataset_{next(counter)}.json"
+        path.write_text(json.dumps(data))
+        return dataset_type.load(path, **options)
+
+    return load
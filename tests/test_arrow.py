@@ -0,0 +1,52 @@
+from pathlib import Path
+
+import pytest
+
+from codantic.models import ODCocoDataset
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.fixture
+def dataset() -> ODCocoDataset:
+    return ODCocoDataset(
+        images=[
+            {"id": image_id, "file_name": f"{image_id}.jpg", "width": 64, "height": 64}
+            for image_id in (1, 2)
+        ],
+        annotations=[
+            {"id": 1, "image_id": 1, "category_id": 1, "bbox": [0, 0, 8, 8]},
+            {"id": 2, "image_id": 2, "category_id": 2, "bbox": [0, 0, 16, 16]},
+            {"id": 3, "image_id": 2, "category_id": 1, "bbox": [0, 0, 32, 32]},
+        ],
+        categories=[{"id": 1, "name": "person"}, {"id": 2, "name": "car"}],
+    )
+
+
+@pytest.mark.parametrize("partition_by", [None, ["category_id"]])
+def test_read_parquet_keeps_filtered_columns(
+    dataset: ODCocoDataset, tmp_path: Path, partition_by
+):
+    path = tmp_path / ("partitioned" if partition_by else "table.parquet")
+    dataset.to_parquet(path, partition_by=partition_by)
+
+    loaded = ODCocoDataset.read_parquet(
+        path, columns=["image_id", "bbox"], filters=[("category_id", "=", 1)]
+    )
+
+    store = loaded.annotations
+    assert sorted(store.image_id.tolist()) == [1, 2]
+    assert store.category_id.tolist() == [1, 1]
+
+
+def test_read_parquet_keeps_partitioning_columns(
+    dataset: ODCocoDataset, tmp_path: Path
+):
+    dataset.to_parquet(tmp_path, partition_by=["category_id"])
+
+    loaded = ODCocoDataset.read_parquet(tmp_path, columns=["image_id"])
+
+    rows = zip(
+        loaded.annotations.image_id.tolist(), loaded.annotations.category_id.tolist()
+    )
+    assert sorted(rows) == [(1, 1), (2, 1), (2, 2)]
@@ -0,0 +1,76 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from codantic.models import CaptionCocoDataset, FaceCocoDataset
+
+IMAGES = [
+    {"id": i, "file_name": f"{i}.jpg", "width": 64, "height": 48} for i in (1, 2, 5)
+]
+
+FACES = {
+    "info": {"description": "faces", "version": "1"},
+    "images": IMAGES,
+    "annotations": [
+        {
+            "id": 1,
+            "image_id": 1,
+            "category_id": 1,
+            "bbox": [1.5, 2, 8, 8],
+            "area": 64,
+            "score": 0.5,
+            "keypoints": [1, 2, 2, 3.5, 4, 1],
+            "landmarks": [[1, 2], [3, 4]],
+        },
+        {
+            "id": 2,
+            "image_id": 1,
+            "category_id": 2,
+            "bbox": [0, 0, 4, 4],
+            "attributes": {"occluded": True},
+        },
+        {"id": 7, "image_id": 5, "category_id": 1, "bbox": [3, 3, 2, 2]},
+    ],
+    "categories": [{"id": 1, "name": "face"}, {"id": 2, "name": "mask"}],
+}
+
+CAPTIONS = {
+    "images": IMAGES,
+    "annotations": [
+        {"id": 1, "image_id": 1, "caption": "a person"},
+        {"id": 2, "image_id": 2, "caption": "un café, s'il vous plaît"},
+        {"id": 3, "image_id": 2, "caption": ""},
+        {"id": 4, "image_id": 5, "category_id": 3, "caption": "a car"},
+    ],
+}
+
+
+def written(dataset, path: Path) -> dict:
+    dataset.write_json(path)
+    return json.loads(path.read_text())
+
+
+@pytest.mark.parametrize(
+    "dataset_type, data",
+    [(FaceCocoDataset, FACES), (CaptionCocoDataset, CAPTIONS)],
+    ids=["face", "caption"],
+)
+@pytest.mark.parametrize("columnar", [False, True], ids=["list", "columnar"])
+@pytest.mark.parametrize("mmap", [True, False], ids=["mmap", "read"])
+def test_binary_round_trip(
+    tmp_path: Path, load_dict, dataset_type, data, columnar: bool, mmap: bool
+):
+    dataset = load_dict(dataset_type, data, columnar=columnar)
+    expected = written(dataset, tmp_path / "expected.json")
+
+    dataset.save_binary(tmp_path / "dataset.bin")
+    opened = dataset_type.open_binary(tmp_path / "dataset.bin", mmap=mmap)
+
+    assert written(opened, tmp_path / "opened.json") == expected
+    assert [a["id"] for a in expected["annotations"]] == [
+        a["id"] for a in data["annotations"]
+    ]
+    assert opened.get_annotation_store().annotation_id.tolist() == [
+        a["id"] for a in data["annotations"]
+    ]
@@ -0,0 +1,113 @@
+import contextlib
+import io
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from codantic.evaluator import EvalCache, EvalEngine, ODCocoEvaluator
+from codantic.io import DiskCache
+from codantic.models import ODCocoDataset
+
+
+def write_dataset(path: Path, boxes, score: float = None) -> Path:
+    annotations = [
+        {"id": i, "image_id": 1, "category_id": 1, "bbox": bbox, "area": 100.0}
+        for i, bbox in enumerate(boxes, 1)
+    ]
+    if score is not None:
+        for annotation in annotations:
+            annotation["score"] = score
+    path.write_text(
+        json.dumps(
+            dict(
+                images=[{"id": 1, "file_name": "1.jpg", "width": 100, "height": 100}],
+                annotations=annotations,
+                categories=[{"id": 1, "name": "object"}],
+            )
+        )
+    )
+    return path
+
+
+@pytest.fixture
+def loads(monkeypatch) -> list:
+    """Paths parsed from json, cache hits leaving it unchanged"""
+    paths = []
+    load = ODCocoDataset.load.__func__
+
+    def counted(cls, path, *args, **kwargs):
+        paths.append(Path(path).name)
+        return load(cls, path, *args, **kwargs)
+
+    monkeypatch.setattr(ODCocoDataset, "load", classmethod(counted))
+    return paths
+
+
+def test_load_dataset_hits_until_file_changes(tmp_path: Path, loads: list):
+    cache = EvalCache(tmp_path / "cache")
+    path = write_dataset(tmp_path / "gold.json", [[10, 10, 10, 10]])
+
+    first = cache.load_dataset(ODCocoDataset, path)
+    second = cache.load_dataset(ODCocoDataset, path)
+
+    assert loads == ["gold.json"]
+    assert len(cache) == 1
+    assert second.annotations.image_id.tolist() == first.annotations.image_id.tolist()
+
+    write_dataset(path, [[10, 10, 10, 10], [50, 50, 20, 20]])
+    os.utime(path, ns=(0, 0))
+    changed = cache.load_dataset(ODCocoDataset, path)
+
+    assert loads == ["gold.json", "gold.json"]
+    assert len(changed.annotations) == 2
+    assert len(cache) == 2
+
+
+@pytest.mark.parametrize("engine", list(EvalEngine))
+def test_evaluator_reuses_gold_and_matches(
+    tmp_path: Path, monkeypatch, loads: list, engine: EvalEngine
+):
+    cache = EvalCache(tmp_path / "cache")
+    gold = write_dataset(tmp_path / "gold.json", [[10, 10, 10, 10], [50, 50, 20, 20]])
+    pred = write_dataset(tmp_path / "pred.json", [[11, 10, 10, 10]], score=0.9)
+    evaluations = []
+    evaluate = ODCocoEvaluator._evaluate
+    monkeypatch.setattr(
+        ODCocoEvaluator,
+        "_evaluate",
+        lambda self: evaluations.append(1) or evaluate(self),
+    )
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            evaluator = ODCocoEvaluator.from_files(
+                gold, pred, cache=cache, engine=engine
+            )
+            evaluator.evaluate()
+            evaluator.accumulate()
+            evaluator.summarize()
+        return evaluator.stats
+
+    first = run()
+    # two parsed files, the gold state and the matches
+    assert (loads, len(evaluations), len(cache)) == (["pred.json", "gold.json"], 1, 4)
+
+    second = run()
+    assert (loads, len(evaluations), len(cache)) == (["pred.json", "gold.json"], 1, 4)
+    assert [list(row) for row in second] == [list(row) for row in first]
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path: Path):
+    cache = DiskCache(tmp_path, max_bytes=250)
+    for i, key in enumerate("abc"):
+        cache.dump(key, b"x" * 50)
+        os.utime(cache.path(key), ns=(i, i))
+
+    cache.get("a")
+    cache.dump("d", b"x" * 50)
+
+    assert sorted(path.name for path, _ in cache.entries()) == ["a", "c", "d"]
+    assert cache.load("b") is None
+    assert cache.load("a") == b"x" * 50
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+from codantic.core.coco import Dataset
+
+
+def test_from_df_builds_records_column_wise():
+    df = pd.DataFrame(
+        {
+            "image_id": [3, 3, 7],
+            "annotation_id": [1, 2, 3],
+            "category_name": ["person", None, "car"],
+            "left": [0.0, 1.0, 2.0],
+            "top": [0.0, 1.0, 2.0],
+            "width": [4.0, 4.0, 8.0],
+            "height": [2.0, 2.0, 4.0],
+            "video_name": ["a", "a", "b"],
+            "track_id": [5.0, np.nan, 6.0],
+        }
+    )
+
+    dataset = Dataset.from_df(df, batch_size=2)
+
+    assert [(image.image_id, image.video_name) for image in dataset.images] == [
+        (3, "a"),
+        (7, "b"),
+    ]
+    assert [(c.category_id, c.name) for c in dataset.categories] == [
+        (0, "person"),
+        (1, "none"),
+        (2, "car"),
+    ]
+    rows = [
+        (
+            annotation.annotation_id,
+            annotation.image_id,
+            annotation.video_name,
+            annotation.category_id,
+            annotation.category_name,
+            annotation.track_id,
+        )
+        for annotation in dataset.annotations
+    ]
+    assert rows == [
+        (1, 3, "a", 0, "person", 5.0),
+        (2, 3, "a", 1, "none", "none"),
+        (3, 7, "b", 2, "car", 6.0),
+    ]
+    first, second, _ = dataset.annotations
+    assert [list(annotation.bbox) for annotation in dataset.annotations] == [
+        [0.0, 0.0, 4.0, 2.0],
+        [1.0, 1.0, 4.0, 2.0],
+        [2.0, 2.0, 8.0, 4.0],
+    ]
+    # dynamic columns are fields of their own records only
+    second.track_id = 9.0
+    assert first.track_id == 5.0
+    assert "track_id" in dict(first)
+
+
+def test_groupby_from_df_without_video_ids():
+    df = pd.DataFrame(
+        {
+            "image_id": [1, 1, 2],
+            "annotation_id": [1, 2, 3],
+            "category_name": ["person"] * 3,
+            "track_id": [4, 4, 5],
+        }
+    )
+    dataset = Dataset.from_df(df)
+
+    groups = dataset.groupby("video_id", "track_id")
+
+    assert {
+        key: [a.annotation_id for a in view.annotations] for key, view in groups.items()
+    } == {(Ellipsis, 4): [1, 2], (Ellipsis, 5): [3]}
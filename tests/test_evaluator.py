@@ -0,0 +1,83 @@
+import contextlib
+import io
+
+import numpy as np
+import pytest
+from pycocotools.coco import COCO
+from pycocotools.cocoeval import COCOeval
+
+from codantic.evaluator import EvalEngine, ODCocoEvaluator
+from codantic.models import Category, Image, ODAnnotation, ODCocoDataset
+
+# IoU of these boxes is just below 0.5 in float64, and exactly 0.5 once rounded to float32
+GOLD_BOX = [30.0, 42.3, 3.8, 13.4]
+PRED_BOX = [30.0, 42.3, 1.9, 13.4]
+
+
+def make_dataset(bbox, score=1.0) -> ODCocoDataset:
+    return ODCocoDataset(
+        images=[Image(image_id=1, file_name="1.jpg", width=100, height=100)],
+        annotations=[
+            ODAnnotation(
+                annotation_id=1,
+                image_id=1,
+                category_id=1,
+                bbox=bbox,
+                area=bbox[2] * bbox[3],
+                score=score,
+            )
+        ],
+        categories=[Category(category_id=1, name="object")],
+    )
+
+
+def pycocotools_stats() -> np.ndarray:
+    def to_coco(bbox, score=None) -> COCO:
+        annotation = dict(
+            id=1,
+            image_id=1,
+            category_id=1,
+            bbox=bbox,
+            area=bbox[2] * bbox[3],
+            iscrowd=0,
+        )
+        if score is not None:
+            annotation["score"] = score
+        coco = COCO()
+        coco.dataset = dict(
+            images=[dict(id=1, file_name="1.jpg", width=100, height=100)],
+            categories=[dict(id=1, name="object")],
+            annotations=[annotation],
+        )
+        coco.createIndex()
+        return coco
+
+    evaluator = COCOeval(to_coco(GOLD_BOX), to_coco(PRED_BOX, score=1.0), "bbox")
+    evaluator.evaluate()
+    evaluator.accumulate()
+    evaluator.summarize()
+    return evaluator.stats
+
+
+@pytest.mark.parametrize("engine", list(EvalEngine))
+def test_iou_on_threshold_matches_pycocotools(engine: EvalEngine):
+    with contextlib.redirect_stdout(io.StringIO()):
+        expected = pycocotools_stats()
+        evaluator = ODCocoEvaluator(
+            make_dataset(GOLD_BOX), make_dataset(PRED_BOX), engine=engine
+        )
+        evaluator.evaluate()
+        evaluator.accumulate()
+        evaluator.summarize()
+
+    # rows of evaluator stats: class, images, mAP@.5:.95, mAP@.5, ...
+    _, _, mean_ap, ap_50, *_ = evaluator.stats[0]
+    assert expected[1] == 0.0
+    assert (mean_ap, ap_50) == (expected[0], expected[1])
+
+
+def test_pycocotools_is_the_default_engine():
+    with contextlib.redirect_stdout(io.StringIO()):
+        evaluator = ODCocoEvaluator(make_dataset(GOLD_BOX), make_dataset(PRED_BOX))
+
+    assert evaluator.engine == EvalEngine.pycocotools
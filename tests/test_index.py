@@ -0,0 +1,82 @@
+import copy
+import pickle
+
+import pytest
+
+from codantic.core.index import VersionedList
+from codantic.models import ODCocoDataset
+
+
+@pytest.fixture
+def dataset(load_dict) -> ODCocoDataset:
+    data = dict(
+        images=[
+            {"id": image_id, "file_name": f"{image_id}.jpg", "width": 64, "height": 64}
+            for image_id in (1, 200)
+        ],
+        annotations=[
+            {"id": 1, "image_id": 1, "category_id": 1, "bbox": [0, 0, 8, 8]},
+            {"id": 2, "image_id": 200, "category_id": 1, "bbox": [0, 0, 16, 16]},
+            {"id": 3, "image_id": 1, "category_id": 2, "bbox": [0, 0, 32, 32]},
+        ],
+        categories=[{"id": 1, "name": "person"}, {"id": 2, "name": "car"}],
+    )
+    return load_dict(ODCocoDataset, data)
+
+
+def annotation_ids(annotations) -> list:
+    return [annotation.annotation_id for annotation in annotations]
+
+
+def test_sort_in_place_invalidates_index(dataset: ODCocoDataset):
+    assert annotation_ids(dataset.annotations_for(1)) == [1, 3]
+    assert dataset.to_df()["image_id"].tolist() == [1, 200, 1]
+
+    dataset.annotations.sort(key=lambda annotation: -annotation.image_id)
+
+    assert annotation_ids(dataset.annotations_for(1)) == [1, 3]
+    assert annotation_ids(dataset.annotations_for(200)) == [2]
+    assert dataset.to_df()["image_id"].tolist() == [200, 1, 1]
+
+
+def test_assign_in_place_invalidates_index(dataset: ODCocoDataset):
+    assert annotation_ids(dataset.annotations_for(1, category_id=2)) == [3]
+
+    dataset.annotations[2] = dataset.annotations[1]
+    dataset.images.reverse()
+
+    assert annotation_ids(dataset.annotations_for(1, category_id=2)) == []
+    assert annotation_ids(dataset.annotations_for(200)) == [2, 2]
+    assert list(dataset.get_images_info()) == [200, 1]
+
+
+@pytest.mark.parametrize("columnar", [False, True], ids=["list", "columnar"])
+def test_returned_groups_are_copies(dataset: ODCocoDataset, columnar: bool):
+    if columnar:
+        dataset.to_columnar()
+
+    groups = dataset.get_annotation_groups()
+    groups.pop(200)
+    if not columnar:
+        groups[1].clear()
+    dataset.get_images_info().clear()
+    dataset.get_categories_info().clear()
+
+    groups = dataset.get_annotation_groups()
+    assert {key: annotation_ids(group) for key, group in groups.items()} == {
+        1: [1, 3],
+        200: [2],
+    }
+    assert list(dataset.get_images_info()) == [1, 200]
+    assert list(dataset.get_categories_info()) == [1, 2]
+
+
+def test_versioned_list_round_trips():
+    items = VersionedList([1, 2])
+    items.append(3)
+
+    for copied in (pickle.loads(pickle.dumps(items)), copy.deepcopy(items)):
+        assert type(copied) is VersionedList
+        assert copied == [1, 2, 3]
+        copied.append(4)
+        assert copied.version == 1
@@ -0,0 +1,142 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from codantic.models import (
+    CaptionCocoDataset,
+    ImageKey,
+    MergeConflict,
+    ODCocoDataset,
+)
+
+
+def od_shard(file_names, categories, annotations) -> dict:
+    """Shard whose image ids start at 10 and annotation ids at 100, to be renumbered"""
+    return dict(
+        images=[
+            {"id": 10 + i, "file_name": name, "width": 64, "height": 64}
+            for i, name in enumerate(file_names)
+        ],
+        annotations=[
+            {
+                "id": 100 + i,
+                "image_id": 10 + image,
+                "category_id": category_id,
+                "bbox": [i, i, 8, 8],
+            }
+            for i, (image, category_id) in enumerate(annotations)
+        ],
+        categories=[
+            {"id": category_id, "name": name} for category_id, name in categories
+        ],
+    )
+
+
+@pytest.fixture
+def shards(load_dict):
+    first = od_shard(
+        ["a.jpg", "b.jpg"],
+        [(1, "person"), (2, "car")],
+        [(0, 1), (1, 2), (1, 1)],
+    )
+    # same names under other ids, a duplicate of a.jpg and an unknown category
+    second = od_shard(
+        ["a.jpg", "c.jpg"],
+        [(7, "car"), (9, "dog ")],
+        [(0, 7), (1, 9), (1, 3)],
+    )
+    return load_dict(ODCocoDataset, first), load_dict(ODCocoDataset, second)
+
+
+def rows(dataset) -> list:
+    return sorted(
+        (annotation.annotation_id, annotation.image_id, annotation.category_id)
+        for annotation in dataset.annotations
+    )
+
+
+def test_merge_remaps_ids(shards):
+    merged = ODCocoDataset.merge(*shards, dedupe=None)
+
+    assert [image.image_id for image in merged.images] == [1, 2, 3, 4]
+    assert [image.file_name for image in merged.images] == [
+        "a.jpg",
+        "b.jpg",
+        "a.jpg",
+        "c.jpg",
+    ]
+    assert [(c.category_id, c.name) for c in merged.categories] == [
+        (1, "person"),
+        (2, "car"),
+        (3, "dog"),
+    ]
+    # the annotation of the unknown category 3 is left out
+    assert rows(merged) == [(1, 1, 1), (2, 2, 2), (3, 2, 1), (4, 3, 2), (5, 4, 3)]
+
+
+@pytest.mark.parametrize(
+    "on_conflict, expected",
+    [
+        (
+            MergeConflict.keep_first,
+            [(1, 1, 1), (2, 2, 2), (3, 2, 1), (4, 1, 2), (5, 3, 3)],
+        ),
+        (MergeConflict.drop, [(1, 1, 1), (2, 2, 2), (3, 2, 1), (4, 3, 3)]),
+    ],
+)
+def test_merge_dedupes_by_file_name(shards, on_conflict, expected):
+    merged = ODCocoDataset.merge(*shards, on_conflict=on_conflict)
+
+    assert [image.file_name for image in merged.images] == ["a.jpg", "b.jpg", "c.jpg"]
+    assert rows(merged) == expected
+
+
+def test_merge_raises_on_duplicate(shards):
+    with pytest.raises(ValueError, match="a.jpg"):
+        ODCocoDataset.merge(*shards, on_conflict=MergeConflict.error)
+
+
+def test_merge_dedupes_by_content(shards, tmp_path: Path):
+    for name, content in (("a.jpg", b"a"), ("b.jpg", b"b"), ("c.jpg", b"a")):
+        (tmp_path / name).write_bytes(content)
+
+    merged = ODCocoDataset.merge(*shards, dedupe=ImageKey.content, image_root=tmp_path)
+
+    assert [image.file_name for image in merged.images] == ["a.jpg", "b.jpg"]
+    # both images of the second shard have the content of a.jpg
+    assert rows(merged) == [(1, 1, 1), (2, 2, 2), (3, 2, 1), (4, 1, 2), (5, 1, 3)]
+
+
+def test_merge_write_matches_merge(shards, tmp_path: Path):
+    path = tmp_path / "merged.json"
+    ODCocoDataset.merge(*shards, path=path)
+    written = ODCocoDataset.load(path)
+    merged = ODCocoDataset.merge(*shards)
+
+    assert rows(written) == rows(merged)
+    assert [image.file_name for image in written.images] == [
+        image.file_name for image in merged.images
+    ]
+
+
+def test_merge_keeps_annotations_without_category(tmp_path: Path, load_dict):
+    data = dict(
+        images=[{"id": 5, "file_name": "a.jpg", "width": 64, "height": 64}],
+        annotations=[
+            {"id": 1, "image_id": 5, "caption": "a person"},
+            {"id": 2, "image_id": 5, "caption": "a car"},
+        ],
+    )
+    shard = load_dict(CaptionCocoDataset, data)
+    path = tmp_path / "merged.json"
+    CaptionCocoDataset.merge(shard, shard, dedupe=None, path=path)
+
+    assert json.loads(path.read_text())["annotations"] == [
+        {"id": 1, "image_id": 1, "caption": "a person"},
+        {"id": 2, "image_id": 1, "caption": "a car"},
+        {"id": 3, "image_id": 2, "caption": "a person"},
+        {"id": 4, "image_id": 2, "caption": "a car"},
+    ]
+    merged = CaptionCocoDataset.merge(shard, shard, dedupe=None)
+    assert [annotation.category_id for annotation in merged.annotations] == [None] * 4
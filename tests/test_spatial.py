@@ -0,0 +1,120 @@
+import numpy as np
+import pytest
+
+from codantic.core.rtree import RegionMode
+from codantic.models import ODCocoDataset
+
+
+@pytest.fixture
+def dataset(load_dict) -> ODCocoDataset:
+    # integer boxes, so that many of them touch the regions and tiles exactly
+    rng = np.random.default_rng(0)
+    annotations = []
+    for i in range(400):
+        width, height = rng.integers(1, 60, size=2).tolist()
+        left, top = rng.integers(0, 200 - width), rng.integers(0, 150 - height)
+        annotations.append(
+            {
+                "id": i + 1,
+                "image_id": 1 + i % 2,
+                "category_id": 1,
+                "bbox": [int(left), int(top), width, height],
+                "area": width * height,
+            }
+        )
+    data = dict(
+        images=[
+            {
+                "id": image_id,
+                "file_name": f"{image_id}.jpg",
+                "width": 200,
+                "height": 150,
+            }
+            for image_id in (1, 2)
+        ],
+        annotations=annotations,
+        categories=[{"id": 1, "name": "object"}],
+    )
+    return load_dict(ODCocoDataset, data)
+
+
+def ltrb(bbox) -> tuple:
+    left, top, width, height = bbox
+    return left, top, left + width, top + height
+
+
+def matches(box, region, mode: RegionMode) -> bool:
+    left, top, right, bottom = ltrb(box)
+    if mode == RegionMode.contain:
+        return (
+            left >= region[0]
+            and top >= region[1]
+            and right <= region[2]
+            and bottom <= region[3]
+        )
+    return min(right, region[2]) > max(left, region[0]) and min(
+        bottom, region[3]
+    ) > max(top, region[1])
+
+
+def brute_force(dataset: ODCocoDataset, image_id: int, region, mode) -> list:
+    return [
+        annotation
+        for annotation in dataset.annotations
+        if annotation.image_id == image_id and matches(annotation.bbox, region, mode)
+    ]
+
+
+def ids(annotations) -> list:
+    if hasattr(annotations, "columns"):
+        return annotations.annotation_id.tolist()
+    return [annotation.annotation_id for annotation in annotations]
+
+
+@pytest.mark.parametrize("columnar", [False, True], ids=["list", "columnar"])
+@pytest.mark.parametrize("mode", list(RegionMode))
+@pytest.mark.parametrize(
+    "region", [(0, 0, 200, 150), (50, 40, 120, 90), (20, 20, 21, 21), (300, 0, 400, 10)]
+)
+def test_query_region_matches_brute_force(
+    dataset: ODCocoDataset, columnar: bool, mode: RegionMode, region
+):
+    expected = ids(brute_force(dataset, 1, region, mode))
+    if columnar:
+        dataset.to_columnar()
+
+    found = dataset.query_region(1, region, mode=mode, type="ltrb")
+
+    assert ids(found) == expected
+
+
+@pytest.mark.parametrize("mode", list(RegionMode))
+@pytest.mark.parametrize(
+    "tile_size, stride", [(64, None), ((80, 50), (40, 25)), (300, None)]
+)
+def test_tile_matches_brute_force(dataset: ODCocoDataset, mode, tile_size, stride):
+    width, height = np.broadcast_to(tile_size, (2,)).tolist()
+    step_x, step_y = np.broadcast_to(tile_size if stride is None else stride, (2,))
+    columns = max(int(np.ceil((200 - width) / step_x)), 0) + 1
+    rows = max(int(np.ceil((150 - height) / step_y)), 0) + 1
+
+    tiles = dataset.tile(1, tile_size, stride, mode=mode)
+
+    assert len(tiles) == columns * rows
+    for index, tile in enumerate(tiles):
+        y, x = divmod(index, columns)
+        left, top = float(x * step_x), float(y * step_y)
+        region = (left, top, left + width, top + height)
+        expected = brute_force(dataset, 1, region, mode)
+
+        assert tile.bbox == (left, top, width, height)
+        assert ids(tile.annotations) == ids(expected)
+        for annotation, bbox in zip(expected, tile.annotations.bbox.tolist()):
+            a, b, c, d = ltrb(annotation.bbox)
+            clipped = (
+                max(a, region[0]) - left,
+                max(b, region[1]) - top,
+                min(c, region[2]) - left,
+                min(d, region[3]) - top,
+            )
+            assert ltrb(bbox) == pytest.approx(clipped)
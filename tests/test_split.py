@@ -0,0 +1,151 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from codantic.models import CaptionCocoDataset, FaceCocoDataset, ODCocoDataset
+
+
+def captions(num_images: int) -> dict:
+    return {
+        "info": {"description": "captions"},
+        "images": [
+            {"id": i, "file_name": f"{i}.jpg", "width": 64, "height": 64}
+            for i in range(1, num_images + 1)
+        ],
+        "annotations": [
+            {"id": i, "image_id": i, "caption": f"image {i}"}
+            for i in range(1, num_images + 1)
+        ],
+    }
+
+
+def faces(num_images: int) -> dict:
+    return {
+        "images": [
+            {"id": i, "file_name": f"{i}.jpg", "width": 64, "height": 64}
+            for i in range(1, num_images + 1)
+        ],
+        "annotations": [
+            {
+                "id": i,
+                "image_id": i,
+                "category_id": 1,
+                "bbox": [i, 2, 8, 8],
+                "keypoints": [1, 2, 2],
+            }
+            for i in range(1, num_images + 1)
+        ],
+        "categories": [{"id": 1, "name": "person"}],
+    }
+
+
+def members(path: Path) -> dict:
+    """Members of a json file, encoded again to compare values and key order"""
+    return {
+        key: json.dumps(value) for key, value in json.loads(path.read_text()).items()
+    }
+
+
+@pytest.mark.parametrize(
+    "dataset_type, data",
+    [(CaptionCocoDataset, captions(10)), (FaceCocoDataset, faces(10))],
+    ids=["caption", "face"],
+)
+@pytest.mark.parametrize("columnar", [False, True], ids=["list", "columnar"])
+def test_split_paths_match_write_json(
+    tmp_path: Path, load_dict, dataset_type, data, columnar
+):
+    dataset = load_dict(dataset_type, data, columnar=columnar)
+    paths = [tmp_path / "train.json", tmp_path / "val.json"]
+    dataset.split([0.5, 0.5], seed=0, paths=paths)
+
+    for split, path in zip(dataset.split([0.5, 0.5], seed=0), paths):
+        expected = tmp_path / f"expected_{path.name}"
+        split.write_json(expected)
+        assert members(path) == members(expected)
+
+    annotation_ids = [
+        annotation["id"]
+        for path in paths
+        for annotation in json.loads(path.read_text())["annotations"]
+    ]
+    assert sorted(annotation_ids) == [a["id"] for a in data["annotations"]]
+
+
+def stratified(num_images: int = 100) -> dict:
+    """Images 1-10 hold the rare category 2, the last 15 hold nothing"""
+    annotations = []
+    for image_id in range(1, num_images - 14):
+        annotations.append({"category_id": 1, "image_id": image_id})
+        if image_id <= 10:
+            annotations.append({"category_id": 2, "image_id": image_id})
+    for i, annotation in enumerate(annotations, 1):
+        annotation.update(id=i, bbox=[0, 0, 8, 8])
+    return {
+        "images": [
+            {"id": i, "file_name": f"{i}.jpg", "width": 64, "height": 64}
+            for i in range(1, num_images + 1)
+        ],
+        "annotations": annotations,
+        "categories": [{"id": 1, "name": "person"}, {"id": 2, "name": "car"}],
+    }
+
+
+def image_ids(dataset) -> set:
+    return {image.image_id for image in dataset.images}
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("columnar", [False, True], ids=["list", "columnar"])
+def test_split_keeps_ratios_inside_each_stratum(load_dict, seed: int, columnar: bool):
+    dataset = load_dict(ODCocoDataset, stratified(), columnar=columnar)
+
+    splits = dataset.split({"train": 0.8, "val": 0.2}, seed=seed)
+
+    assert list(splits) == ["train", "val"]
+    train, val = (image_ids(split) for split in splits.values())
+    assert not train & val
+    assert train | val == set(range(1, 101))
+    # strata of 10, 75 and 15 images, cut at 80%
+    strata = [set(range(1, 11)), set(range(11, 86)), set(range(86, 101))]
+    assert [len(train & stratum) for stratum in strata] == [8, 60, 12]
+    for split, ids in zip(splits.values(), (train, val)):
+        annotations = split.get_annotation_store()
+        assert set(annotations.image_id.tolist()) <= ids
+    assert sum(len(split.get_annotation_store()) for split in splits.values()) == 95
+
+
+def test_split_rounds_small_strata_either_way(load_dict):
+    dataset = load_dict(ODCocoDataset, stratified())
+    counts = set()
+    for seed in range(20):
+        train, _, _ = dataset.split([0.5, 0.3, 0.2], seed=seed)
+        rare = image_ids(train) & set(range(1, 11))
+        none = image_ids(train) & set(range(86, 101))
+        assert len(rare) == 5
+        assert len(none) in (7, 8)
+        counts.add(len(none))
+
+    assert counts == {7, 8}
+
+
+def test_split_is_seeded(load_dict):
+    dataset = load_dict(ODCocoDataset, stratified())
+
+    first = [image_ids(split) for split in dataset.split([0.5, 0.5], seed=3)]
+    second = [image_ids(split) for split in dataset.split([0.5, 0.5], seed=3)]
+    plain = [image_ids(s) for s in dataset.split([0.5, 0.5], None, seed=3)]
+
+    assert first == second
+    assert [len(ids) for ids in plain] == [50, 50]
+
+
+@pytest.mark.parametrize(
+    "ratios, stratify_by", [([], "category"), ([1, -1], "category"), ([1], "size")]
+)
+def test_split_rejects_invalid_arguments(load_dict, ratios, stratify_by):
+    dataset = load_dict(ODCocoDataset, stratified())
+
+    with pytest.raises(ValueError):
+        dataset.split(ratios, stratify_by=stratify_by)
@@ -0,0 +1,76 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from codantic.models import ODCocoDataset
+
+DATA = dict(
+    images=[
+        {"id": image_id, "file_name": f"{image_id}.jpg", "width": 640, "height": 480}
+        for image_id in (1, 2, 3)
+    ],
+    annotations=[
+        {"id": 1, "image_id": 1, "category_id": 1, "bbox": [0, 0, 4, 4], "area": 16},
+        {"id": 2, "image_id": 1, "category_id": 2, "bbox": [0, 0, 10, 40], "area": 400},
+        {
+            "id": 3,
+            "image_id": 1,
+            "category_id": 1,
+            "bbox": [0, 0, 100, 50],
+            "area": 5000,
+        },
+        {
+            "id": 4,
+            "image_id": 2,
+            "category_id": 1,
+            "bbox": [0, 0, 200, 100],
+            "area": 2e4,
+        },
+    ],
+    categories=[{"id": 1, "name": "person"}, {"id": 2, "name": "car"}],
+)
+
+
+def nonzero(counts: dict) -> dict:
+    return {key: count for key, count in counts.items() if count}
+
+
+def check_hand_counts(stats):
+    assert (stats.num_images, stats.num_annotations, stats.num_categories) == (3, 4, 2)
+    assert stats.annotations_per_category == {"person": 3, "car": 1}
+    assert stats.images_per_category == {"person": 2, "car": 1}
+    # image 3 has no annotation
+    assert stats.annotations_per_image == dict(min=0.0, mean=4 / 3, median=1.0, max=3.0)
+    assert nonzero(stats.annotations_per_image_histogram) == {"0": 1, "1": 1, "3-4": 1}
+    # sqrt areas of 4, 20, 70.7 and 141.4
+    assert nonzero(stats.box_size_histogram) == {
+        "0-8": 1,
+        "16-32": 1,
+        "64-96": 1,
+        "128-256": 1,
+    }
+    # width / height of 1, 0.25, 2 and 2
+    assert nonzero(stats.aspect_ratio_histogram) == {
+        "0.25-0.5": 1,
+        "1-1.33": 1,
+        "2-4": 2,
+    }
+    assert stats.area_ranges == {"all": 4, "small": 2, "medium": 1, "large": 1}
+
+
+@pytest.mark.parametrize("columnar", [False, True], ids=["list", "columnar"])
+def test_stats_match_hand_counts(load_dict, columnar: bool):
+    dataset = load_dict(ODCocoDataset, DATA)
+    if columnar:
+        dataset.to_columnar()
+
+    check_hand_counts(dataset.stats())
+
+
+@pytest.mark.parametrize("batch_size", [1, 3, 10])
+def test_file_stats_match_hand_counts(tmp_path: Path, batch_size: int):
+    path = tmp_path / "dataset.json"
+    path.write_text(json.dumps(DATA))
+
+    check_hand_counts(ODCocoDataset.file_stats(path, batch_size=batch_size))
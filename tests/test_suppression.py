@@ -0,0 +1,162 @@
+import math
+
+import numpy as np
+import pytest
+
+from codantic.models import NMSMethod, ODCocoDataset
+
+
+def iou(a, b) -> float:
+    w = min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0])
+    h = min(a[1] + a[3], b[1] + b[3]) - max(a[1], b[1])
+    if w <= 0 or h <= 0:
+        return 0.0
+    intersection = w * h
+    return intersection / (a[2] * a[3] + b[2] * b[3] - intersection)
+
+
+def reference_group(rows, boxes, scores, method, iou_threshold, sigma):
+    """Greedy suppression of one group, written one box at a time"""
+    order = sorted(range(len(rows)), key=lambda i: (-scores[i], rows[i]))
+    if method == NMSMethod.hard:
+        kept = []
+        for i in order:
+            if all(iou(boxes[i], boxes[j]) <= iou_threshold for j in kept):
+                kept.append(i)
+        return [(rows[i], scores[i], boxes[i]) for i in kept]
+
+    if method == NMSMethod.fusion:
+        clusters = []  # first member, members
+        for i in order:
+            best, best_iou = None, -1.0
+            for cluster in clusters:
+                overlap = iou(boxes[i], fuse(cluster, boxes, scores)[1])
+                if overlap > best_iou:
+                    best, best_iou = cluster, overlap
+            if best is not None and best_iou > iou_threshold:
+                best.append(i)
+            else:
+                clusters.append([i])
+        return [(rows[c[0]], *fuse(c, boxes, scores)) for c in clusters]
+
+    current = {i: scores[i] for i in order}
+    result = []
+    while current:
+        best = max(current, key=lambda i: (current[i], -order.index(i)))
+        score = current.pop(best)
+        result.append((rows[best], score, boxes[best]))
+        for i in current:
+            overlap = iou(boxes[best], boxes[i])
+            if method == NMSMethod.linear:
+                current[i] *= 1 - overlap if overlap > iou_threshold else 1.0
+            else:
+                current[i] *= math.exp(-(overlap**2) / sigma)
+    return result
+
+
+def fuse(members, boxes, scores):
+    weights = [scores[i] for i in members]
+    corners = [
+        sum(w * c for w, c in zip(weights, column)) / sum(weights)
+        for column in zip(
+            *(
+                (
+                    boxes[i][0],
+                    boxes[i][1],
+                    boxes[i][0] + boxes[i][2],
+                    boxes[i][1] + boxes[i][3],
+                )
+                for i in members
+            )
+        )
+    ]
+    box = [corners[0], corners[1], corners[2] - corners[0], corners[3] - corners[1]]
+    return sum(weights) / len(members), box
+
+
+def reference(dataset, method, iou_threshold, per_category, top_k, min_score, sigma):
+    groups = {}
+    for row, annotation in enumerate(dataset.annotations):
+        key = (annotation.image_id, annotation.category_id if per_category else None)
+        groups.setdefault(key, []).append(row)
+
+    result = []
+    for rows in groups.values():
+        annotations = [dataset.annotations[row] for row in rows]
+        kept = reference_group(
+            rows,
+            [list(annotation.bbox) for annotation in annotations],
+            [annotation.score for annotation in annotations],
+            method,
+            iou_threshold,
+            sigma,
+        )
+        kept = [item for item in kept if item[1] >= min_score]
+        if top_k is not None:
+            kept = sorted(kept, key=lambda item: -item[1])[:top_k]
+        result.extend(kept)
+    return sorted(result, key=lambda item: item[0])
+
+
+@pytest.fixture
+def dataset(load_dict) -> ODCocoDataset:
+    # jittered copies of a few boxes, so that most boxes overlap others
+    rng = np.random.default_rng(0)
+    centers = rng.uniform(20, 80, size=(4, 2))
+    annotations = []
+    for i in range(80):
+        x, y = centers[i % 4] + rng.normal(0, 4, size=2)
+        width, height = rng.uniform(10, 30, size=2)
+        annotations.append(
+            {
+                "id": i + 1,
+                "image_id": 1 + i % 3,
+                "category_id": 1 + i % 2,
+                "bbox": [float(x), float(y), float(width), float(height)],
+                "area": float(width * height),
+                "score": float(rng.uniform(0.05, 1)),
+            }
+        )
+    data = dict(
+        images=[
+            {
+                "id": image_id,
+                "file_name": f"{image_id}.jpg",
+                "width": 100,
+                "height": 100,
+            }
+            for image_id in (1, 2, 3)
+        ],
+        annotations=annotations,
+        categories=[{"id": 1, "name": "person"}, {"id": 2, "name": "car"}],
+    )
+    return load_dict(ODCocoDataset, data)
+
+
+@pytest.mark.parametrize("method", list(NMSMethod))
+@pytest.mark.parametrize(
+    "iou_threshold, per_category, top_k, min_score",
+    [(0.5, True, None, 0.0), (0.3, False, 3, 0.1), (0.7, True, 2, 0.0)],
+)
+def test_nms_matches_reference(
+    dataset: ODCocoDataset, method, iou_threshold, per_category, top_k, min_score
+):
+    expected = reference(
+        dataset, method, iou_threshold, per_category, top_k, min_score, sigma=0.5
+    )
+
+    kept = dataset.nms(
+        iou_threshold,
+        per_category=per_category,
+        top_k=top_k,
+        method=method,
+        min_score=min_score,
+    ).get_annotation_store()
+
+    ids = [dataset.annotations[row].annotation_id for row, _, _ in expected]
+    assert kept.annotation_id.tolist() == ids
+    assert kept.score.tolist() == pytest.approx([score for _, score, _ in expected])
+    assert kept.bbox.ravel().tolist() == pytest.approx(
+        [value for _, _, box in expected for value in box]
+    )
+    assert ids
@@ -0,0 +1,127 @@
+import itertools
+
+import pytest
+
+from codantic.core.coco import Dataset
+
+# frames of each video, given out of order
+FRAMES = {1: [4, 0, 2, 1, 3], 2: [7, 5, 6]}
+
+
+@pytest.fixture
+def dataset() -> Dataset:
+    images = [
+        {"id": frame, "video_id": video_id, "file_name": f"{video_id}/{frame}.jpg"}
+        for video_id, frames in FRAMES.items()
+        for frame in frames
+    ]
+    rows = itertools.count(1)
+    annotations = [
+        {
+            "id": next(rows),
+            "image_id": image["id"],
+            "video_id": image["video_id"],
+            "category_id": (image["id"] + copy) % 2,
+            "bbox": [0, 0, 8, 8],
+            "track_id": 10 * image["video_id"] + copy,
+        }
+        for image in images
+        for copy in range(2)
+    ]
+    # an annotation without track, missing from every track
+    annotations.append(
+        {"id": 99, "image_id": 0, "video_id": 1, "category_id": 0, "bbox": [0, 0, 4, 4]}
+    )
+    videos = [
+        {"id": video_id, "name": str(video_id), "num_frame": len(frames)}
+        for video_id, frames in FRAMES.items()
+    ]
+    return Dataset(videos=videos, images=images, annotations=annotations)
+
+
+def frames_of(dataset: Dataset) -> list:
+    return [image.image_id for image in dataset.images]
+
+
+def brute_force(dataset: Dataset, video_id: int, start: int, stop: int) -> list:
+    return sorted(
+        (
+            annotation
+            for annotation in dataset.annotations
+            if annotation.video_id == video_id and start <= annotation.image_id < stop
+        ),
+        key=lambda annotation: annotation.image_id,
+    )
+
+
+@pytest.mark.parametrize(
+    "video_id, start, stop",
+    [(1, None, None), (1, 1, 3), (1, 3, 99), (2, 0, 6), (3, 0, 9)],
+)
+def test_frames_matches_scan(dataset: Dataset, video_id, start, stop):
+    view = dataset.frames(video_id, start, stop)
+
+    lo = -1 if start is None else start
+    hi = 99 if stop is None else stop
+    expected = brute_force(dataset, video_id, lo, hi)
+    assert [a.annotation_id for a in view.annotations] == [
+        a.annotation_id for a in expected
+    ]
+    assert frames_of(view) == sorted(
+        frame for frame in FRAMES.get(video_id, []) if lo <= frame < hi
+    )
+    assert [video.video_id for video in view.videos] == ([video_id] if expected else [])
+
+
+@pytest.mark.parametrize(
+    "size, stride, expected",
+    [
+        (2, None, [[0, 1], [2, 3]]),
+        (3, 1, [[0, 1, 2], [1, 2, 3], [2, 3, 4]]),
+        (9, 2, [[0, 1, 2, 3, 4]]),
+    ],
+)
+def test_windows(dataset: Dataset, size, stride, expected):
+    windows = dataset.windows(1, size, stride)
+
+    assert [frames_of(window) for window in windows] == expected
+
+
+def test_windows_rejects_empty_size(dataset: Dataset):
+    with pytest.raises(ValueError):
+        next(dataset.windows(1, 0))
+
+
+def test_track_follows_frames(dataset: Dataset):
+    track = dataset.track(21)
+
+    assert [a.image_id for a in track] == [5, 6, 7]
+    assert all(a.track_id == 21 for a in track)
+    assert dataset.track(-1) == []
+
+
+@pytest.mark.parametrize(
+    "keys", [("video_id",), ("track_id",), ("category_id", "video_id"), ()]
+)
+def test_groupby_matches_scan(dataset: Dataset, keys):
+    expected = {}
+    for annotation in dataset.annotations:
+        group = tuple(getattr(annotation, key, Ellipsis) for key in keys)
+        expected.setdefault(group, []).append(annotation.annotation_id)
+
+    groups = dataset.groupby(*keys)
+
+    assert list(groups) == list(expected)
+    assert {
+        group: [a.annotation_id for a in view.annotations]
+        for group, view in groups.items()
+    } == expected
+
+
+def test_groupby_is_cached_until_annotations_change(dataset: Dataset):
+    index = dataset.index
+    assert index.group_rows(("track_id",)) is index.group_rows(("track_id",))
+
+    dataset.annotations.pop()
+
+    assert Ellipsis not in {key for key, in dataset.groupby("track_id")}
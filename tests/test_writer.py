@@ -0,0 +1,121 @@
+import gzip
+import json
+from pathlib import Path
+
+import pytest
+
+from codantic.io import JSONWriter
+from codantic.models import CaptionCocoDataset, FaceCocoDataset, ODCocoDataset
+
+DATASET = {
+    "info": {"description": "round trip"},
+    "licenses": [],
+    "images": [
+        {"id": 1, "file_name": "1.jpg", "width": 640, "height": 480},
+        {"id": 2, "file_name": "2.jpg", "width": 640, "height": 480},
+    ],
+    "annotations": [
+        {
+            "id": 1,
+            "image_id": 1,
+            "category_id": 1,
+            "bbox": [356.1574399031784, 42.3, 3.8, 13.4],
+            "area": 50.92,
+            "score": 1,
+        },
+        {
+            "id": 2,
+            "image_id": 2,
+            "category_id": 2,
+            "bbox": [0.1, 0.2, 100.30000000000001, 7.7],
+            "area": 772.31,
+            "score": 0.25,
+            "attributes": {"occluded": True},
+        },
+    ],
+    "categories": [{"id": 1, "name": "person"}, {"id": 2, "name": "car"}],
+}
+
+CAPTIONS = {
+    "info": {"description": "captions"},
+    "licenses": [],
+    "images": DATASET["images"],
+    "annotations": [
+        {"id": 1, "image_id": 1, "caption": "a person"},
+        {"id": 2, "image_id": 2, "caption": "a car"},
+    ],
+    "categories": [],
+}
+
+
+@pytest.fixture
+def source(tmp_path: Path) -> Path:
+    path = tmp_path / "source.json"
+    path.write_text(json.dumps(DATASET))
+    return path
+
+
+@pytest.mark.parametrize(
+    "options",
+    [dict(), dict(columnar=True), dict(lazy=True)],
+    ids=["list", "columnar", "lazy"],
+)
+def test_write_json_round_trip(tmp_path: Path, source: Path, options: dict):
+    first, second = tmp_path / "first.json", tmp_path / "second.json"
+    ODCocoDataset.load(source, **options).write_json(first)
+    ODCocoDataset.load(first, **options).write_json(second)
+
+    assert json.loads(first.read_text()) == DATASET
+    assert first.read_bytes() == second.read_bytes()
+
+
+def test_write_json_keeps_empty_fields_out(tmp_path: Path, source: Path):
+    path = tmp_path / "faces.json"
+    FaceCocoDataset.load(source).write_json(path)
+
+    for annotation in json.loads(path.read_text())["annotations"]:
+        assert "keypoints" not in annotation
+        assert "landmarks" not in annotation
+
+
+@pytest.mark.parametrize(
+    "options",
+    [dict(), dict(columnar=True), dict(lazy=True)],
+    ids=["list", "columnar", "lazy"],
+)
+def test_write_json_keeps_missing_ids_missing(tmp_path: Path, options: dict):
+    source, path = tmp_path / "source.json", tmp_path / "captions.json"
+    source.write_text(json.dumps(CAPTIONS))
+    dataset = CaptionCocoDataset.load(source, **options)
+    dataset.write_json(path)
+
+    assert dataset.annotations[0].category_id is None
+    assert json.loads(path.read_text()) == CAPTIONS
+
+
+def test_json_writer_discards_failed_document(tmp_path: Path):
+    path = tmp_path / "dataset.json"
+    path.write_text("{}")
+
+    def images():
+        yield from range(3)
+        raise RuntimeError("worker died")
+
+    with pytest.raises(RuntimeError):
+        with JSONWriter(path) as writer:
+            writer.write_array("images", images())
+
+    assert path.read_text() == "{}"
+    assert list(tmp_path.iterdir()) == [path]
+
+
+@pytest.mark.parametrize("name", ["dataset.json", "dataset.json.gz"])
+def test_json_writer_replaces_document_on_close(tmp_path: Path, name: str):
+    path = tmp_path / name
+    with JSONWriter(path) as writer:
+        writer.write_array("images", range(3))
+
+    opener = gzip.open if name.endswith(".gz") else open
+    with opener(path, "rt") as f:
+        assert json.load(f) == {"images": [0, 1, 2]}
+    assert list(tmp_path.iterdir()) == [path]